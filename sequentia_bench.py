@@ -0,0 +1,828 @@
+"""Benchmarks for the Sequentia compiler.
+
+Usage:
+    python sequentia_bench.py lean [--statements N] [--repeat R]
+    python sequentia_bench.py compile [--statements N] [--repeat R]
+    python sequentia_bench.py loops [--trips N] [--repeat R]
+    python sequentia_bench.py slices [--length N] [--trips W] [--repeat R]
+    python sequentia_bench.py memory [--length N] [--stages S]
+    python sequentia_bench.py compact [--length N] [--repeat R]
+    python sequentia_bench.py patterns [--sizes N,N,...] [--repeat R]
+    python sequentia_bench.py reductions [--length N] [--repeat R]
+    python sequentia_bench.py search [--length N] [--repeat R]
+    python sequentia_bench.py masks [--length N] [--repeat R]
+    python sequentia_bench.py windows [--length N] [--width W] [--repeat R]
+    python sequentia_bench.py modular [--length N] [--repeat R]
+    python sequentia_bench.py modcheck
+    python sequentia_bench.py unroll [--trips N] [--repeat R]
+    python sequentia_bench.py optlevels [--statements N] [--trips N] [--repeat R]
+    python sequentia_bench.py artifacts [--statements N] [--repeat R]
+    python sequentia_bench.py reactive [--length N] [--repeat R]
+    python sequentia_bench.py parallel [--length N] [--workers W] [--repeat R]
+    python sequentia_bench.py sweep [--statements N] [--runs K] [--workers W]
+    python sequentia_bench.py suite [--axes a,b] [--scale F] [--out results.json]
+                                    [--baseline base.json] [--save-baseline base.json]
+
+The suite generates synthetic programs that grow along one axis at a time
+(source size, nested loops, expression depth, statement count, loop trip count, sequence
+length per pattern type, vector-expression chain length), times every
+pipeline phase plus execution, and optionally compares against a baseline.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import sequentia_compiler as sc
+import sequentia_runtime
+
+
+# --------------------------
+# Program Generators
+# --------------------------
+
+def gen_mixed_program(n_statements):
+    """Straight-line program mixing patterns, vector arithmetic, slices and prints"""
+    lines = []
+    for i in range(n_statements):
+        kind = i % 5
+        if kind == 0:
+            lines.append(f"s{i} = pattern square 20")
+        elif kind == 1:
+            lines.append(f"s{i} = s{i - 1} * 2 + {i}")
+        elif kind == 2:
+            lines.append(f"s{i} = s{i - 1}[2:10]")
+        elif kind == 3:
+            lines.append(f"s{i} = s{i - 3}[{i % 20}]")
+        else:
+            lines.append(f"print s{i - 2}")
+    return "\n".join(lines) + "\n"
+
+def gen_expr_depth(depth):
+    """One assignment whose right-hand side nests `depth` binary operations"""
+    expr = "1"
+    for i in range(depth):
+        op = "+*-"[i % 3]
+        expr = f"({expr} {op} {i % 7 + 1})"
+    return f"x = {expr}\nprint x\n"
+
+def gen_statements(n):
+    """`n` dependent scalar assignments"""
+    lines = ["a0 = 1"]
+    for i in range(1, n):
+        lines.append(f"a{i} = a{i - 1} + {i % 10}")
+    lines.append(f"print a{n - 1}")
+    return "\n".join(lines) + "\n"
+
+def gen_loop_trips(trips):
+    """A loop body executed `trips` times"""
+    return (f"xs = pattern arithmetic 0, 1, {trips}\n"
+            "for v in xs {\n"
+            "    y = v * 2 + 1\n"
+            "}\n"
+            "print y\n")
+
+def gen_pattern(pattern):
+    """Generator producing one `pattern` assignment of length n"""
+    def gen(n):
+        if pattern == "arithmetic":
+            args = f"1, 3, {n}"
+        elif pattern == "geometric":
+            args = f"1, 3, {n}"
+        else:
+            args = str(n)
+        return f"x = pattern {pattern} {args}\ny = x[{n - 1}]\n"
+    return gen
+
+def gen_vector_chain(length):
+    """A single vector expression chaining `length` element-wise operations"""
+    terms = ["x"]
+    for i in range(length):
+        terms.append(f"{'+-*'[i % 3]} x")
+    return "x = pattern square 2000\ny = " + " ".join(terms) + "\nprint y[0]\n"
+
+def gen_nested_loops(trips):
+    """Two nested loops of `trips` iterations each, with scalar work in the body"""
+    return (f"xs = pattern arithmetic 0, 1, {trips}\n"
+            f"ys = pattern arithmetic 1, 2, {trips}\n"
+            "c = 0\n"
+            "for a in xs {\n"
+            "    for b in ys {\n"
+            "        s = a * b\n"
+            "        t = s + a - b\n"
+            "        if t > 100 {\n"
+            "            c = t / 2\n"
+            "        }\n"
+            "    }\n"
+            "}\n"
+            "print c\n")
+
+def gen_sliding_windows(length, windows):
+    """Take `windows` large tail slices of one long sequence"""
+    return (f"big = pattern square {length}\n"
+            f"for k in pattern arithmetic 0, 1, {windows} {{\n"
+            "    tail = big[k:]\n"
+            "    head = tail[0:10]\n"
+            "    t = head * 2\n"
+            "}\n"
+            "print t\n")
+
+def gen_pipeline(length, stages):
+    """A chain of `stages` full-length intermediates, each read only by the next"""
+    lines = [f"s0 = pattern square {length}"]
+    for i in range(1, stages + 1):
+        lines.append(f"s{i} = s{i - 1} * 3 + {i}")
+    lines.append(f"print s{stages}[{length - 1}]")
+    return "\n".join(lines) + "\n"
+
+# axis name -> (generator, sizes)
+AXES = {
+    "source_size": (gen_mixed_program, [500, 1000, 2000, 4000]),
+    "nested_loops": (gen_nested_loops, [50, 100, 200, 400]),
+    "expr_depth": (gen_expr_depth, [10, 40, 80, 160]),
+    "statements": (gen_statements, [500, 1000, 2000, 4000]),
+    "loop_trips": (gen_loop_trips, [10_000, 50_000, 100_000, 200_000]),
+    "pattern_fibonacci": (gen_pattern("fibonacci"), [1000, 5000, 10_000, 20_000]),
+    "pattern_factorial": (gen_pattern("factorial"), [250, 500, 1000, 2000]),
+    "pattern_square": (gen_pattern("square"), [10_000, 50_000, 100_000, 200_000]),
+    "pattern_cube": (gen_pattern("cube"), [10_000, 50_000, 100_000, 200_000]),
+    "pattern_triangular": (gen_pattern("triangular"), [10_000, 50_000, 100_000, 200_000]),
+    "pattern_arithmetic": (gen_pattern("arithmetic"), [10_000, 50_000, 100_000, 200_000]),
+    "pattern_geometric": (gen_pattern("geometric"), [250, 500, 1000, 2000]),
+    "vector_chain": (gen_vector_chain, [5, 10, 20, 40]),
+}
+
+
+# --------------------------
+# Timing
+# --------------------------
+
+def best_of(fn, repeat):
+    """Best wall time over `repeat` calls"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+# --------------------------
+# Benchmarks
+# --------------------------
+
+def bench_lean(args):
+    """Full diagnostic run (as run_file prints it) against the lean run_source path"""
+    src = gen_mixed_program(args.statements)
+
+    def full():
+        sink = io.StringIO()
+        for section in sc.iter_diagnostics(src):
+            sink.write(section)
+
+    def lean():
+        sc.run_source(src)
+
+    full_t = best_of(full, args.repeat)
+    lean_t = best_of(lean, args.repeat)
+    return {
+        "benchmark": "lean",
+        "statements": args.statements,
+        "full_seconds": full_t,
+        "lean_seconds": lean_t,
+        "speedup": full_t / lean_t if lean_t else None,
+    }
+
+
+def bench_compile(args):
+    """Codegen + compile + exec: source text with helpers prepended vs direct Python AST"""
+    src = gen_mixed_program(args.statements)
+    ast = sc.Parser(sc.Lexer(src).tokens()).parse_program()
+    sc.SemanticAnalyzer(ast).check()
+    helpers = sc.get_runtime_helpers()
+
+    def text_path():
+        # What every run used to do: emit text, prepend the helper library, re-parse it all
+        py = helpers + "\n" + sc.generate_python(ast, include_runtime=False)
+        sink = io.StringIO()
+        with contextlib.redirect_stdout(sink):
+            exec(compile(py, "<sequentia>", "exec"), {})
+
+    def ast_path():
+        sink = io.StringIO()
+        with contextlib.redirect_stdout(sink):
+            exec(sc.compile_python(ast), sc.runtime_namespace())
+
+    text_t = best_of(text_path, args.repeat)
+    ast_t = best_of(ast_path, args.repeat)
+    return {
+        "benchmark": "compile",
+        "statements": args.statements,
+        "text_seconds": text_t,
+        "ast_seconds": ast_t,
+        "speedup": text_t / ast_t if ast_t else None,
+    }
+
+def bench_loops(args):
+    """Nested-loop execution with module-level globals vs a function with fast locals"""
+    src = gen_nested_loops(args.trips)
+    ast = sc.Parser(sc.Lexer(src).tokens()).parse_program()
+    sc.SemanticAnalyzer(ast).check()
+    flat = sc.compile_python(ast, as_function=False)
+    wrapped = sc.compile_python(ast, as_function=True)
+
+    def run(code):
+        sink = io.StringIO()
+        with contextlib.redirect_stdout(sink):
+            exec(code, sc.runtime_namespace())
+
+    globals_t = best_of(lambda: run(flat), args.repeat)
+    locals_t = best_of(lambda: run(wrapped), args.repeat)
+    return {
+        "benchmark": "loops",
+        "iterations": args.trips * args.trips,
+        "globals_seconds": globals_t,
+        "locals_seconds": locals_t,
+        "speedup": globals_t / locals_t if locals_t else None,
+    }
+
+def run_quiet(code, namespace):
+    with contextlib.redirect_stdout(io.StringIO()):
+        exec(code, namespace)
+
+def peak_memory(code, namespace):
+    """tracemalloc peak in bytes for one execution of `code`"""
+    tracemalloc.start()
+    try:
+        run_quiet(code, namespace)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def bench_slices(args):
+    """Slice views against copying list slices on large sliding windows"""
+    src = gen_sliding_windows(args.length, args.trips)
+    ast = sc.Parser(sc.Lexer(src).tokens()).parse_program()
+    sc.SemanticAnalyzer(ast).check()
+    code = sc.compile_python(ast)
+
+    def copying_namespace():
+        ns = sc.runtime_namespace()
+        ns["_seq_view"] = lambda seq, start=None, end=None: list(seq[start:end])
+        return ns
+
+    copy_t = best_of(lambda: run_quiet(code, copying_namespace()), args.repeat)
+    view_t = best_of(lambda: run_quiet(code, sc.runtime_namespace()), args.repeat)
+    copy_peak = peak_memory(code, copying_namespace())
+    view_peak = peak_memory(code, sc.runtime_namespace())
+    return {
+        "benchmark": "slices",
+        "length": args.length,
+        "windows": args.trips,
+        "copy_seconds": copy_t,
+        "view_seconds": view_t,
+        "speedup": copy_t / view_t if view_t else None,
+        "copy_peak_bytes": copy_peak,
+        "view_peak_bytes": view_peak,
+    }
+
+# Runs one program in a fresh interpreter; prints peak RSS (KiB) before and after exec
+RSS_SCRIPT = """
+import io, resource, sys
+import sequentia_compiler as sc
+src = sys.stdin.read()
+ast = sc.Parser(sc.Lexer(src).tokens()).parse_program()
+sc.SemanticAnalyzer(ast).check()
+code = sc.compile_python(ast, reuse=sys.argv[1] == "reuse")
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+sc._exec_program(code, sc.runtime_namespace(), io.StringIO())
+print(before, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+def peak_rss(src, mode):
+    """(baseline, peak) resident set size in KiB for `src` run in a subprocess"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    out = subprocess.run([sys.executable, "-c", RSS_SCRIPT, mode], input=src, cwd=here,
+                         capture_output=True, text=True, check=True).stdout
+    before, peak = out.split()
+    return int(before), int(peak)
+
+def bench_memory(args):
+    """Peak RSS of a long pipeline with every intermediate kept vs liveness-driven release"""
+    src = gen_pipeline(args.length, args.stages)
+    keep_base, keep_peak = peak_rss(src, "keep")
+    reuse_base, reuse_peak = peak_rss(src, "reuse")
+    return {
+        "benchmark": "memory",
+        "length": args.length,
+        "stages": args.stages,
+        "keep_peak_rss_kib": keep_peak,
+        "reuse_peak_rss_kib": reuse_peak,
+        "keep_program_rss_kib": keep_peak - keep_base,
+        "reuse_program_rss_kib": reuse_peak - reuse_base,
+        "reduction": (keep_peak - keep_base) / (reuse_peak - reuse_base) if reuse_peak > reuse_base else None,
+    }
+
+def bench_compact(args):
+    """array('q') storage against lists of ints for patterns that fit in int64"""
+    n = args.length
+    results = []
+    for pattern in ("square", "cube", "triangular", "arithmetic"):
+        pattern_args = f"1, 3, {n}" if pattern == "arithmetic" else str(n)
+        src = f"x = pattern {pattern} {pattern_args}\ny = x * 3 + 1\nprint y[{n - 1}]\n"
+        ast = sc.Parser(sc.Lexer(src).tokens()).parse_program()
+        sc.SemanticAnalyzer(ast).check()
+        code = sc.compile_python(ast)
+        saved = sequentia_runtime.COMPACT_MIN_LENGTH
+        try:
+            sequentia_runtime.COMPACT_MIN_LENGTH = float("inf")
+            list_t = best_of(lambda: run_quiet(code, sc.runtime_namespace()), args.repeat)
+            list_peak = peak_memory(code, sc.runtime_namespace())
+        finally:
+            sequentia_runtime.COMPACT_MIN_LENGTH = saved
+        compact_t = best_of(lambda: run_quiet(code, sc.runtime_namespace()), args.repeat)
+        compact_peak = peak_memory(code, sc.runtime_namespace())
+        results.append({
+            "pattern": pattern,
+            "list_seconds": list_t,
+            "compact_seconds": compact_t,
+            "list_peak_bytes": list_peak,
+            "compact_peak_bytes": compact_peak,
+            "memory_ratio": list_peak / compact_peak if compact_peak else None,
+        })
+    return {"benchmark": "compact", "length": n, "results": results}
+
+# Per-element formulas the strength-reduced generators must reproduce
+PATTERN_FORMULAS = {
+    "square": (sequentia_runtime._pat_square, lambda n: [(i+1)**2 for i in range(n)]),
+    "cube": (sequentia_runtime._pat_cube, lambda n: [(i+1)**3 for i in range(n)]),
+    "triangular": (sequentia_runtime._pat_triangular, lambda n: [(i+1)*(i+2)//2 for i in range(n)]),
+    "arithmetic": (lambda n: sequentia_runtime._pat_arithmetic(1, 3, n),
+                   lambda n: [1 + 3*i for i in range(n)]),
+    "geometric": (lambda n: sequentia_runtime._pat_geometric(1, 3, n),
+                  lambda n: [1 * 3**i for i in range(n)]),
+}
+
+# geometric 3 holds ~0.8 * n**2 bits in total; past this many elements a
+# single run needs gigabytes, so larger sizes are skipped for it
+BIG_INT_MAX_LENGTH = {"geometric": 20_000}
+
+def bench_patterns(args):
+    """Strength-reduced pattern generators against their per-element formulas"""
+    sizes = [int(s) for s in args.sizes.split(",")]
+    results = []
+    # Both sides build lists, so the timings compare the arithmetic alone
+    saved = sequentia_runtime.COMPACT_MIN_LENGTH
+    try:
+        sequentia_runtime.COMPACT_MIN_LENGTH = float("inf")
+        for pattern, (generator, formula) in PATTERN_FORMULAS.items():
+            for n in sizes:
+                if n > BIG_INT_MAX_LENGTH.get(pattern, n):
+                    continue
+                if generator(n) != formula(n):
+                    raise SystemExit(f"{pattern} {n}: generator output differs from the formula")
+                formula_t = best_of(lambda: formula(n), args.repeat)
+                generator_t = best_of(lambda: generator(n), args.repeat)
+                results.append({
+                    "pattern": pattern,
+                    "length": n,
+                    "formula_seconds": formula_t,
+                    "generator_seconds": generator_t,
+                    "speedup": formula_t / generator_t if generator_t else None,
+                })
+    finally:
+        sequentia_runtime.COMPACT_MIN_LENGTH = saved
+    return {"benchmark": "patterns", "results": results}
+
+def bench_reductions(args):
+    """Summing a pattern: accumulation loop vs streaming `sum` vs closed form"""
+    n = args.length
+    programs = {
+        "loop": f"x = pattern square {n}\ns = 0\nfor v in x {{\n    s = s + v\n}}\nprint s\n",
+        # `x + 0` hides the pattern, so the reduction has to stream over the values
+        "streaming": f"x = pattern square {n}\ny = x + 0\nprint sum y\n",
+        "closed_form": f"k = {n}\nx = pattern square k\nprint sum x\n",
+    }
+    result = {"benchmark": "reductions", "length": n}
+    for name, src in programs.items():
+        result[name + "_seconds"] = best_of(lambda: sc.run_source(src), args.repeat)
+    return result
+
+def bench_search(args):
+    """Finding a value in a pattern: scanning loop vs `in` over the values vs inverse"""
+    n = args.length
+    target = (n - 1) ** 2  # the second-to-last square: a near-full scan
+    programs = {
+        "loop": (f"x = pattern square {n}\nfound = 0 - 1\ni = 0\nfor v in x {{\n"
+                 f"    if v == {target} {{\n        found = i\n    }}\n    i = i + 1\n}}\nprint found\n"),
+        # `x + 0` hides the pattern, so the search has to scan the values
+        "scan": f"x = pattern square {n}\ny = x + 0\nprint indexof {target} in y\n",
+        "closed_form": f"k = {n}\nt = {target}\nx = pattern square k\nprint indexof t in x\n",
+    }
+    result = {"benchmark": "search", "length": n}
+    for name, src in programs.items():
+        result[name + "_seconds"] = best_of(lambda: sc.run_source(src), args.repeat)
+    return result
+
+def bench_masks(args):
+    """Summing and counting the elements above a threshold: loop idiom vs masks"""
+    n = args.length
+    head = f"x = pattern square {n}\nc = {(n // 2) ** 2}\n"
+    programs = {
+        "loop_sum": head + "s = 0\nfor v in x {\n    if v > c {\n        s = s + v\n    }\n}\nprint s\n",
+        "select_sum": head + "print sum x[x > c]\n",
+        "loop_count": head + "k = 0\nfor v in x {\n    if v > c {\n        k = k + 1\n    }\n}\nprint k\n",
+        "mask_count": head + "print sum (x > c)\n",
+    }
+    if sc.run_source(programs["loop_sum"]) != sc.run_source(programs["select_sum"]) \
+            or sc.run_source(programs["loop_count"]) != sc.run_source(programs["mask_count"]):
+        raise SystemExit("mask output differs from the loop output")
+    result = {"benchmark": "masks", "length": n}
+    for name, src in programs.items():
+        result[name + "_seconds"] = best_of(lambda: sc.run_source(src), args.repeat)
+    return result
+
+def bench_windows(args):
+    """Moving sums over a sequence: one slice per window vs the window_sum kernel"""
+    n, w = args.length // 10, args.width
+    head = f"x = pattern square {n}\ns = 0\n"
+    programs = {
+        "slices": head + (f"for i in pattern arithmetic 0, 1, {n - w + 1} {{\n"
+                          f"    s = s + sum x[i:i + {w}]\n}}\nprint s\n"),
+        "window_sum": head + f"print sum window_sum x, {w}\n",
+    }
+    if sc.run_source(programs["slices"]) != sc.run_source(programs["window_sum"]):
+        raise SystemExit("window_sum output differs from the slice loop")
+    result = {"benchmark": "windows", "length": n, "width": w}
+    for name, src in programs.items():
+        result[name + "_seconds"] = best_of(lambda: sc.run_source(src), args.repeat)
+    return result
+
+def bench_modular(args):
+    """Fast-growing patterns needed mod a prime: unbounded big ints reduced afterwards vs `mod`"""
+    n = args.length // 100
+    p = 1_000_000_007
+    result = {"benchmark": "modular", "length": n, "modulus": p}
+    for name, pattern in (("factorial", "factorial n"), ("fibonacci", "fibonacci n"),
+                          ("geometric", "geometric 3, 7, n")):
+        # In a separate statement the modulus cannot reach the pattern
+        unbounded = f"n = {n}\nx = pattern {pattern}\ny = x mod {p}\nprint sum y\n"
+        modular = f"n = {n}\ny = pattern {pattern} mod {p}\nprint sum y\n"
+        if sc.run_source(unbounded) != sc.run_source(modular):
+            raise SystemExit(f"{name}: modular result differs from the unbounded one")
+        result[name + "_unbounded_seconds"] = best_of(lambda: sc.run_source(unbounded), args.repeat)
+        result[name + "_modular_seconds"] = best_of(lambda: sc.run_source(modular), args.repeat)
+    return result
+
+# `e mod m` against `t = e` then `t mod m`: the second form keeps the modulus
+# out of e, so it reduces the unbounded result. Every case below is checked
+# with every modulus (M in a case stands for the modulus), with a loop
+# variable as the modulus and with a zero modulus, at each optimization level.
+MODULAR_SETUP = "x = pattern fibonacci 30\ny = pattern factorial 30\nz = pattern geometric 3, 7, 30\nk = 17\np = 97\n"
+MODULAR_CASES = [
+    # Patterns generated already reduced
+    "pattern factorial 40", "pattern fibonacci 80", "pattern geometric 3, 7, 25", "pattern square 20",
+    "pattern cube 20", "pattern triangular 20", "pattern arithmetic 5, 9, 20", "pattern square 0",
+    # Push-down through + - *
+    "x + y", "x - y", "y - z", "x * y", "(x - y) * z + 3", "x * k - y", "k * k * k - 5", "(k + 1) * (k - 30)",
+    "y[2:10] * x[5:13]",
+    # Scans
+    "cumsum y", "diff y", "window_sum (x * y), 3", "cumsum (y - z)", "diff (x * z)",
+    # Sums with and without a closed form
+    "sum (x * y)", "sum pattern factorial 30", "sum pattern square 100", "sum (x - y)", "sum cumsum y",
+    "sum window_sum z, 4", "sum (y[0:20] * 5)",
+    # Operations the modulus is not pushed through, and nested moduli
+    "x / 3 + y", "max y + sum x", "(y mod 13) * x", "(x * y mod M) + y", "pattern factorial 25 mod M * z",
+]
+MODULAR_MODULI = ["1000000007", "97", "1", "(0 - 7)", "(0 - 1000000007)", "2305843009213693951", "p"]
+
+def modular_programs():
+    """(description, `e mod m` program, `t = e` then `t mod m` program) for every check"""
+    for case in MODULAR_CASES:
+        for m in MODULAR_MODULI:
+            e = case.replace("M", m)
+            yield (f"({e}) mod {m}", MODULAR_SETUP + f"print ({e}) mod {m}\n",
+                   MODULAR_SETUP + f"t = {e}\nprint t mod {m}\n")
+        e = case.replace("M", "q")
+        loop = "for q in pattern arithmetic 2, 5, 4 {{\n    {}\n    print {} mod q\n}}\n"
+        yield (f"({e}) mod q", MODULAR_SETUP + loop.format("", f"({e})"),
+               MODULAR_SETUP + loop.format(f"t = {e}", "t"))
+        e = case.replace("M", "k")
+        yield (f"({e}) mod 0", MODULAR_SETUP + f"print ({e}) mod 0\n",
+               MODULAR_SETUP + f"t = {e}\nprint t mod 0\n")
+
+def bench_modcheck(args):
+    """Correctness of `mod` push-down: `e mod m` against the reduced unbounded result"""
+    def outcome(src, level):
+        try:
+            return sc.run_source(src, opt_level=level)
+        except Exception as e:
+            return f"{type(e).__name__}: {e}"
+    failures = []
+    checked = 0
+    for description, modular, unbounded in modular_programs():
+        for level in sorted(sc.OPT_PIPELINES):
+            checked += 1
+            got, expected = outcome(modular, level), outcome(unbounded, level)
+            if got != expected:
+                failures.append({"expression": description, "opt_level": level,
+                                 "modular": got, "unbounded": expected})
+    return {"benchmark": "modcheck", "checked": checked, "failures": failures}
+
+def bench_unroll(args):
+    """A small static inner loop run per outer trip: kept as a loop vs fully unrolled"""
+    src = (f"s = 0\nfor t in pattern arithmetic 0, 1, {args.trips * 100} {{\n"
+           f"    for v in pattern square 10 {{\n        s = s + v * 2 + t\n    }}\n}}\nprint s\n")
+
+    def compiled(max_trips):
+        ast = sc.Parser(sc.Lexer(src).tokens()).parse_program()
+        sc.SemanticAnalyzer(ast).check()
+        sc.LoopUnroller(ast, max_trips=max_trips).run()
+        return sc.compile_python(ast)
+
+    loop_code = compiled(0)
+    unrolled_code = compiled(sc.UNROLL_MAX_TRIPS)
+    loop_t = best_of(lambda: run_quiet(loop_code, sc.runtime_namespace()), args.repeat)
+    unrolled_t = best_of(lambda: run_quiet(unrolled_code, sc.runtime_namespace()), args.repeat)
+    return {
+        "benchmark": "unroll",
+        "outer_trips": args.trips * 100,
+        "loop_seconds": loop_t,
+        "unrolled_seconds": unrolled_t,
+        "speedup": loop_t / unrolled_t if unrolled_t else None,
+    }
+
+def bench_opt_levels(args):
+    """Compile time, execution time and per-pass cost of a mixed program at -O0, -O1 and -O2"""
+    src = gen_mixed_program(args.statements) + (
+        f"s = 0\nfor t in pattern arithmetic 0, 1, {args.trips * 100} {{\n"
+        f"    for v in pattern square 10 {{\n        s = s + v * 2 + t\n    }}\n}}\nprint s\n")
+    outputs = set()
+    result = {"benchmark": "optlevels", "statements": args.statements}
+    for level in sorted(sc.OPT_PIPELINES):
+        best = None
+        for _ in range(args.repeat):
+            stats = sc.PipelineStats(trace_memory=False)
+            outputs.add(sc.compile_and_run(src, stats=stats, opt_level=level)[-1])
+            if best is None or stats.total_wall < best.total_wall:
+                best = stats
+        passes = {}
+        for p in best.passes:
+            passes[p.name] = passes.get(p.name, 0.0) + p.wall
+        result[f"O{level}"] = {
+            "compile_seconds": best.total_wall - best.get("exec").wall,
+            "exec_seconds": best.get("exec").wall,
+            "optimizer_seconds": best.get("optimizer").wall,
+            "tac_after": best.passes[-1].after if best.passes else None,
+            "pass_seconds": passes,
+        }
+    if len(outputs) != 1:
+        raise SystemExit("optimization levels disagree on the program output")
+    return result
+
+def bench_artifacts(args):
+    """Loading a saved binary artifact vs recompiling the program from source"""
+    results = []
+    for statements in (args.statements // 10, args.statements, args.statements * 4):
+        src = gen_mixed_program(statements)
+        data = sc.dumps_artifact(sc.build_artifact(src))
+        if sc.loads_artifact(data).run() != sc.compile_program(src).run():
+            raise SystemExit("artifact output differs from the recompiled program")
+        compile_t = best_of(lambda: sc.compile_program(src), args.repeat)
+        build_t = best_of(lambda: sc.dumps_artifact(sc.build_artifact(src)), args.repeat)
+        load_t = best_of(lambda: sc.loads_artifact(data), args.repeat)
+        results.append({
+            "statements": statements,
+            "source_bytes": len(src),
+            "artifact_bytes": len(data),
+            "tac_instructions": len(sc.loads_artifact(data).tac),
+            "recompile_seconds": compile_t,
+            "build_and_save_seconds": build_t,
+            "load_seconds": load_t,
+            "speedup": compile_t / load_t if load_t else None,
+        })
+    return {"benchmark": "artifacts", "results": results}
+
+def bench_reactive(args):
+    """Rerunning a program after editing `n`: full re-execution vs ReactiveSession"""
+    n = args.length
+    program = ("n = {n}\n"
+               f"f = pattern factorial {n // 200}\nprint sum f mod 1000000007\n"
+               f"a = pattern square {n}\nb = a * 3 + 1\nprint max b\n"
+               f"c = pattern fibonacci {n // 100}\nd = c + 1\nprint len d\n"
+               "x = pattern square n\ny = x * 2\nprint sum y\n")
+    before, after = program.format(n=1000), program.format(n=2000)
+    full_t = best_of(lambda: sc.run_source(after), args.repeat)
+    reactive_t = None
+    for _ in range(args.repeat):
+        session = sc.ReactiveSession()
+        session.run(before)
+        start = time.perf_counter()
+        out = session.run(after)
+        elapsed = time.perf_counter() - start
+        if reactive_t is None or elapsed < reactive_t:
+            reactive_t = elapsed
+    if out != sc.run_source(after):
+        raise SystemExit("reactive output differs from a full run")
+    return {
+        "benchmark": "reactive",
+        "length": n,
+        "statements": len(sc.Parser(sc.Lexer(after).tokens()).parse_program().stmts),
+        "reexecuted": len(session.executed),
+        "full_seconds": full_t,
+        "reactive_seconds": reactive_t,
+        "speedup": full_t / reactive_t if reactive_t else None,
+    }
+
+def bench_parallel(args):
+    """Independent heavy statements: source order on one core vs the statement scheduler"""
+    n = args.length
+    src = (f"n = {n}\na = pattern square n\nb = pattern cube n\nc = pattern triangular n\n"
+           f"d = pattern arithmetic 3, 7, n\ne = pattern geometric 5, 1, n\n"
+           f"print max (a + b + c + d + e)\n")
+    workers = args.workers or os.cpu_count() or 1
+    serial_out = sc.run_source(src)
+    sc.run_source(src, workers=workers)  # start the pool outside the timing
+    parallel_out = sc.run_source(src, workers=workers)
+    if parallel_out != serial_out:
+        raise SystemExit("parallel output differs from serial output")
+    serial_t = best_of(lambda: sc.run_source(src), args.repeat)
+    parallel_t = best_of(lambda: sc.run_source(src, workers=workers), args.repeat)
+    return {
+        "benchmark": "parallel",
+        "length": n,
+        "workers": workers,
+        "cpus": os.cpu_count(),
+        "serial_seconds": serial_t,
+        "parallel_seconds": parallel_t,
+        "speedup": serial_t / parallel_t if parallel_t else None,
+    }
+
+def bench_sweep(args):
+    """K runs with different scalar inputs: templated source per run vs compile once"""
+    body = gen_mixed_program(args.statements) + "y = pattern arithmetic start, ratio, n\nprint sum y\n"
+    runs = [{"n": 100 + k, "start": k, "ratio": 3} for k in range(args.runs)]
+
+    start = time.perf_counter()
+    templated = [sc.run_source("".join(f"{name} = {value}\n" for name, value in r.items()) + body)
+                 for r in runs]
+    templated_t = time.perf_counter() - start
+
+    start = time.perf_counter()
+    program = sc.compile_program(body, ["n", "start", "ratio"])
+    compiled = [program.run(r) for r in runs]
+    compiled_t = time.perf_counter() - start
+
+    summary = program.run_many(runs, workers=args.workers)
+    if compiled != templated or [r["output"] for r in summary["runs"]] != templated:
+        raise SystemExit("compiled runs differ from templated runs")
+    return {
+        "benchmark": "sweep",
+        "statements": args.statements,
+        "runs": args.runs,
+        "templated_seconds": templated_t,
+        "compiled_seconds": compiled_t,
+        "compile_once_seconds": program.compile_seconds,
+        "pool_seconds": summary["wall_seconds"],
+        "speedup": templated_t / compiled_t if compiled_t else None,
+    }
+
+def profile_program(src, repeat):
+    """Best per-phase wall time (seconds) over `repeat` full pipeline runs"""
+    best = {}
+    for _ in range(repeat):
+        stats = sc.PipelineStats(trace_memory=False)
+        sc.compile_and_run(src, stats)
+        for phase in stats.phases:
+            if phase.name not in best or phase.wall < best[phase.name]:
+                best[phase.name] = phase.wall
+    return best
+
+def run_suite(axes, scale=1.0, repeat=3, log=None):
+    results = []
+    for axis in axes:
+        gen, sizes = AXES[axis]
+        for size in sizes:
+            n = max(1, int(size * scale))
+            phases = profile_program(gen(n), repeat)
+            record = {"axis": axis, "size": n, "phases": phases, "total": sum(phases.values())}
+            results.append(record)
+            if log:
+                log(f"{axis:<20} {n:>8}  total {record['total'] * 1000:10.3f} ms"
+                    f"  exec {phases.get('exec', 0) * 1000:10.3f} ms")
+    return results
+
+def compare_to_baseline(results, baseline, threshold):
+    """Pair results with baseline entries; flag totals slower than `threshold` x"""
+    base = {(r["axis"], r["size"]): r for r in baseline["results"]}
+    rows = []
+    for r in results:
+        b = base.get((r["axis"], r["size"]))
+        if b is None:
+            continue
+        ratio = r["total"] / b["total"] if b["total"] else None
+        phase_ratios = {name: r["phases"][name] / b["phases"][name]
+                        for name in r["phases"] if b["phases"].get(name)}
+        rows.append({"axis": r["axis"], "size": r["size"], "ratio": ratio,
+                     "phase_ratios": phase_ratios,
+                     "regression": ratio is not None and ratio > threshold})
+    return rows
+
+def bench_suite(args):
+    axes = list(AXES) if not args.axes else [a.strip() for a in args.axes.split(",") if a.strip()]
+    unknown = [a for a in axes if a not in AXES]
+    if unknown:
+        raise SystemExit("Unknown axis: " + ", ".join(unknown) + " (choose from " + ", ".join(AXES) + ")")
+    log = (lambda line: print(line, file=sys.stderr))
+    report = {
+        "benchmark": "suite",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "scale": args.scale,
+        "repeat": args.repeat,
+        "results": run_suite(axes, args.scale, args.repeat, log),
+    }
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report["comparison"] = compare_to_baseline(report["results"], baseline, args.threshold)
+        report["regressions"] = sum(1 for row in report["comparison"] if row["regression"])
+        for row in report["comparison"]:
+            flag = "  REGRESSION" if row["regression"] else ""
+            print(f"{row['axis']:<20} {row['size']:>8}  x{row['ratio']:.2f}{flag}", file=sys.stderr)
+    return report
+
+
+BENCHMARKS = {
+    "lean": bench_lean,
+    "compile": bench_compile,
+    "loops": bench_loops,
+    "slices": bench_slices,
+    "memory": bench_memory,
+    "compact": bench_compact,
+    "patterns": bench_patterns,
+    "reductions": bench_reductions,
+    "search": bench_search,
+    "masks": bench_masks,
+    "windows": bench_windows,
+    "modular": bench_modular,
+    "modcheck": bench_modcheck,
+    "unroll": bench_unroll,
+    "optlevels": bench_opt_levels,
+    "artifacts": bench_artifacts,
+    "reactive": bench_reactive,
+    "parallel": bench_parallel,
+    "sweep": bench_sweep,
+    "suite": bench_suite,
+}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Sequentia compiler benchmarks")
+    ap.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    ap.add_argument("--statements", type=int, default=5000,
+                    help="lean, compile, optlevels, artifacts, sweep: statements in the generated program")
+    ap.add_argument("--trips", type=int, default=500,
+                    help="loops: iterations of each nested loop; slices: number of windows; "
+                         "unroll, optlevels: hundreds of outer trips")
+    ap.add_argument("--length", type=int, default=1_000_000, help="slices, memory, compact, reductions, search, masks, parallel, reactive: sequence length "
+                         "(windows uses a tenth of it, modular a hundredth)")
+    ap.add_argument("--sizes", default="1000,10000,100000,1000000,10000000",
+                    help="patterns: comma-separated sequence lengths")
+    ap.add_argument("--width", type=int, default=100, help="windows: elements per window")
+    ap.add_argument("--stages", type=int, default=5, help="memory: intermediates in the pipeline")
+    ap.add_argument("--workers", type=int, default=None, help="parallel, sweep: worker processes (default: CPU count)")
+    ap.add_argument("--runs", type=int, default=200, help="sweep: runs with different parameter values")
+    ap.add_argument("--repeat", type=int, default=3, help="runs per measurement (best is reported)")
+    ap.add_argument("--axes", default=None, help="suite: comma-separated axes (default all: " + ",".join(AXES) + ")")
+    ap.add_argument("--scale", type=float, default=1.0, help="suite: multiply every workload size by this factor")
+    ap.add_argument("--out", default=None, help="write the JSON results to this file instead of stdout")
+    ap.add_argument("--baseline", default=None, help="suite: compare against results saved with --save-baseline")
+    ap.add_argument("--save-baseline", default=None, help="suite: also save these results as a baseline")
+    ap.add_argument("--threshold", type=float, default=1.25,
+                    help="suite: slowdown ratio counted as a regression (default 1.25)")
+    args = ap.parse_args(argv)
+    result = BENCHMARKS[args.benchmark](args)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
+    if result.get("regressions") or result.get("failures"):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,15 @@
 import sys
+import copy
 import io, contextlib
+import time, tracemalloc
+import math
+import operator
+import ast as pyast
+from array import array
 from typing import List, Tuple, Dict, Any
 
+import sequentia_runtime
+
 
 # --------------------------
 # Lexer
@@ -23,6 +31,13 @@ KEYWORDS = {
     'in': 'IN_KW'
 }
 
+# Contextual keywords: `sum x` is a reduction, but `sum` alone is still a
+# valid variable name (it is only a reduction when an operand follows)
+REDUCTIONS = ('sum', 'max', 'min', 'len')
+INDEXOF = 'indexof'  # `indexof v in x`, contextual in the same way
+SCANS = ('cumsum', 'diff', 'window_sum')  # sequence -> sequence; `window_sum x, w` takes a width
+MODULO = 'mod'  # `a mod m`, an operator only between two operands
+
 SINGLE = {
     '=': 'ASSIGN',
     ',': 'COMMA',
@@ -138,19 +153,23 @@ class Lexer:
 # Abstract Syntax Tree (AST)
 
 class Program: 
-    def __init__(self, stmts): self.stmts = stmts
+    def __init__(self, stmts, params=()):
+        self.stmts = stmts
+        self.params = list(params)  # scalar names bound from outside at run time
     def __repr__(self): return f"Program({len(self.stmts)} statements)"
 
 class Assign:
     def __init__(self, name, expr): 
         self.name = name
         self.expr = expr
+        self.line = None  # source line of the statement; set by Parser
     def __repr__(self): return f"Assign({self.name}, {self.expr})"
 
 class PatternExpr:
     def __init__(self, pattern_name, args):
         self.pattern_name = pattern_name
         self.args = args
+        self.modulus = None  # generate elements reduced mod this; set by SemanticAnalyzer
     def __repr__(self): return f"PatternExpr({self.pattern_name}, {self.args})"
 
 class NumberExpr:
@@ -165,6 +184,8 @@ class ArrayAccessExpr:
     def __init__(self, name, index_expr):
         self.name = name
         self.index_expr = index_expr
+        self.select = False  # index is a mask (x[x > 25]); set by SemanticAnalyzer
+        self.filter = None   # (op, side of the mask holding the scalar) for x[x op scalar]
     def __repr__(self): return f"ArrayAccessExpr({self.name}, {self.index_expr})"
 
 class SliceExpr:
@@ -174,11 +195,39 @@ class SliceExpr:
         self.end = end
     def __repr__(self): return f"SliceExpr({self.name}, {self.start}, {self.end})"
 
+class ReduceExpr:
+    def __init__(self, op, operand):
+        self.op = op
+        self.operand = operand
+        self.closed_form = None  # (pattern, constant args) when SemanticAnalyzer knows the source
+        self.value = None        # constant result when SemanticAnalyzer could fold it
+    def __repr__(self): return f"ReduceExpr({self.op}, {self.operand})"
+
+class ScanExpr:
+    def __init__(self, op, operand, width=None):
+        self.op = op            # 'cumsum', 'diff' or 'window_sum'
+        self.operand = operand
+        self.width = width      # window_sum only
+    def __repr__(self):
+        if self.width is not None:
+            return f"ScanExpr({self.op}, {self.operand}, {self.width})"
+        return f"ScanExpr({self.op}, {self.operand})"
+
+class SearchExpr:
+    def __init__(self, op, item, operand):
+        self.op = op            # 'in' or 'indexof'
+        self.item = item
+        self.operand = operand
+        self.closed_form = None  # (pattern, constant args) when SemanticAnalyzer knows the source
+        self.value = None        # constant result when the item is constant too
+    def __repr__(self): return f"SearchExpr({self.item} {self.op} {self.operand})"
+
 class BinOp:
     def __init__(self, left, op, right):
         self.left = left
         self.op = op
         self.right = right
+        self.mask = False  # element-wise comparison of a sequence; set by SemanticAnalyzer
     def __repr__(self): return f"BinOp({self.left}, '{self.op}', {self.right})"
 
 class IfStmt:
@@ -186,6 +235,7 @@ class IfStmt:
         self.condition = condition
         self.true_block = true_block
         self.false_block = false_block
+        self.line = None
     def __repr__(self): return f"IfStmt({self.condition}, {len(self.true_block)} stmts, {len(self.false_block) if self.false_block else 0} else stmts)"
 
 class ForStmt:
@@ -193,12 +243,15 @@ class ForStmt:
         self.iterator = iterator
         self.source = source
         self.body = body
+        self.static_source = None  # (pattern, constant args, start, stop) when SemanticAnalyzer knows the elements
+        self.line = None
     def __repr__(self): return f"ForStmt({self.iterator} in {self.source}, {len(self.body)} stmts)"
 
 class Print:
     def __init__(self, name, index_expr=None):
         self.name = name
         self.index_expr = index_expr
+        self.line = None
     def __repr__(self): return f"Print({self.name}, {self.index_expr})"
 
 # --------------------------
@@ -209,6 +262,7 @@ class Parser:
     def __init__(self, toks):
         self.toks = toks
         self.pos = 0
+        self.line = 1  # source line of the next token: one more than the NEWLINEs consumed
 
     def peek(self):
         return self.toks[self.pos]
@@ -216,6 +270,8 @@ class Parser:
     def advance(self):
         tok = self.peek()
         self.pos += 1
+        if tok[0] == 'NEWLINE':
+            self.line += 1
         return tok
 
     def expect(self, t):
@@ -236,29 +292,47 @@ class Parser:
         return Program(stmts)
 
     def parse_stmt(self):
+        line = self.line
         tok = self.peek()
         if tok[0] == 'ID':
-            return self.parse_assign()
-        if tok[0] == 'PRINT_KW':
-            return self.parse_print()
-        if tok[0] == 'IF_KW':
-            return self.parse_if()
-        if tok[0] == 'FOR_KW':
-            return self.parse_for()
-        raise Exception("Invalid statement start " + str(tok))
+            stmt = self.parse_assign()
+        elif tok[0] == 'PRINT_KW':
+            stmt = self.parse_print()
+        elif tok[0] == 'IF_KW':
+            stmt = self.parse_if()
+        elif tok[0] == 'FOR_KW':
+            stmt = self.parse_for()
+        else:
+            raise Exception("Invalid statement start " + str(tok))
+        stmt.line = line
+        return stmt
 
     def parse_expr(self):
         return self.parse_comparison()
 
     def parse_comparison(self):
-        left = self.parse_additive()
+        left = self.parse_modulo()
         
         tok = self.peek()
         if tok[0] in ['EQ', 'NEQ', 'LT', 'GT', 'LEQ', 'GEQ']:
             op = self.advance()[1]
-            right = self.parse_additive()
+            right = self.parse_modulo()
             return BinOp(left, op, right)
         
+        if tok[0] == 'IN_KW':
+            self.advance()
+            return SearchExpr('in', left, self.parse_modulo())
+        
+        return left
+
+    def parse_modulo(self):
+        # Looser than + and -, as in `a + b mod m`, so `pattern factorial n mod m` reduces the pattern
+        left = self.parse_additive()
+        
+        while self.peek() == ('ID', MODULO):
+            self.advance()
+            left = BinOp(left, MODULO, self.parse_additive())
+        
         return left
 
     def parse_additive(self):
@@ -302,13 +376,35 @@ class Parser:
         if tok[0] == 'NUMBER':
             return NumberExpr(int(self.advance()[1]))
 
+        if (tok[0] == 'ID' and tok[1] in REDUCTIONS
+                and self.toks[self.pos + 1][0] in ('ID', 'PATTERN_KW', 'LPAREN')):
+            self.advance()
+            return ReduceExpr(tok[1], self.parse_primary())
+
+        if (tok[0] == 'ID' and tok[1] in SCANS
+                and self.toks[self.pos + 1][0] in ('ID', 'PATTERN_KW', 'LPAREN')):
+            self.advance()
+            operand = self.parse_primary()
+            if tok[1] != 'window_sum':
+                return ScanExpr(tok[1], operand)
+            self.expect('COMMA')
+            return ScanExpr(tok[1], operand, self.parse_additive())
+
+        if (tok[0] == 'ID' and tok[1] == INDEXOF
+                and self.toks[self.pos + 1][0] in ('ID', 'NUMBER', 'PATTERN_KW', 'LPAREN')):
+            self.advance()
+            item = self.parse_additive()
+            self.expect('IN_KW')
+            return SearchExpr('indexof', item, self.parse_primary())
+
         if tok[0] == 'ID':
             name = self.advance()[1]
             if self.peek()[0] == 'LBRACKET':
                 self.advance()
                 start_expr = None
                 if self.peek()[0] != 'COLON':
-                    start_expr = self.parse_additive()
+                    # A full expression, so x[x > 25] selects with a mask
+                    start_expr = self.parse_expr()
                 
                 if self.peek()[0] == 'COLON':
                     self.advance()
@@ -411,12 +507,16 @@ class Parser:
 # --------------------------
 
 class Symbol:
-    def __init__(self, name, sym_type, length=None, pattern=None, args=None):
+    def __init__(self, name, sym_type, length=None, pattern=None, args=None, value=None, const_args=None,
+                 window=None):
         self.name = name
         self.type = sym_type
         self.length = length
         self.pattern = pattern
         self.args = args
+        self.value = value            # ints: constant value, if known here
+        self.const_args = const_args  # arrays: constant pattern arguments, if known here
+        self.window = window          # arrays: (pattern, args, start, stop) of a constant slice of a pattern
     
     def __repr__(self):
         if self.type == "array":
@@ -426,9 +526,12 @@ class Symbol:
 class SemanticAnalyzer:
     def __init__(self, ast):
         self.ast = ast
-        self.sym = {}
+        # Parameters are ints whose values are only known at run time
+        self.sym = {name: Symbol(name, "int") for name in ast.params}
 
     def check(self):
+        if self.ast.params:
+            self.check_params()
         for stmt in self.ast.stmts:
             if isinstance(stmt, Assign):
                 self.check_assign(stmt)
@@ -439,6 +542,17 @@ class SemanticAnalyzer:
             elif isinstance(stmt, ForStmt):
                 self.check_for(stmt)
 
+    def check_params(self):
+        """A parameter assigned before it is read on every path would silently ignore its binding"""
+        assigned = assigned_names(self.ast.stmts) & set(self.ast.params)
+        if not assigned:
+            return
+        live_in = LivenessAnalyzer(self.ast).block_live(self.ast.stmts, set())
+        ignored = [name for name in self.ast.params if name in assigned and name not in live_in]
+        if ignored:
+            raise Exception("Parameter(s) assigned before they are read, so their bound values would be "
+                            "ignored: " + ", ".join(ignored))
+
     def eval_scalar(self, expr):
         if isinstance(expr, NumberExpr): return expr.value
         if isinstance(expr, IDExpr):
@@ -452,16 +566,11 @@ class SemanticAnalyzer:
         expr = stmt.expr
 
         if isinstance(expr, NumberExpr):
-            self.sym[stmt.name] = Symbol(stmt.name, "int")
+            self.sym[stmt.name] = Symbol(stmt.name, "int", value=expr.value)
             return
 
         if isinstance(expr, ArrayAccessExpr):
-            if expr.name not in self.sym:
-                raise Exception("Undefined array " + expr.name)
-            if self.sym[expr.name].type != "array":
-                raise Exception(expr.name + " is not an array")
-            self.check_expr_type(expr.index_expr, "int")
-            self.sym[stmt.name] = Symbol(stmt.name, "int")
+            self.sym[stmt.name] = Symbol(stmt.name, self.check_access(expr))
             return
 
         if isinstance(expr, SliceExpr):
@@ -487,7 +596,8 @@ class SemanticAnalyzer:
                 if src_len is not None:
                     computed_length = src_len - expr.start.value
             
-            self.sym[stmt.name] = Symbol(stmt.name, "array", length=computed_length)
+            self.sym[stmt.name] = Symbol(stmt.name, "array", length=computed_length,
+                                         window=self.static_source(expr))
             return
 
         if isinstance(expr, IDExpr):
@@ -495,12 +605,14 @@ class SemanticAnalyzer:
                 raise Exception("Undefined source variable " + expr.name)
             src_sym = self.sym[expr.name]
             if src_sym.type == "int":
-                self.sym[stmt.name] = Symbol(stmt.name, "int")
+                self.sym[stmt.name] = Symbol(stmt.name, "int", value=src_sym.value)
             else:
                 self.sym[stmt.name] = Symbol(stmt.name, "array", 
                                              length=src_sym.length,
                                              pattern=src_sym.pattern,
-                                             args=src_sym.args)
+                                             args=src_sym.args,
+                                             const_args=src_sym.const_args,
+                                             window=src_sym.window)
             return
 
         if isinstance(expr, BinOp):
@@ -516,7 +628,8 @@ class SemanticAnalyzer:
                 elif isinstance(expr.right, IDExpr) and expr.right.name in self.sym:
                     if self.sym[expr.right.name].type == "array":
                         length = self.sym[expr.right.name].length
-            self.sym[stmt.name] = Symbol(stmt.name, result_type, length=length)
+            value = self.const_value(expr) if result_type == "int" else None
+            self.sym[stmt.name] = Symbol(stmt.name, result_type, length=length, value=value)
             return
 
         if isinstance(expr, PatternExpr):
@@ -531,25 +644,167 @@ class SemanticAnalyzer:
                         raise Exception("Pattern argument must be integer variable")
                     lengths.append(None)
                 elif isinstance(arg, ArrayAccessExpr):
-                    if arg.name not in self.sym:
-                        raise Exception("Undefined array " + arg.name)
-                    if self.sym[arg.name].type != "array":
-                        raise Exception(arg.name + " is not an array")
-                    if isinstance(arg.index_expr, IDExpr):
-                        if arg.index_expr.name not in self.sym:
-                            raise Exception("Undefined index variable " + arg.index_expr.name)
-                        if self.sym[arg.index_expr.name].type != "int":
-                            raise Exception("Index must be integer")
+                    if self.check_access(arg) != "int":
+                        raise Exception("Pattern argument must be an integer, not a masked selection")
                     lengths.append(None)
+                elif isinstance(arg, ReduceExpr):
+                    self.check_reduce(arg)
+                    lengths.append(arg.value)
                 else:
                     raise Exception("Invalid pattern argument")
 
+            const_args = [self.const_value(arg) for arg in expr.args]
             self.sym[stmt.name] = Symbol(stmt.name, "array", length=lengths[-1],
-                                         pattern=expr.pattern_name, args=expr.args)
+                                         pattern=expr.pattern_name, args=expr.args,
+                                         const_args=None if None in const_args else const_args)
+            return
+
+        if isinstance(expr, ReduceExpr):
+            self.check_reduce(expr)
+            self.sym[stmt.name] = Symbol(stmt.name, "int", value=expr.value)
+            return
+
+        if isinstance(expr, SearchExpr):
+            self.check_search(expr)
+            self.sym[stmt.name] = Symbol(stmt.name, "int", value=expr.value)
+            return
+
+        if isinstance(expr, ScanExpr):
+            self.check_scan(expr)
+            self.sym[stmt.name] = Symbol(stmt.name, "array", length=self.scan_length(expr))
             return
 
         raise Exception("Invalid assignment expression")
 
+    def check_access(self, expr):
+        """Type x[i] (an element) or x[mask] (the elements where the mask is nonzero)"""
+        if expr.name not in self.sym:
+            raise Exception("Undefined array " + expr.name)
+        if self.sym[expr.name].type != "array":
+            raise Exception(expr.name + " is not an array")
+        expr.select = self.check_expr_type(expr.index_expr, None) == "array"
+        expr.filter = None
+        mask = expr.index_expr
+        if expr.select and isinstance(mask, BinOp) and mask.mask:
+            for seq, side, op in ((mask.left, "right", mask.op), (mask.right, "left", MIRRORED[mask.op])):
+                if (isinstance(seq, IDExpr) and seq.name == expr.name
+                        and self.check_expr_type(getattr(mask, side), None) == "int"):
+                    expr.filter = (op, side)
+                    break
+        return "array" if expr.select else "int"
+
+    def check_reduce(self, expr):
+        """Type a reduction; fold it when its source pattern and arguments are known"""
+        self.check_expr_type(expr.operand, "array")
+        expr.closed_form = self.pattern_source(expr.operand)
+        if expr.closed_form is not None:
+            expr.value = fold_reduction(expr.op, *expr.closed_form)
+        return "int"
+
+    def check_search(self, expr):
+        """Type `v in x` / `indexof v in x`; fold it when the source pattern and v are known"""
+        self.check_expr_type(expr.item, "int")
+        self.check_expr_type(expr.operand, "array")
+        expr.closed_form = self.pattern_source(expr.operand)
+        item = self.const_value(expr.item)
+        if expr.closed_form is not None and item is not None:
+            index = sequentia_runtime._pattern_index(*expr.closed_form, item)
+            expr.value = index >= 0 if expr.op == 'in' else index
+        return "int"
+
+    def check_scan(self, expr):
+        """Type cumsum / diff / window_sum: a sequence in, a sequence out"""
+        self.check_expr_type(expr.operand, "array")
+        if expr.op == 'window_sum':
+            self.check_expr_type(expr.width, "int")
+            width = self.const_value(expr.width)
+            if width is not None and width < 1:
+                raise Exception(f"window_sum width must be at least 1, got {width}")
+        return "array"
+
+    def scan_length(self, expr):
+        """Length of a scan's result when its operand's length is known here"""
+        n = None
+        if isinstance(expr.operand, IDExpr):
+            n = self.sym[expr.operand.name].length
+        elif isinstance(expr.operand, PatternExpr):
+            n = self.const_value(expr.operand.args[-1])
+        elif isinstance(expr.operand, ScanExpr):
+            n = self.scan_length(expr.operand)
+        if n is None:
+            return None
+        n = max(0, n)
+        if expr.op == 'cumsum':
+            return n
+        if expr.op == 'diff':
+            return max(0, n - 1)
+        width = self.const_value(expr.width)
+        return None if width is None else max(0, n - width + 1)
+
+    def pattern_source(self, expr):
+        """(pattern, constant args) of an array expression, if known here"""
+        source = None
+        if isinstance(expr, PatternExpr):
+            args = [self.const_value(a) for a in expr.args]
+            if None not in args:
+                source = (expr.pattern_name, args)
+        elif isinstance(expr, IDExpr):
+            sym = self.sym[expr.name]
+            if sym.const_args is not None:
+                source = (sym.pattern, sym.const_args)
+        if source is not None and len(source[1]) == PATTERN_ARITY.get(source[0]):
+            return source
+        return None
+
+    def static_source(self, expr):
+        """(pattern, constant args, start, stop) when the elements of an array are known here"""
+        if isinstance(expr, str):
+            expr = IDExpr(expr)
+        if isinstance(expr, IDExpr) and self.sym[expr.name].window is not None:
+            return self.sym[expr.name].window
+        source = self.pattern_source(expr)
+        if source is not None:
+            return source[0], source[1], 0, max(0, source[1][-1])
+        if isinstance(expr, SliceExpr):
+            parent = self.static_source(expr.name)
+            start = self.const_value(expr.start) if expr.start else None
+            end = self.const_value(expr.end) if expr.end else None
+            if parent is None or (expr.start and start is None) or (expr.end and end is None):
+                return None
+            pattern, args, lo, hi = parent
+            start, end, _ = slice(start, end).indices(hi - lo)
+            return pattern, args, lo + start, lo + max(start, end)
+        return None
+
+    def const_value(self, expr):
+        """Value of a scalar expression if it is a compile-time constant, else None"""
+        if isinstance(expr, NumberExpr):
+            return expr.value
+        if isinstance(expr, IDExpr):
+            sym = self.sym.get(expr.name)
+            return sym.value if sym is not None and sym.type == "int" else None
+        if isinstance(expr, (ReduceExpr, SearchExpr)):
+            return expr.value
+        if isinstance(expr, BinOp) and expr.op in ARITH_OPS:
+            left = self.const_value(expr.left)
+            right = self.const_value(expr.right)
+            if left is None or right is None:
+                return None
+            if expr.op == '+': return left + right
+            if expr.op == '-': return left - right
+            if expr.op == '*': return left * right
+            if right == 0: return None
+            return left // right if expr.op == '/' else left % right
+        return None
+
+    def forget_values(self, names):
+        """Drop constant facts about names assigned in a block that may not run"""
+        for name in names:
+            if name in self.sym:
+                self.sym[name].value = None
+                self.sym[name].const_args = None
+                self.sym[name].window = None
+
     def check_print(self, stmt):
         if stmt.name == "_expr_":
             self.check_expr_type(stmt.index_expr, None)
@@ -558,8 +813,11 @@ class SemanticAnalyzer:
         if stmt.name not in self.sym:
             raise Exception("Undefined variable in print " + stmt.name)
 
-        if stmt.index_expr:
-            self.check_expr_type(stmt.index_expr, "int")
+        if stmt.index_expr and self.check_expr_type(stmt.index_expr, None) == "array":
+            # `print x[mask]` prints a sequence, like any other expression
+            stmt.index_expr = ArrayAccessExpr(stmt.name, stmt.index_expr)
+            stmt.name = "_expr_"
+            self.check_access(stmt.index_expr)
 
     def check_expr_type(self, expr, expected_type=None):
         if isinstance(expr, NumberExpr):
@@ -569,12 +827,7 @@ class SemanticAnalyzer:
                 raise Exception("Undefined variable " + expr.name)
             actual = self.sym[expr.name].type
         elif isinstance(expr, ArrayAccessExpr):
-            if expr.name not in self.sym:
-                raise Exception("Undefined array " + expr.name)
-            if self.sym[expr.name].type != "array":
-                raise Exception(expr.name + " is not an array")
-            self.check_expr_type(expr.index_expr, "int")
-            actual = "int"
+            actual = self.check_access(expr)
         elif isinstance(expr, SliceExpr):
             if expr.name not in self.sym:
                 raise Exception("Undefined array " + expr.name)
@@ -591,6 +844,12 @@ class SemanticAnalyzer:
             for arg in expr.args:
                 self.check_expr_type(arg, None)
             actual = "array"
+        elif isinstance(expr, ReduceExpr):
+            actual = self.check_reduce(expr)
+        elif isinstance(expr, SearchExpr):
+            actual = self.check_search(expr)
+        elif isinstance(expr, ScanExpr):
+            actual = self.check_scan(expr)
         else:
             raise Exception("Unknown expression type")
         
@@ -604,14 +863,66 @@ class SemanticAnalyzer:
         right_type = self.check_expr_type(expr.right, None)
         
         if expr.op in ['==', '!=', '<', '>', '<=', '>=']:
-            return "int"
+            # Comparing a sequence gives a mask: one 0/1 per element
+            expr.mask = left_type == "array" or right_type == "array"
+            return "array" if expr.mask else "int"
+        
+        if expr.op == MODULO:
+            self.check_modulo(expr, right_type)
         
         if left_type == "array" or right_type == "array":
             return "array"
         return "int"
 
+    def check_modulo(self, expr, modulus_type):
+        """Push `e mod m` down into e so its intermediates stay below m.
+
+        + - *, sums, cumsum/diff/window_sum and pattern generators commute
+        with reduction mod m, so each is rebuilt on reduced operands and
+        reduced itself, and patterns generate their elements already
+        reduced. Anything else (division, max, comparisons, variables) is
+        computed exactly as before, so the result equals the unbounded one.
+        Only a literal or a scalar variable modulus is pushed: it is read
+        again at every level.
+        """
+        m = expr.right
+        if modulus_type != "int" or not isinstance(m, (NumberExpr, IDExpr)):
+            return
+        left = self.push_modulus(expr.left, m)
+        if isinstance(left, BinOp) and left.op == MODULO and left.right is m:
+            left = left.left  # `expr` reduces it already
+        expr.left = left
+
+    def push_modulus(self, expr, m):
+        """An expression congruent to `expr` mod m, built from reduced parts"""
+        if isinstance(expr, NumberExpr) and isinstance(m, NumberExpr) and m.value != 0:
+            return NumberExpr(expr.value % m.value)
+        if isinstance(expr, BinOp) and expr.op in ('+', '-', '*'):
+            expr.left = self.push_modulus(expr.left, m)
+            expr.right = self.push_modulus(expr.right, m)
+            return BinOp(expr, MODULO, m)
+        if isinstance(expr, BinOp) and expr.op == MODULO and same_modulus(expr.right, m):
+            return self.push_modulus(expr.left, m)
+        if isinstance(expr, PatternExpr) and expr.pattern_name in PATTERN_ARITY:
+            expr.modulus = m
+            return expr
+        if isinstance(expr, ScanExpr):
+            expr.operand = self.push_modulus(expr.operand, m)
+            return BinOp(expr, MODULO, m)
+        if (isinstance(expr, ReduceExpr) and expr.op == "sum" and expr.value is None
+                and isinstance(expr.operand, (BinOp, PatternExpr, ScanExpr))):
+            source = expr.closed_form[0] if expr.closed_form else getattr(expr.operand, "pattern_name", None)
+            if source in CLOSED_FORM_SUMS:
+                return expr  # one exact closed form beats n reduced elements
+            expr.operand = self.push_modulus(expr.operand, m)
+            expr.closed_form = None  # the elements are residues now
+            return BinOp(expr, MODULO, m)
+        return expr
+
     def check_if(self, stmt):
-        self.check_expr_type(stmt.condition, None)
+        if self.check_expr_type(stmt.condition, None) != "int":
+            raise Exception("Condition must be an integer; comparing a sequence gives a mask "
+                            "(e.g. test `sum (x > y) > 0`)")
         
         for s in stmt.true_block:
             if isinstance(s, Assign):
@@ -624,6 +935,8 @@ class SemanticAnalyzer:
                 self.check_for(s)
         
         if stmt.false_block:
+            # The else branch starts from the state before the then branch
+            self.forget_values(assigned_names(stmt.true_block))
             for s in stmt.false_block:
                 if isinstance(s, Assign):
                     self.check_assign(s)
@@ -634,6 +947,8 @@ class SemanticAnalyzer:
                 elif isinstance(s, ForStmt):
                     self.check_for(s)
 
+        self.forget_values(assigned_names(stmt.true_block + (stmt.false_block or [])))
+
     def check_for(self, stmt):
         if isinstance(stmt.source, str):
             if stmt.source not in self.sym:
@@ -644,8 +959,11 @@ class SemanticAnalyzer:
             source_type = self.check_expr_type(stmt.source, None)
             if source_type != "array":
                 raise Exception("For loop source must be an array")
+        stmt.static_source = self.static_source(stmt.source)
         
         self.sym[stmt.iterator] = Symbol(stmt.iterator, "int")
+        # Values from earlier iterations are unknown, and the body may not run at all
+        self.forget_values(assigned_names(stmt.body))
         
         for s in stmt.body:
             if isinstance(s, Assign):
@@ -657,6 +975,42 @@ class SemanticAnalyzer:
             elif isinstance(s, ForStmt):
                 self.check_for(s)
 
+        self.forget_values(assigned_names(stmt.body))
+
+
+def same_modulus(a, b):
+    """True if two modulus expressions have the same value within one expression"""
+    if isinstance(a, NumberExpr) and isinstance(b, NumberExpr):
+        return a.value == b.value
+    return isinstance(a, IDExpr) and isinstance(b, IDExpr) and a.name == b.name
+
+# Patterns whose sums _pattern_reduce computes in closed form rather than element by element
+CLOSED_FORM_SUMS = ("fibonacci", "square", "cube", "triangular", "arithmetic", "geometric")
+
+# Argument count of each pattern (the last argument is always the length)
+PATTERN_ARITY = {"fibonacci": 1, "factorial": 1, "square": 1, "cube": 1,
+                 "triangular": 1, "arithmetic": 3, "geometric": 3}
+
+FOLD_MAX_BITS = 4096  # larger closed-form results are computed at run time instead
+
+def fold_reduction(op, pattern, args):
+    """Compile-time value of reduction `op` over `pattern args`, or None.
+
+    Only closed forms are folded (the sum of factorials has none), and only
+    when the result is small enough to embed in the program; bigger ones
+    use the same closed form at run time.
+    """
+    n = max(0, args[-1])
+    if op == "len":
+        return n
+    if n == 0:
+        return 0 if op == "sum" else None
+    if op == "sum" and pattern == "factorial":
+        return None
+    bits = _pattern_bits(pattern, args)
+    if max(bits(0), bits(n - 1)) + math.log2(n) > FOLD_MAX_BITS:
+        return None
+    return sequentia_runtime._pattern_reduce(op, pattern, args)
 
 # --------------------------
 # Three-Address Code Generator
@@ -676,6 +1030,12 @@ class TACInstruction:
             return f"{self.result} = {self.arg1}[{self.arg2}]"
         elif self.op in ['SLICE']:
             return f"{self.result} = {self.arg1}[{self.arg2}]"
+        elif self.op in ['REDUCE', 'SCAN']:
+            return f"{self.result} = {self.arg1} {self.arg2}"
+        elif self.op in ['IN']:
+            return f"{self.result} = {self.arg1} in {self.arg2}"
+        elif self.op in ['INDEXOF']:
+            return f"{self.result} = indexof {self.arg1} in {self.arg2}"
         elif self.op in ['ASSIGN']:
             return f"{self.result} = {self.arg1}"
         elif self.op in ['PRINT']:
@@ -686,7 +1046,11 @@ class TACInstruction:
             return f"GOTO {self.arg1}"
         elif self.op in ['IF_FALSE']:
             return f"IF_FALSE {self.arg1} GOTO {self.result}"
-        elif self.op in ['+', '-', '*', '/', '==', '!=', '<', '>', '<=', '>=']:
+        elif self.op in ['ITER']:
+            return f"{self.result} = ITER {self.arg1}"
+        elif self.op in ['NEXT']:
+            return f"{self.result} = NEXT {self.arg1} ELSE GOTO {self.arg2}"
+        elif self.op in ['+', '-', '*', '/', 'mod', '==', '!=', '<', '>', '<=', '>=']:
             return f"{self.result} = {self.arg1} {self.op} {self.arg2}"
         else:
             return f"{self.op} {self.arg1} {self.arg2} {self.result}"
@@ -697,6 +1061,7 @@ class TACGenerator:
         self.instructions = []
         self.temp_counter = 0
         self.label_counter = 0
+        self.branches = {}  # else label of each IF_FALSE -> its IfStmt
     
     def new_temp(self):
         self.temp_counter += 1
@@ -736,6 +1101,7 @@ class TACGenerator:
             cond_temp = self.gen_expr(stmt.condition)
             else_label = self.new_label()
             end_label = self.new_label()
+            self.branches[else_label] = stmt
             
             self.instructions.append(TACInstruction('IF_FALSE', cond_temp, None, else_label))
             
@@ -752,14 +1118,19 @@ class TACGenerator:
             self.instructions.append(TACInstruction('LABEL', end_label))
         
         elif isinstance(stmt, ForStmt):
-            # For loop TAC generation (simplified)
+            # it = ITER source; loop: i = NEXT it (or leave); body; GOTO loop
+            source = stmt.source if isinstance(stmt.source, str) else self.gen_expr(stmt.source)
+            it = self.new_temp()
             loop_label = self.new_label()
             end_label = self.new_label()
             
+            self.instructions.append(TACInstruction('ITER', source, None, it))
             self.instructions.append(TACInstruction('LABEL', loop_label))
+            self.instructions.append(TACInstruction('NEXT', it, end_label, stmt.iterator))
             # Body
             for s in stmt.body:
                 self.gen_stmt(s)
+            self.instructions.append(TACInstruction('GOTO', loop_label))
             self.instructions.append(TACInstruction('LABEL', end_label))
     
     def gen_expr(self, expr):
@@ -796,6 +1167,32 @@ class TACGenerator:
             self.instructions.append(TACInstruction('PATTERN_CALL', expr.pattern_name, args_str, temp))
             return temp
         
+        elif isinstance(expr, ReduceExpr):
+            # Folded by the semantic analyzer: a plain constant for the optimizer
+            if expr.value is not None:
+                return str(expr.value)
+            operand = self.gen_expr(expr.operand)
+            temp = self.new_temp()
+            self.instructions.append(TACInstruction('REDUCE', expr.op, operand, temp))
+            return temp
+        
+        elif isinstance(expr, ScanExpr):
+            args = [self.gen_expr(expr.operand)]
+            if expr.width is not None:
+                args.append(self.gen_expr(expr.width))
+            temp = self.new_temp()
+            self.instructions.append(TACInstruction('SCAN', expr.op, ', '.join(args), temp))
+            return temp
+        
+        elif isinstance(expr, SearchExpr):
+            if expr.value is not None:
+                return str(expr.value)
+            item = self.gen_expr(expr.item)
+            operand = self.gen_expr(expr.operand)
+            temp = self.new_temp()
+            self.instructions.append(TACInstruction(expr.op.upper(), item, operand, temp))
+            return temp
+        
         else:
             return "unknown"
 
@@ -804,21 +1201,90 @@ class TACGenerator:
 # Code Optimizer
 # --------------------------
 
+# Operators SCCP evaluates when both operands are constant
+TAC_FOLD = {'+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.floordiv, 'mod': operator.mod,
+            '==': operator.eq, '!=': operator.ne, '<': operator.lt,
+            '>': operator.gt, '<=': operator.le, '>=': operator.ge}
+
+def tac_constant(arg):
+    """Value of a literal TAC operand ("5", "-1", "True"), or None for a name"""
+    if not isinstance(arg, str):
+        return None
+    if arg in ('True', 'False'):
+        return arg == 'True'
+    digits = arg[1:] if arg.startswith('-') else arg
+    return int(arg) if digits.isdigit() else None
+
+def fold_tac(op, a, b):
+    """Literal for `a op b`, or None where it must be left to run time"""
+    if op in ('/', 'mod') and b == 0:
+        return None  # the program raises ZeroDivisionError there
+    if op == '*' and abs(a).bit_length() + abs(b).bit_length() > FOLD_MAX_BITS:
+        return None
+    return str(TAC_FOLD[op](a, b))
+
+# Optimization levels (-O0/-O1/-O2): the TAC passes each one runs, by name
+# from TAC_PASSES. A nested tuple is a group rerun until a round leaves the
+# code unchanged, for at most OPT_MAX_ROUNDS rounds. -O1 and up also prune
+# the branches SCCP decides from the program; -O2 also unrolls static loops.
+OPT_PIPELINES = {
+    0: (),
+    1: ('sccp', 'constant_folding', 'copy_propagation', 'dead_code_elimination',
+        'copy_propagation', 'remove_redundant_constant_assigns'),
+    2: ('sccp', ('constant_folding', 'copy_propagation', 'dead_code_elimination'),
+        'remove_redundant_constant_assigns'),
+}
+DEFAULT_OPT_LEVEL = 2
+OPT_MAX_ROUNDS = 8
+
 class Optimizer:
-    def __init__(self, tac_instructions):
+    """Runs the TAC pass pipeline of an optimization level.
+
+    Every pass run is recorded in pass_stats (instruction counts and wall
+    time, with its round inside a fixed-point group). `rounds` counts the
+    rounds the groups took and `converged` is False if a group was still
+    changing the code when OPT_MAX_ROUNDS ran out.
+    """
+    def __init__(self, tac_instructions, opt_level=DEFAULT_OPT_LEVEL, max_rounds=OPT_MAX_ROUNDS):
+        if opt_level not in OPT_PIPELINES:
+            raise Exception(f"Unknown optimization level {opt_level}")
         self.instructions = tac_instructions
+        self.opt_level = opt_level
+        self.max_rounds = max_rounds
+        self.pass_stats = []  # PassStats per executed pass, in order
+        self.branch_outcomes = {}  # else label of a decided IF_FALSE -> True if the then-branch runs
+        self.rounds = 0
+        self.converged = True
     
     def optimize(self):
-        # Apply optimization passes
-        self.constant_folding()
-        self.copy_propagation()
-        self.dead_code_elimination()
-        # Run copy propagation again after DCE to catch new opportunities
-        self.copy_propagation()
-        # Final cleanup pass
-        self.remove_redundant_constant_assigns()
+        for step in OPT_PIPELINES[self.opt_level]:
+            if isinstance(step, tuple):
+                self.run_to_fixed_point(step)
+            else:
+                self.run_pass(step)
         return self.instructions
     
+    def run_to_fixed_point(self, names):
+        """Rerun a group of passes until a round changes nothing, within max_rounds"""
+        for round_no in range(1, self.max_rounds + 1):
+            self.rounds += 1
+            before = _tac_snapshot(self.instructions)
+            for name in names:
+                self.run_pass(name, round_no)
+            if _tac_snapshot(self.instructions) == before:
+                return
+        self.converged = False
+    
+    def run_pass(self, name, round_no=None):
+        """Run one registered pass and record its instruction counts and wall time"""
+        if name not in TAC_PASSES:
+            raise Exception(f"Unknown optimizer pass {name}")
+        before = len(self.instructions)
+        start = time.perf_counter()
+        TAC_PASSES[name](self)
+        elapsed = time.perf_counter() - start
+        self.pass_stats.append(PassStats(name, before, len(self.instructions), elapsed, round_no))
+    
     def remove_redundant_constant_assigns(self):
         """Remove t1 = 8; a = 8 patterns, keeping only a = 8"""
         optimized = []
@@ -846,22 +1312,144 @@ class Optimizer:
         
         self.instructions = optimized
     
+    def sccp(self):
+        """Sparse conditional constant propagation with branch pruning.
+
+        Constants are propagated only along control-flow edges that can
+        execute: from the entry, an IF_FALSE with a constant condition
+        follows just the branch it takes, and a loop header joins what
+        enters the loop with what its body leaves behind. TAC variables are
+        not in SSA form, so each basic block keeps its own map of constant
+        names. The code is then rewritten: constant operands are
+        substituted, constant expressions folded, decided IF_FALSEs become
+        a GOTO or vanish, and unreachable blocks are deleted. Decided
+        conditions are kept in branch_outcomes for prune_branches.
+        """
+        code = self.instructions
+        if not code:
+            return
+        # Basic blocks: a LABEL starts one, a jump ends one
+        starts = {0} | {i for i, ins in enumerate(code) if ins.op == 'LABEL'}
+        starts |= {i + 1 for i, ins in enumerate(code) if ins.op in ('GOTO', 'IF_FALSE', 'NEXT')}
+        starts = sorted(i for i in starts if i < len(code))
+        bounds = list(zip(starts, starts[1:] + [len(code)]))
+        block_of = {code[start].arg1: b for b, (start, _) in enumerate(bounds) if code[start].op == 'LABEL'}
+
+        def successors(b, state):
+            last = code[bounds[b][1] - 1]
+            following = [b + 1] if b + 1 < len(bounds) else []
+            if last.op == 'GOTO':
+                return [block_of[last.arg1]]
+            if last.op == 'IF_FALSE':
+                cond = tac_constant(self.sccp_operand(last.arg1, state))
+                if cond is None:
+                    return following + [block_of[last.result]]
+                return following if cond else [block_of[last.result]]
+            if last.op == 'NEXT':
+                return following + [block_of[last.arg2]]
+            return following
+
+        # Worklist over blocks; a block is (re)visited when its entry state changes
+        entry = {0: {}}
+        worklist = [0]
+        while worklist:
+            b = worklist.pop()
+            state = dict(entry[b])
+            for ins in code[bounds[b][0]:bounds[b][1]]:
+                self.sccp_transfer(ins, state)
+            for succ in successors(b, state):
+                if succ not in entry:
+                    entry[succ] = dict(state)
+                else:
+                    joined = {k: v for k, v in entry[succ].items() if state.get(k) == v}
+                    if joined == entry[succ]:
+                        continue
+                    entry[succ] = joined
+                if succ not in worklist:
+                    worklist.append(succ)
+
+        optimized = []
+        for b, (start, end) in enumerate(bounds):
+            if b not in entry:
+                continue  # unreachable
+            state = dict(entry[b])
+            for ins in code[start:end]:
+                new = self.sccp_rewrite(ins, state)
+                self.sccp_transfer(ins, state)
+                if new is not None:
+                    optimized.append(new)
+
+        # Drop jumps to the very next instruction and labels nothing jumps to
+        optimized = [ins for i, ins in enumerate(optimized)
+                     if not (ins.op == 'GOTO' and i + 1 < len(optimized)
+                             and optimized[i + 1].op == 'LABEL' and optimized[i + 1].arg1 == ins.arg1)]
+        targets = ({ins.arg1 for ins in optimized if ins.op == 'GOTO'}
+                   | {ins.result for ins in optimized if ins.op == 'IF_FALSE'}
+                   | {ins.arg2 for ins in optimized if ins.op == 'NEXT'})
+        self.instructions = [ins for ins in optimized if ins.op != 'LABEL' or ins.arg1 in targets]
+
+    def sccp_operand(self, arg, state):
+        """Literal for an operand under `state`: the literal itself, a known name's value, or None"""
+        if tac_constant(arg) is not None:
+            return arg
+        return state.get(arg)
+
+    def sccp_transfer(self, ins, state):
+        """Update the constant names in `state` for one instruction"""
+        if ins.op in ('IF_FALSE', 'GOTO', 'LABEL', 'PRINT') or not ins.result:
+            return
+        value = None
+        if ins.op == 'ASSIGN':
+            value = self.sccp_operand(ins.arg1, state)
+        elif ins.op in TAC_FOLD:
+            a = tac_constant(self.sccp_operand(ins.arg1, state))
+            b = tac_constant(self.sccp_operand(ins.arg2, state))
+            if a is not None and b is not None:
+                value = fold_tac(ins.op, a, b)
+        if value is None:
+            state.pop(ins.result, None)
+        else:
+            state[ins.result] = value
+
+    def sccp_rewrite(self, ins, state):
+        """`ins` with known operands substituted and constants folded; None to delete it"""
+        def sub(arg):
+            return self.sccp_operand(arg, state) or arg
+
+        if ins.op == 'IF_FALSE':
+            cond = tac_constant(self.sccp_operand(ins.arg1, state))
+            if cond is None:
+                return TACInstruction('IF_FALSE', sub(ins.arg1), None, ins.result)
+            self.branch_outcomes[ins.result] = bool(cond)
+            return None if cond else TACInstruction('GOTO', ins.result)
+        if ins.op in TAC_FOLD:
+            a, b = sub(ins.arg1), sub(ins.arg2)
+            if tac_constant(a) is not None and tac_constant(b) is not None:
+                value = fold_tac(ins.op, tac_constant(a), tac_constant(b))
+                if value is not None:
+                    return TACInstruction('ASSIGN', value, None, ins.result)
+            return TACInstruction(ins.op, a, b, ins.result)
+        if ins.op in ('ASSIGN', 'PRINT', 'IN', 'INDEXOF'):
+            return TACInstruction(ins.op, sub(ins.arg1), ins.arg2, ins.result)
+        if ins.op == 'ARRAY_ACCESS':
+            return TACInstruction(ins.op, ins.arg1, sub(ins.arg2), ins.result)
+        if ins.op in ('PATTERN_CALL', 'SCAN'):
+            args = ', '.join(sub(a) for a in ins.arg2.split(', '))
+            return TACInstruction(ins.op, ins.arg1, args, ins.result)
+        if ins.op == 'SLICE':
+            bounds = ':'.join(sub(a) for a in ins.arg2.split(':'))
+            return TACInstruction(ins.op, ins.arg1, bounds, ins.result)
+        return ins
+
     def constant_folding(self):
         """Fold constant expressions"""
         optimized = []
         for instr in self.instructions:
-            if instr.op in ['+', '-', '*', '/'] and instr.arg1.isdigit() and instr.arg2.isdigit():
-                val1 = int(instr.arg1)
-                val2 = int(instr.arg2)
-                if instr.op == '+':
-                    result = val1 + val2
-                elif instr.op == '-':
-                    result = val1 - val2
-                elif instr.op == '*':
-                    result = val1 * val2
-                elif instr.op == '/':
-                    result = val1 // val2
-                optimized.append(TACInstruction('ASSIGN', str(result), None, instr.result))
+            result = None
+            if instr.op in ['+', '-', '*', '/', 'mod'] and instr.arg1.isdigit() and instr.arg2.isdigit():
+                result = fold_tac(instr.op, int(instr.arg1), int(instr.arg2))
+            if result is not None:
+                optimized.append(TACInstruction('ASSIGN', result, None, instr.result))
             else:
                 optimized.append(instr)
         self.instructions = optimized
@@ -881,7 +1469,7 @@ class Optimizer:
                 if instr.arg1:
                     used_vars.add(instr.arg1)
             # Variables used in operations (left and right operands)
-            elif instr.op in ['+', '-', '*', '/', '==', '!=', '<', '>', '<=', '>=']:
+            elif instr.op in ['+', '-', '*', '/', 'mod', '==', '!=', '<', '>', '<=', '>=', 'IN', 'INDEXOF']:
                 if instr.arg1 and not str(instr.arg1).isdigit():
                     used_vars.add(instr.arg1)
                 if instr.arg2 and not str(instr.arg2).isdigit():
@@ -890,6 +1478,12 @@ class Optimizer:
             elif instr.op in ['ARRAY_ACCESS', 'SLICE']:
                 if instr.arg1:
                     used_vars.add(instr.arg1)
+            elif instr.op == 'REDUCE':
+                used_vars.add(instr.arg2)
+            elif instr.op == 'SCAN':
+                used_vars.update(a for a in instr.arg2.split(', ') if not a.isdigit())
+            elif instr.op in ['ITER', 'NEXT']:
+                used_vars.add(instr.arg1)
             # Variables used in assignments (right-hand side)
             elif instr.op == 'ASSIGN':
                 if instr.arg1 and not str(instr.arg1).isdigit():
@@ -916,7 +1510,7 @@ class Optimizer:
         optimized = []
         for instr in self.instructions:
             # Always keep side effects (PRINT, labels, control flow)
-            if instr.op in ['PRINT', 'LABEL', 'GOTO', 'IF_FALSE', 'PATTERN_CALL']:
+            if instr.op in ['PRINT', 'LABEL', 'GOTO', 'IF_FALSE', 'PATTERN_CALL', 'ITER', 'NEXT']:
                 optimized.append(instr)
             # Keep assignments only if the result is used
             elif instr.result and instr.result in used_vars:
@@ -950,280 +1544,1530 @@ class Optimizer:
         self.instructions = optimized
 
 
+def _tac_snapshot(instructions):
+    # Passes edit instructions in place as well as replacing them
+    return [(ins.op, ins.arg1, ins.arg2, ins.result) for ins in instructions]
+
+# Passes available to OPT_PIPELINES: name -> function taking the Optimizer
+TAC_PASSES = {
+    'sccp': Optimizer.sccp,
+    'constant_folding': Optimizer.constant_folding,
+    'copy_propagation': Optimizer.copy_propagation,
+    'dead_code_elimination': Optimizer.dead_code_elimination,
+    'remove_redundant_constant_assigns': Optimizer.remove_redundant_constant_assigns,
+}
+
+def register_pass(name, fn):
+    """Make fn(optimizer) available to OPT_PIPELINES under `name`"""
+    TAC_PASSES[name] = fn
+
+
+def prune_branches(ast, branches, outcomes):
+    """Replace every if/else whose condition SCCP decided by the branch it takes.
+
+    `branches` is TACGenerator.branches and `outcomes` the matching
+    Optimizer.branch_outcomes. The AST is edited in place, so the cost
+    model and the code generator only see code that can run.
+    """
+    decided = {id(branches[label]): taken for label, taken in outcomes.items()}
+    if decided:
+        ast.stmts = _prune_block(ast.stmts, decided)
+
+def _prune_block(stmts, decided):
+    out = []
+    for s in stmts:
+        if isinstance(s, IfStmt):
+            if id(s) in decided:
+                out.extend(_prune_block(s.true_block if decided[id(s)] else s.false_block or [], decided))
+                continue
+            s.true_block = _prune_block(s.true_block, decided)
+            if s.false_block:
+                s.false_block = _prune_block(s.false_block, decided)
+        elif isinstance(s, ForStmt):
+            s.body = _prune_block(s.body, decided)
+        out.append(s)
+    return out
+
+def _has_branches(stmts):
+    return any(isinstance(s, IfStmt) or (isinstance(s, ForStmt) and _has_branches(s.body))
+               for s in stmts)
+
+def fold_branches(ast):
+    """SCCP alone (no other passes), for paths that skip the optimizer; then prune_branches"""
+    if not _has_branches(ast.stmts):
+        return
+    tac_gen = TACGenerator(ast)
+    optimizer = Optimizer(tac_gen.generate())
+    optimizer.sccp()
+    prune_branches(ast, tac_gen.branches, optimizer.branch_outcomes)
+
+def optimize_ast(ast, opt_level=DEFAULT_OPT_LEVEL, stats=None):
+    """The AST optimizations of `opt_level`, for paths that skip the TAC optimizer:
+    loop unrolling at -O2, then SCCP branch pruning from -O1"""
+    if opt_level >= 2:
+        with _phase(stats, "unroll"):
+            LoopUnroller(ast).run()
+    if opt_level >= 1:
+        with _phase(stats, "sccp"):
+            fold_branches(ast)
+
+
 # --------------------------
-# Code Generation
+# Loop Unrolling
+# --------------------------
+
+UNROLL_MAX_TRIPS = 16    # static loops with at most this many elements are unrolled
+UNROLL_MAX_GROWTH = 512  # statements unrolling may add to a program in total
+
+def _count_stmts(stmts):
+    n = 0
+    for s in stmts:
+        n += 1
+        if isinstance(s, IfStmt):
+            n += _count_stmts(s.true_block) + _count_stmts(s.false_block or [])
+        elif isinstance(s, ForStmt):
+            n += _count_stmts(s.body)
+    return n
+
+class LoopUnroller:
+    """Fully unrolls small static loops and folds the constants they expose.
+
+    SemanticAnalyzer marks a for loop with `static_source` when it iterates
+    a pattern, or a constant slice of one, with constant arguments. Such a
+    loop with 1..max_trips elements becomes `iterator = element` followed
+    by a copy of the body for each element, as long as the whole program
+    grows by at most max_growth statements.
+
+    The walk also propagates integer constants through straight-line code,
+    starting with each copy's iterator: known names are substituted,
+    arithmetic on constants is evaluated, and an if whose condition became
+    constant has its taken branch folded (the other is left for SCCP to
+    prune). Loops whose source only became constant this way are unrolled
+    on the next round, after the program is checked again.
+    """
+    def __init__(self, ast, max_trips=UNROLL_MAX_TRIPS, max_growth=UNROLL_MAX_GROWTH):
+        self.ast = ast
+        self.max_trips = max_trips
+        self.growth_left = max_growth
+        self.unrolled = 0
+
+    def run(self):
+        """Unroll until nothing changes; returns the number of loops unrolled"""
+        while True:
+            before = self.unrolled
+            self.ast.stmts = self.block(self.ast.stmts, {})
+            if self.unrolled == before:
+                return self.unrolled
+            SemanticAnalyzer(self.ast).check()
+
+    def block(self, stmts, env):
+        """Fold a block in order; `env` (name -> int) is updated to its exit state"""
+        out = []
+        for s in stmts:
+            if isinstance(s, Assign):
+                s.expr = self.fold(s.expr, env)
+                if isinstance(s.expr, NumberExpr):
+                    env[s.name] = s.expr.value
+                else:
+                    env.pop(s.name, None)
+            elif isinstance(s, Print):
+                if s.index_expr is not None:
+                    s.index_expr = self.fold(s.index_expr, env)
+                elif s.name in env:
+                    line = s.line
+                    s = Print("_expr_", NumberExpr(env[s.name]))
+                    s.line = line
+            elif isinstance(s, IfStmt):
+                s.condition = self.fold(s.condition, env)
+                if isinstance(s.condition, NumberExpr):
+                    # Decided: continue through the branch that runs. The other is
+                    # folded too, so it no longer names an iterator left unbound
+                    if s.condition.value:
+                        s.true_block = self.block(s.true_block, env)
+                        if s.false_block:
+                            s.false_block = self.block(s.false_block, dict(env))
+                    else:
+                        s.true_block = self.block(s.true_block, dict(env))
+                        if s.false_block:
+                            s.false_block = self.block(s.false_block, env)
+                else:
+                    s.true_block = self.block(s.true_block, dict(env))
+                    if s.false_block:
+                        s.false_block = self.block(s.false_block, dict(env))
+                    self.forget(env, assigned_names(s.true_block + (s.false_block or [])))
+            elif isinstance(s, ForStmt):
+                if not isinstance(s.source, str):
+                    s.source = self.fold(s.source, env)
+                unrolled = self.unroll(s, env)
+                if unrolled is not None:
+                    out.extend(unrolled)
+                    continue
+                # Names the body assigns differ between iterations
+                self.forget(env, assigned_names([s]))
+                s.body = self.block(s.body, dict(env))
+            out.append(s)
+        return out
+
+    def forget(self, env, names):
+        for name in names:
+            env.pop(name, None)
+
+    def unroll(self, stmt, env):
+        """Statements replacing a static loop (folded into `env`), or None to keep it"""
+        if stmt.static_source is None:
+            return None
+        pattern, args, start, stop = stmt.static_source
+        trips = stop - start
+        if not 0 < trips <= self.max_trips:
+            return None
+        growth = trips * (1 + _count_stmts(stmt.body)) - 1
+        if growth > self.growth_left:
+            return None
+        self.growth_left -= growth
+        self.unrolled += 1
+        out = []
+        for i in range(start, stop):
+            value = sequentia_runtime._pattern_element(pattern, args, i)
+            env[stmt.iterator] = value
+            body = self.block(copy.deepcopy(stmt.body), env)
+            # Bind the iterator where the folded body still reads it, and for after the loop
+            if i == stop - 1 or self.reads(body, stmt.iterator):
+                bind = Assign(stmt.iterator, NumberExpr(value))
+                bind.line = stmt.line
+                out.append(bind)
+            out.extend(body)
+        return out
+
+    def reads(self, stmts, name):
+        """True if `name` occurs in `stmts` outside branches a constant condition rules out"""
+        for s in stmts:
+            if isinstance(s, IfStmt) and isinstance(s.condition, NumberExpr):
+                if self.reads(s.true_block if s.condition.value else s.false_block or [], name):
+                    return True
+            elif name in stmt_names(s):
+                return True
+        return False
+
+    def fold(self, expr, env):
+        """`expr` with known names substituted and constant scalar operations evaluated"""
+        if isinstance(expr, IDExpr) and expr.name in env:
+            return NumberExpr(env[expr.name])
+        if isinstance(expr, BinOp):
+            expr.left = self.fold(expr.left, env)
+            expr.right = self.fold(expr.right, env)
+            if isinstance(expr.left, NumberExpr) and isinstance(expr.right, NumberExpr):
+                value = fold_tac(expr.op, expr.left.value, expr.right.value)
+                if value is not None:
+                    return NumberExpr(tac_constant(value))
+        elif isinstance(expr, ArrayAccessExpr):
+            expr.index_expr = self.fold(expr.index_expr, env)
+        elif isinstance(expr, SliceExpr):
+            expr.start = self.fold(expr.start, env) if expr.start else expr.start
+            expr.end = self.fold(expr.end, env) if expr.end else expr.end
+        elif isinstance(expr, PatternExpr):
+            expr.args = [self.fold(a, env) for a in expr.args]
+            expr.modulus = self.fold(expr.modulus, env) if expr.modulus else expr.modulus
+        elif isinstance(expr, ReduceExpr):
+            expr.operand = self.fold(expr.operand, env)
+        elif isinstance(expr, ScanExpr):
+            expr.operand = self.fold(expr.operand, env)
+            expr.width = self.fold(expr.width, env) if expr.width else expr.width
+        elif isinstance(expr, SearchExpr):
+            expr.item = self.fold(expr.item, env)
+            expr.operand = self.fold(expr.operand, env)
+        return expr
+
+
 # --------------------------
+# Liveness & Buffer Reuse
+# --------------------------
+
+ARITH_OPS = ('+', '-', '*', '/', MODULO)
 
-def py_expr(expr, gen_inline=False):
-    if isinstance(expr, NumberExpr): 
-        return str(expr.value)
-    if isinstance(expr, IDExpr): 
-        return expr.name
+def expr_names(expr):
+    """Names read by an expression, one entry per occurrence"""
+    if isinstance(expr, IDExpr):
+        return [expr.name]
     if isinstance(expr, ArrayAccessExpr):
-        idx = py_expr(expr.index_expr)
-        return f"{expr.name}[{idx}]"
+        return [expr.name] + expr_names(expr.index_expr)
     if isinstance(expr, SliceExpr):
-        start = py_expr(expr.start) if expr.start else ""
-        end = py_expr(expr.end) if expr.end else ""
-        return f"{expr.name}[{start}:{end}]"
+        return [expr.name] + expr_names(expr.start) + expr_names(expr.end)
     if isinstance(expr, BinOp):
-        left = py_expr(expr.left)
-        right = py_expr(expr.right)
-        if expr.op == '+':
-            return f"_pat_add({left}, {right})"
-        elif expr.op == '-':
-            return f"_pat_sub({left}, {right})"
-        elif expr.op == '*':
-            return f"_pat_mul({left}, {right})"
-        elif expr.op == '/':
-            return f"_pat_div({left}, {right})"
-        else:
-            return f"({left} {expr.op} {right})"
+        return expr_names(expr.left) + expr_names(expr.right)
     if isinstance(expr, PatternExpr):
-        return gen_pattern_inline(expr.pattern_name, expr.args)
-    raise Exception("Invalid expression")
+        return [n for a in expr.args for n in expr_names(a)] + expr_names(expr.modulus)
+    if isinstance(expr, ReduceExpr):
+        # A closed-form reduction needs only constants, not its operand's value
+        return [] if expr.closed_form is not None else expr_names(expr.operand)
+    if isinstance(expr, SearchExpr):
+        operand = [] if expr.closed_form is not None else expr_names(expr.operand)
+        return expr_names(expr.item) + operand
+    if isinstance(expr, ScanExpr):
+        return expr_names(expr.operand) + expr_names(expr.width)
+    return []
 
-def gen_pattern_inline(pattern, args):
-    arg_values = [py_expr(a) for a in args]
-    
-    if pattern == "square":
-        n = arg_values[0]
-        return f"[(i+1)**2 for i in range({n})]"
-    
-    if pattern == "cube":
-        n = arg_values[0]
-        return f"[(i+1)**3 for i in range({n})]"
-    
-    if pattern == "triangular":
-        n = arg_values[0]
-        return f"[(i+1)*(i+2)//2 for i in range({n})]"
-    
-    if pattern == "arithmetic":
-        start, step, n = arg_values
-        return f"[{start} + {step}*i for i in range({n})]"
-    
-    if pattern == "geometric":
-        start, ratio, n = arg_values
-        return f"[{start}*({ratio}**i) for i in range({n})]"
-    
-    if pattern == "fibonacci":
-        n = arg_values[0]
-        return f"_fib_inline({n})"
-    
-    if pattern == "factorial":
-        n = arg_values[0]
-        return f"_fact_inline({n})"
-    
-    raise Exception("Unknown pattern " + pattern)
+def stmt_names(stmt):
+    """Every name a statement reads or writes, including nested blocks"""
+    if isinstance(stmt, Assign):
+        return {stmt.name} | set(expr_names(stmt.expr))
+    if isinstance(stmt, Print):
+        names = set(expr_names(stmt.index_expr))
+        return names if stmt.name == "_expr_" else names | {stmt.name}
+    if isinstance(stmt, IfStmt):
+        names = set(expr_names(stmt.condition))
+        for s in stmt.true_block + (stmt.false_block or []):
+            names |= stmt_names(s)
+        return names
+    if isinstance(stmt, ForStmt):
+        names = {stmt.iterator} | set(_source_names(stmt))
+        for s in stmt.body:
+            names |= stmt_names(s)
+        return names
+    return set()
 
-def gen_pattern(name, pattern, args):
-    arg_values = [py_expr(a) for a in args]
+def _source_names(stmt):
+    return [stmt.source] if isinstance(stmt.source, str) else expr_names(stmt.source)
 
-    if pattern == "fibonacci":
-        n = arg_values[0]
-        return f"""
-def _gen_{name}():
-    a,b = 0,1
-    arr=[]
-    for _ in range({n}):
-        arr.append(a)
-        a,b = b, a+b
-    return arr
-{name} = _gen_{name}()
-"""
+def _is_array_expr(expr, arrays):
+    if isinstance(expr, (PatternExpr, SliceExpr, ScanExpr)):
+        return True
+    if isinstance(expr, IDExpr):
+        return expr.name in arrays
+    if isinstance(expr, BinOp) and expr.op in ARITH_OPS:
+        return _is_array_expr(expr.left, arrays) or _is_array_expr(expr.right, arrays)
+    return False
 
-    if pattern == "factorial":
-        n = arg_values[0]
-        return f"""
-def _gen_{name}():
-    arr=[]
-    f=1
-    for i in range(1, {n}+1):
-        f*=i
-        arr.append(f)
-    return arr
-{name} = _gen_{name}()
-"""
+class LivenessAnalyzer:
+    """Liveness and buffer ownership for the code generator.
 
-    if pattern == "square":
-        n = arg_values[0]
-        return f"""
-{name} = [(i+1)**2 for i in range({n})]
-"""
+    A backward pass records, for every statement (inside if/for blocks too),
+    the names read later on some path; a loop body also sees what its next
+    iteration reads. A forward pass then picks the array variables to `del`
+    after each statement, only where they are bound on every path, and the
+    dead arrays a statement may overwrite in place: those produced fresh by
+    a pattern or arithmetic and never aliased by a copy, slice or loop.
+    Constant patterns assigned to a name nothing reads (e.g. one only used
+    by folded reductions) are dead stores and are not generated at all.
+    """
+    def __init__(self, ast):
+        self.ast = ast
+        self.arrays = self.array_names()
+        self.live_out = {}    # id(stmt) -> names read after stmt
+        self.release = {}     # id(stmt) -> array names to del after stmt
+        self.consumable = {}  # id(stmt) -> names whose buffers stmt may reuse
+        self.dead_stores = set()  # id(stmt) of assignments that can be skipped
 
-    if pattern == "cube":
-        n = arg_values[0]
-        return f"""
-{name} = [(i+1)**3 for i in range({n})]
-"""
+    def analyze(self):
+        self.block_live(self.ast.stmts, set())
+        self.block_flow(self.ast.stmts, set(), set(), top=True)
+        return self
 
-    if pattern == "triangular":
-        n = arg_values[0]
-        return f"""
-{name} = [(i+1)*(i+2)//2 for i in range({n})]
-"""
+    def array_names(self):
+        """Names that are ever assigned a sequence"""
+        assigns = []
+        def collect(stmts):
+            for s in stmts:
+                if isinstance(s, Assign):
+                    assigns.append(s)
+                elif isinstance(s, IfStmt):
+                    collect(s.true_block)
+                    collect(s.false_block or [])
+                elif isinstance(s, ForStmt):
+                    collect(s.body)
+        collect(self.ast.stmts)
+        arrays = set()
+        changed = True
+        while changed:
+            changed = False
+            for a in assigns:
+                if a.name not in arrays and _is_array_expr(a.expr, arrays):
+                    arrays.add(a.name)
+                    changed = True
+        return arrays
 
-    if pattern == "arithmetic":
-        start, step, n = arg_values
-        return f"""
-{name} = [{start} + {step}*i for i in range({n})]
-"""
+    def block_live(self, stmts, live):
+        """Backward pass over a block; returns the names live on entry"""
+        for stmt in reversed(stmts):
+            self.live_out[id(stmt)] = set(live)
+            live = self.stmt_live(stmt, live)
+        return live
 
-    if pattern == "geometric":
-        start, ratio, n = arg_values
-        return f"""
-{name} = [{start}*({ratio}**i) for i in range({n})]
-"""
+    def stmt_live(self, stmt, live):
+        if isinstance(stmt, Assign):
+            return (live - {stmt.name}) | set(expr_names(stmt.expr))
+        if isinstance(stmt, Print):
+            names = set(expr_names(stmt.index_expr))
+            return live | (names if stmt.name == "_expr_" else names | {stmt.name})
+        if isinstance(stmt, IfStmt):
+            return (self.block_live(stmt.true_block, live)
+                    | self.block_live(stmt.false_block or [], live)
+                    | set(expr_names(stmt.condition)))
+        if isinstance(stmt, ForStmt):
+            # Loop header: live on exit, or read by the body before it rebinds them
+            header = set(live)
+            while True:
+                body_in = self.block_live(stmt.body, header)
+                new = live | (body_in - {stmt.iterator})
+                if new == header:
+                    break
+                header = new
+            return header | set(_source_names(stmt))
+        return live
 
-    raise Exception("Unknown pattern " + pattern)
+    def block_flow(self, stmts, bound, owned, top=False):
+        """Forward pass over a block with (definitely bound, uniquely owned) names"""
+        for i, stmt in enumerate(stmts):
+            bound, owned = self.stmt_flow(stmt, bound, owned)
+            if top and i == len(stmts) - 1:
+                break  # the program is about to return; nothing left to free
+            if id(stmt) in self.dead_stores:
+                dead = set()  # never runs, so there is nothing of its own to free
+            else:
+                dead = (stmt_names(stmt) & bound & self.arrays) - self.live_out[id(stmt)]
+            if dead:
+                self.release[id(stmt)] = sorted(dead)
+                bound = bound - dead
+                owned = owned - dead
+            else:
+                # Drop entries left by an earlier round of a loop's fixed point
+                self.release.pop(id(stmt), None)
+        return bound, owned
 
+    def stmt_flow(self, stmt, bound, owned):
+        if isinstance(stmt, Assign) and self.is_dead_store(stmt, bound):
+            self.dead_stores.add(id(stmt))
+            return bound, owned
+        if isinstance(stmt, Assign):
+            self.consumable[id(stmt)] = self.consumable_names(stmt, stmt.expr, owned)
+            # A copy or a slice shares its source's buffer from now on
+            owned = owned - self.aliasing(stmt.expr) - self.consumable[id(stmt)]
+            if isinstance(stmt.expr, (PatternExpr, ScanExpr)) or (
+                    isinstance(stmt.expr, BinOp) and stmt.expr.op in ARITH_OPS):
+                owned = owned | {stmt.name}
+            else:
+                owned = owned - {stmt.name}
+            return bound | {stmt.name}, owned
+        if isinstance(stmt, Print):
+            if stmt.name == "_expr_":
+                self.consumable[id(stmt)] = self.consumable_names(stmt, stmt.index_expr, owned)
+                owned = owned - self.consumable[id(stmt)]
+            return bound, owned
+        if isinstance(stmt, IfStmt):
+            tb, to = self.block_flow(stmt.true_block, bound, owned)
+            fb, fo = self.block_flow(stmt.false_block or [], bound, owned)
+            return tb & fb, to & fo
+        if isinstance(stmt, ForStmt):
+            # The sequence being iterated must not be overwritten by the body
+            pinned = {stmt.source} if isinstance(stmt.source, str) else self.aliasing(stmt.source)
+            hb, ho = bound, owned - pinned
+            while True:
+                eb, eo = self.block_flow(stmt.body, hb | {stmt.iterator}, ho - {stmt.iterator})
+                nb, no = hb & eb, ho & eo
+                if nb == hb and no == ho:
+                    return hb, ho
+                hb, ho = nb, no
+        return bound, owned
 
-def get_runtime_helpers():
-    return """# Runtime Helper Functions for Vector/Scalar Operations
-def _pat_add(a, b):
-    if isinstance(a, list) and isinstance(b, list):
-        return [x + y for x, y in zip(a, b)]
-    elif isinstance(a, list):
-        return [x + b for x in a]
-    elif isinstance(b, list):
-        return [a + x for x in b]
-    else:
-        return a + b
-
-def _pat_sub(a, b):
-    if isinstance(a, list) and isinstance(b, list):
-        return [x - y for x, y in zip(a, b)]
-    elif isinstance(a, list):
-        return [x - b for x in a]
-    elif isinstance(b, list):
-        return [a - x for x in b]
-    else:
-        return a - b
-
-def _pat_mul(a, b):
-    if isinstance(a, list) and isinstance(b, list):
-        return [x * y for x, y in zip(a, b)]
-    elif isinstance(a, list):
-        return [x * b for x in a]
-    elif isinstance(b, list):
-        return [a * x for x in b]
-    else:
-        return a * b
-
-def _pat_div(a, b):
-    if isinstance(a, list) and isinstance(b, list):
-        return [x // y for x, y in zip(a, b)]
-    elif isinstance(a, list):
-        return [x // b for x in a]
-    elif isinstance(b, list):
-        return [a // x for x in b]
-    else:
-        return a // b
-
-def _fib_inline(n):
-    a, b = 0, 1
-    arr = []
-    for _ in range(n):
-        arr.append(a)
-        a, b = b, a + b
-    return arr
-
-def _fact_inline(n):
-    arr = []
-    f = 1
-    for i in range(1, n+1):
-        f *= i
-        arr.append(f)
-    return arr
-"""
-
-def generate_python(ast):
-    code = ["# Generated Python Code"]
-    code.append(get_runtime_helpers())
-    
-    for stmt in ast.stmts:
-        code.extend(gen_stmt(stmt, 0))
+    def is_dead_store(self, stmt, bound):
+        """A constant, or a pattern that cannot fail, assigned to a name never read.
 
-    return "\n".join(code)
+        A pattern's arguments must be literals, folded reductions or
+        (integer, as the semantic analyzer checked) variables bound on
+        every path.
+        """
+        expr = stmt.expr
+        if stmt.name in self.live_out[id(stmt)]:
+            return False
+        if isinstance(expr, NumberExpr):
+            return True
+        if not isinstance(expr, PatternExpr):
+            return False
+        if len(expr.args) != PATTERN_ARITY.get(expr.pattern_name):
+            return False
+        return all(isinstance(a, NumberExpr) or (isinstance(a, ReduceExpr) and a.value is not None)
+                   or (isinstance(a, IDExpr) and a.name in bound) for a in expr.args)
 
-def gen_stmt(stmt, indent_level):
-    indent = "    " * indent_level
-    code = []
-    
-    if isinstance(stmt, Assign):
-        if isinstance(stmt.expr, PatternExpr):
-            p = stmt.expr
-            pattern_code = gen_pattern(stmt.name, p.pattern_name, p.args)
-            for line in pattern_code.strip().split('\n'):
-                if line.strip():
-                    code.append(indent + line)
-        else:
-            code.append(f"{indent}{stmt.name} = {py_expr(stmt.expr)}")
-    
-    elif isinstance(stmt, Print):
-        if stmt.name == "_expr_":
-            expr_code = py_expr(stmt.index_expr)
-            code.append(f"{indent}print({expr_code} if isinstance({expr_code}, int) else ' '.join(str(x) for x in {expr_code}))")
-        elif stmt.index_expr:
-            code.append(f"{indent}print({stmt.name}[{py_expr(stmt.index_expr)}])")
-        else:
-            code.append(f"{indent}print({stmt.name} if isinstance({stmt.name}, int) else ' '.join(str(x) for x in {stmt.name}))")
-    
-    elif isinstance(stmt, IfStmt):
-        condition = py_expr(stmt.condition)
-        code.append(f"{indent}if {condition}:")
-        
-        for s in stmt.true_block:
-            code.extend(gen_stmt(s, indent_level + 1))
-        
-        if stmt.false_block:
-            code.append(f"{indent}else:")
-            for s in stmt.false_block:
-                code.extend(gen_stmt(s, indent_level + 1))
-    
-    elif isinstance(stmt, ForStmt):
-        if isinstance(stmt.source, str):
-            source_code = stmt.source
-        else:
-            source_code = py_expr(stmt.source)
-        
-        code.append(f"{indent}for {stmt.iterator} in {source_code}:")
-        
-        for s in stmt.body:
-            code.extend(gen_stmt(s, indent_level + 1))
-    
-    return code
+    def aliasing(self, expr):
+        """Names whose buffer the value of `expr` shares (copies and slice views)"""
+        if isinstance(expr, (IDExpr, SliceExpr)):
+            return {expr.name}
+        return set()
+
+    def consumable_names(self, stmt, expr, owned):
+        """Owned arrays read once by `expr` whose old value is dead afterwards"""
+        names = expr_names(expr)
+        live = self.live_out[id(stmt)]
+        target = stmt.name if isinstance(stmt, Assign) else None
+        return {n for n in owned & self.arrays
+                if names.count(n) == 1 and (n not in live or n == target)}
 
 
 # --------------------------
-# Helper Functions for Output Formatting
+# Code Generation
 # --------------------------
 
-def format_tokens(tokens):
-    output = ["=" * 70]
-    output.append("LEXER OUTPUT (Tokens)")
-    output.append("=" * 70)
-    for i, (token_type, token_value) in enumerate(tokens):
-        if token_type == "NEWLINE":
-            output.append(f"{i:3d}. {token_type:<15} '\\n'")
-        elif token_type == "EOF":
-            output.append(f"{i:3d}. {token_type:<15} (end of file)")
-        else:
-            output.append(f"{i:3d}. {token_type:<15} '{token_value}'")
-    output.append("")
-    return "\n".join(output)
+# Pattern name -> runtime generator function
+PATTERN_FUNCS = {
+    "fibonacci": "_fib_inline",
+    "factorial": "_fact_inline",
+    "square": "_pat_square",
+    "cube": "_pat_cube",
+    "triangular": "_pat_triangular",
+    "arithmetic": "_pat_arithmetic",
+    "geometric": "_pat_geometric",
+}
 
-def format_syntax_tree(ast, indent=0):
-    """Format concrete syntax tree"""
-    lines = []
-    prefix = "│   " * indent
-    last_prefix = "└── "
-    mid_prefix = "├── "
-    
-    if isinstance(ast, Program):
-        lines.append(f"{prefix}Program")
-        for i, stmt in enumerate(ast.stmts):
-            is_last = (i == len(ast.stmts) - 1)
+BINOP_FUNCS = {'+': "_pat_add", '-': "_pat_sub", '*': "_pat_mul", '/': "_pat_div", MODULO: "_pat_mod"}
+
+MIRRORED = {'==': '==', '!=': '!=', '<': '>', '>': '<', '<=': '>=', '>=': '<='}  # c op x == x MIRRORED[op] c
+
+COMPARE_OPS = {'==': pyast.Eq, '!=': pyast.NotEq, '<': pyast.Lt,
+               '>': pyast.Gt, '<=': pyast.LtE, '>=': pyast.GtE}
+
+def py_name(name):
+    """Python identifier of a Sequentia variable.
+
+    Names starting with `_` get a `_v` prefix so a program variable can
+    never shadow a runtime helper (`_print`, `_pat_add`, ...) or the
+    `_budget`, `_sched` and `_prof` hooks; other names are kept as is.
+    """
+    return "_v" + name if name.startswith("_") else name
+
+def _load(name):
+    return pyast.Name(id=name, ctx=pyast.Load())
+
+def _store(name):
+    return pyast.Name(id=name, ctx=pyast.Store())
+
+def _del(name):
+    return pyast.Name(id=name, ctx=pyast.Del())
+
+def _call(func, *args):
+    return pyast.Call(func=func if isinstance(func, pyast.expr) else _load(func), args=list(args), keywords=[])
+
+def _method(obj, method, *args):
+    return _call(pyast.Attribute(value=_load(obj), attr=method, ctx=pyast.Load()), *args)
+
+class PyCodeGenerator:
+    """Builds a Python `ast.Module` for a checked Sequentia program.
+
+    The module is compiled directly with compile(), so no Python source text
+    is produced or re-parsed on the execution path. Runtime helpers are not
+    emitted; they come from sequentia_runtime via runtime_namespace().
+    With guard=True allocations and loops are metered by `_budget`.
+
+    By default the program body is wrapped in `def _program(...)` so every
+    Sequentia variable is a fast local, and the helpers it calls are bound
+    as default arguments; as_function=False emits a flat module instead.
+    With reuse=True (the default) LivenessAnalyzer decides where arrays are
+    released with `del` and which element-wise results may be computed in
+    a dead operand's buffer (the `_pat_*_into` helpers).
+    Given a DependencyGraph as `schedule`, its offloaded statements are
+    submitted to `_sched` at their launch points and read back in place.
+    With profile=True every statement is bracketed by `_prof.enter(line)`
+    and `_prof.exit()` and loop sources pass through `_prof.loop`; without
+    it no hook is emitted at all.
+    """
+    def __init__(self, guard=False, as_function=True, reuse=True, schedule=None, profile=False):
+        self.guard = guard
+        self.as_function = as_function
+        self.reuse = reuse
+        self.schedule = schedule
+        self.profile = profile
+        self.live = None
+        self.consumable = set()
+        self.launches = {}   # id(stmt) -> offloaded nodes submitted just before it
+        self.offloaded = {}  # id(stmt) -> index of an offloaded statement
+
+    def module(self, program):
+        if self.reuse:
+            self.live = LivenessAnalyzer(program).analyze()
+        if self.schedule is not None:
+            for node in self.schedule.offloaded:
+                if self.live is not None and id(node.stmt) in self.live.dead_stores:
+                    continue
+                launch = id(program.stmts[node.launch])
+                self.launches.setdefault(launch, []).append(node)
+                self.offloaded[id(node.stmt)] = node.index
+        body = self.stmts(program.stmts)
+        if self.as_function:
+            body = self.wrap_function(body, params=program.params)
+        return pyast.fix_missing_locations(pyast.Module(body=body, type_ignores=[]))
+
+    def wrap_function(self, body, name="_program", params=()):
+        """def _program(<param>=<param>, ..., <helper>=<helper>, ...): <body>; followed by the call"""
+        bindable = set(sequentia_runtime.__all__) | {"print", "_budget", "_sched", "_prof"}
+        used = [py_name(p) for p in params] + sorted({node.id for stmt in body for node in pyast.walk(stmt)
+                                      if isinstance(node, pyast.Name) and isinstance(node.ctx, pyast.Load)
+                                      and node.id in bindable})
+        args = pyast.arguments(posonlyargs=[], args=[pyast.arg(arg=h) for h in used],
+                               vararg=None, kwonlyargs=[], kw_defaults=[], kwarg=None,
+                               defaults=[_load(h) for h in used])
+        func = pyast.FunctionDef(name=name, args=args, body=body or [pyast.Pass()],
+                                 decorator_list=[], returns=None)
+        if "type_params" in pyast.FunctionDef._fields:
+            func.type_params = []
+        return [func, pyast.Expr(_call(name))]
+
+    def block(self, stmts):
+        return self.stmts(stmts) or [pyast.Pass()]
+
+    def stmts(self, stmts):
+        body = []
+        for s in stmts:
+            for node in self.launches.get(id(s), ()):
+                body.append(pyast.Expr(self.submit(node)))
+            if self.live is None or id(s) not in self.live.dead_stores:
+                code = self.stmt(s)
+                if self.profile and s.line is not None:
+                    code = ([pyast.Expr(_method("_prof", "enter", pyast.Constant(value=s.line)))] + code
+                            + [pyast.Expr(_method("_prof", "exit"))])
+                body.extend(code)
+            if self.live is not None and id(s) in self.live.release:
+                body.append(pyast.Delete(targets=[_del(py_name(n)) for n in self.live.release[id(s)]]))
+        return body
+
+    def stmt(self, stmt):
+        self.consumable = self.live.consumable.get(id(stmt), set()) if self.live is not None else set()
+        if isinstance(stmt, Assign):
+            code = []
+            value = stmt.expr
+            if id(stmt) in self.offloaded:
+                value = _method("_sched", "result", pyast.Constant(value=self.offloaded[id(stmt)]))
+            elif isinstance(value, PatternExpr) and self.guard:
+                # Charge the pattern up front rather than inside the expression
+                code.append(pyast.Expr(self.pattern_charge(value)))
+                value = self.pattern(value)
+            else:
+                value = self.expr(value)
+            code.append(pyast.Assign(targets=[_store(py_name(stmt.name))], value=value))
+            return code
+
+        if isinstance(stmt, Print):
+            if stmt.name == "_expr_":
+                return [pyast.Expr(_call("_print", self.expr(stmt.index_expr)))]
+            if stmt.index_expr:
+                item = pyast.Subscript(value=_load(py_name(stmt.name)), slice=self.expr(stmt.index_expr), ctx=pyast.Load())
+                return [pyast.Expr(_call("print", item))]
+            return [pyast.Expr(_call("_print", _load(py_name(stmt.name))))]
+
+        if isinstance(stmt, IfStmt):
+            self.consumable = set()
+            return [pyast.If(test=self.expr(stmt.condition),
+                             body=self.block(stmt.true_block),
+                             orelse=self.block(stmt.false_block) if stmt.false_block else [])]
+
+        if isinstance(stmt, ForStmt):
+            self.consumable = set()
+            source = _load(py_name(stmt.source)) if isinstance(stmt.source, str) else self.expr(stmt.source)
+            if self.profile and stmt.line is not None:
+                source = _method("_prof", "loop", pyast.Constant(value=stmt.line), source)
+            if self.guard:
+                source = _method("_budget", "loop", source)
+            return [pyast.For(target=_store(py_name(stmt.iterator)), iter=source,
+                              body=self.block(stmt.body), orelse=[])]
+
+        raise Exception("Invalid statement")
+
+    def expr(self, expr):
+        if isinstance(expr, NumberExpr):
+            return pyast.Constant(value=expr.value)
+        if isinstance(expr, IDExpr):
+            return _load(py_name(expr.name))
+        if isinstance(expr, ArrayAccessExpr):
+            if expr.select:
+                node = self.select(expr)
+                return _method("_budget", "seq", node) if self.guard else node
+            return pyast.Subscript(value=_load(py_name(expr.name)), slice=self.expr(expr.index_expr), ctx=pyast.Load())
+        if isinstance(expr, SliceExpr):
+            # Zero-copy view over the parent; nothing to charge against a budget
+            args = [_load(py_name(expr.name)),
+                    self.expr(expr.start) if expr.start else pyast.Constant(value=None)]
+            if expr.end:
+                args.append(self.expr(expr.end))
+            return _call("_seq_view", *args)
+        if isinstance(expr, BinOp):
+            if expr.mask:
+                node = _call("_seq_compare", pyast.Constant(value=expr.op), self.expr(expr.left), self.expr(expr.right))
+                return _method("_budget", "seq", node) if self.guard else node
+            if expr.op in COMPARE_OPS:
+                return pyast.Compare(left=self.expr(expr.left), ops=[COMPARE_OPS[expr.op]()],
+                                     comparators=[self.expr(expr.right)])
+            if expr.op == MODULO and isinstance(expr.left, PatternExpr) and expr.left.modulus is not None:
+                return self.expr(expr.left)  # generated already reduced by this modulus
+            left, right = expr.left, expr.right
+            if expr.op in ('+', '*') and not self.reusable(left) and self.reusable(right):
+                left, right = right, left
+            func = BINOP_FUNCS[expr.op] + ("_into" if self.reusable(left) else "")
+            node = _call(func, self.expr(left), self.expr(right))
+            return _method("_budget", "seq", node) if self.guard else node
+        if isinstance(expr, PatternExpr):
+            if expr.modulus is not None:
+                args = pyast.Tuple(elts=[self.expr(a) for a in expr.args], ctx=pyast.Load())
+                node = _call("_pattern_mod", pyast.Constant(value=expr.pattern_name), args, self.expr(expr.modulus))
+                return _method("_budget", "seq", node) if self.guard else node
+            if self.guard:
+                # (_budget.pattern(...) or _pat_x(...)): charged before it is built
+                return pyast.BoolOp(op=pyast.Or(), values=[self.pattern_charge(expr), self.pattern(expr)])
+            return self.pattern(expr)
+        if isinstance(expr, ReduceExpr):
+            return self.reduction(expr)
+        if isinstance(expr, SearchExpr):
+            return self.search(expr)
+        if isinstance(expr, ScanExpr):
+            args = [self.expr(expr.operand)] + ([self.expr(expr.width)] if expr.width is not None else [])
+            node = _call("_seq_" + expr.op, *args)
+            return _method("_budget", "seq", node) if self.guard else node
+        raise Exception("Invalid expression")
+
+    def reduction(self, expr):
+        """Folded constant, closed form over the pattern's arguments, or one streaming pass"""
+        if expr.value is not None:
+            return pyast.Constant(value=expr.value)
+        op = pyast.Constant(value=expr.op)
+        if expr.closed_form is not None:
+            pattern, args = expr.closed_form
+            return _call("_pattern_reduce", op, pyast.Constant(value=pattern),
+                         pyast.Tuple(elts=[pyast.Constant(value=a) for a in args], ctx=pyast.Load()))
+        if isinstance(expr.operand, PatternExpr) and expr.operand.modulus is None:
+            args = pyast.Tuple(elts=[self.expr(a) for a in expr.operand.args], ctx=pyast.Load())
+            return _call("_pattern_reduce", op, pyast.Constant(value=expr.operand.pattern_name), args)
+        return _call("_seq_" + expr.op, self.expr(expr.operand))
+
+    def search(self, expr):
+        """Folded constant, inverse of the pattern's formula, or one linear scan"""
+        if expr.value is not None:
+            return pyast.Constant(value=expr.value)
+        item = self.expr(expr.item)
+        func = "_pattern_contains" if expr.op == 'in' else "_pattern_index"
+        if expr.closed_form is not None:
+            pattern, args = expr.closed_form
+            return _call(func, pyast.Constant(value=pattern),
+                         pyast.Tuple(elts=[pyast.Constant(value=a) for a in args], ctx=pyast.Load()), item)
+        if isinstance(expr.operand, PatternExpr):
+            args = pyast.Tuple(elts=[self.expr(a) for a in expr.operand.args], ctx=pyast.Load())
+            return _call(func, pyast.Constant(value=expr.operand.pattern_name), args, item)
+        func = "_seq_contains" if expr.op == 'in' else "_seq_indexof"
+        return _call(func, self.expr(expr.operand), item)
+
+    def select(self, expr):
+        """x[mask]; x[x op c] filters x in one pass without building the mask"""
+        if expr.filter is not None:
+            op, side = expr.filter
+            return _call("_seq_filter", pyast.Constant(value=op), _load(py_name(expr.name)),
+                         self.expr(getattr(expr.index_expr, side)))
+        return _call("_seq_select", _load(py_name(expr.name)), self.expr(expr.index_expr))
+
+    def reusable(self, expr):
+        """True if the value of `expr` is a sequence buffer nothing else will read"""
+        if self.live is None:
+            return False
+        if isinstance(expr, IDExpr):
+            return expr.name in self.consumable
+        if isinstance(expr, BinOp) and expr.op in BINOP_FUNCS:
+            # Scalar arithmetic stays on the plain helpers' fast path
+            return _is_array_expr(expr, self.live.arrays)
+        return isinstance(expr, PatternExpr)
+
+    def submit(self, node):
+        """_sched.submit(index, {input: value, ...})"""
+        names = sorted(node.reads)
+        inputs = pyast.Dict(keys=[pyast.Constant(value=n) for n in names], values=[_load(py_name(n)) for n in names])
+        return _method("_sched", "submit", pyast.Constant(value=node.index), inputs)
+
+    def pattern(self, expr):
+        if expr.pattern_name not in PATTERN_FUNCS:
+            raise Exception("Unknown pattern " + expr.pattern_name)
+        return _call(PATTERN_FUNCS[expr.pattern_name], *[self.expr(a) for a in expr.args])
+
+    def pattern_charge(self, expr):
+        args = pyast.Tuple(elts=[self.expr(a) for a in expr.args], ctx=pyast.Load())
+        return _method("_budget", "pattern", pyast.Constant(value=expr.pattern_name), args)
+
+
+def get_runtime_helpers():
+    """Source of the runtime support library (sequentia_runtime)"""
+    import inspect
+    return inspect.getsource(sequentia_runtime)
+
+def runtime_namespace():
+    """Fresh globals dict holding the runtime helpers.
+
+    The helpers live in the sequentia_runtime module, imported once per
+    process; each call returns a new dict so programs never see each
+    other's variables.
+    """
+    return {name: getattr(sequentia_runtime, name) for name in sequentia_runtime.__all__}
+
+def compile_python(ast, guard=False, filename="<sequentia>", as_function=True, reuse=True, schedule=None,
+                   profile=False):
+    """Compile a checked program straight from Python AST nodes to a code object"""
+    return compile(PyCodeGenerator(guard, as_function, reuse, schedule, profile).module(ast), filename, "exec")
+
+def generate_python(ast, include_runtime=True, guard=False, profile=False):
+    """Readable Python source for a program (diagnostics only; execution uses compile_python)"""
+    return python_source(PyCodeGenerator(guard, profile=profile).module(ast), include_runtime)
+
+def python_source(module, include_runtime=True):
+    """Readable Python source for a module PyCodeGenerator already built"""
+    code = ["# Generated Python Code"]
+    if include_runtime:
+        code.append("from sequentia_runtime import " + ", ".join(sequentia_runtime.__all__))
+    code.append(pyast.unparse(module))
+    return "\n".join(code)
+
+
+# --------------------------
+# Cost Model & Admission Control
+# --------------------------
+
+LN2 = math.log(2)
+
+def _int_bytes(bits):
+    """Approximate sys.getsizeof of a Python int with `bits` significant bits"""
+    return 24 + 4 * max(1, math.ceil(bits / 30))
+
+def _pattern_bits(pattern, args):
+    """Bit length of element i as a function, or None for unknown patterns"""
+    if pattern == "fibonacci":
+        return lambda i: 0.6942 * i + 1
+    if pattern == "factorial":
+        return lambda i: math.lgamma(i + 2) / LN2 + 1
+    if pattern == "square":
+        return lambda i: 2 * math.log2(i + 1) + 1
+    if pattern == "cube":
+        return lambda i: 3 * math.log2(i + 1) + 1
+    if pattern == "triangular":
+        return lambda i: math.log2((i + 1) * (i + 2) / 2) + 1
+    if pattern == "arithmetic":
+        start, step = args[0], args[1]
+        return lambda i: math.log2(abs(start + step * i) + 1) + 1
+    if pattern == "geometric":
+        start, ratio = args[0], args[1]
+        if start == 0 or ratio == 0:
+            return lambda i: 1
+        return lambda i: math.log2(abs(start)) + i * math.log2(abs(ratio)) + 1
+    return None
+
+def _sum_int_bytes(n, bits_fn, samples=32):
+    """Approximate total size of n ints whose bit length follows bits_fn (trapezoid rule)"""
+    if n <= samples:
+        return sum(_int_bytes(bits_fn(i)) for i in range(n))
+    step = (n - 1) / samples
+    points = [_int_bytes(bits_fn(k * step)) for k in range(samples + 1)]
+    return int(n * (sum(points) - (points[0] + points[-1]) / 2) / samples)
+
+# Patterns the runtime stores as array('q') when every element fits in int64
+COMPACT_PATTERNS = ("square", "cube", "triangular", "arithmetic", "geometric")
+
+def _compact_storage(n, bits):
+    return n >= sequentia_runtime.COMPACT_MIN_LENGTH and bits < 64
+
+def _seq_bytes(n, bits, compact):
+    """Size of an n-element sequence: array('q') if compact, else a list of ints"""
+    if compact:
+        return 64 + 8 * n
+    return 56 + n * (8 + _int_bytes(bits))
+
+def pattern_cost(pattern, args):
+    """Predict materialising `pattern` with concrete integer args.
+
+    Returns (elements, bytes, ops, max_bits): the sequence length, its storage
+    in bytes (array('q') when compact, else the list plus its int objects),
+    one op per element, and the widest element.
+    """
+    n = max(0, args[-1])
+    bits_fn = _pattern_bits(pattern, args)
+    if n == 0:
+        return 0, 56, 0, 0
+    # Every pattern is monotone in magnitude, so the widest element is at an end
+    max_bits = int(max(bits_fn(0), bits_fn(n - 1)))
+    if pattern in COMPACT_PATTERNS and _compact_storage(n, max_bits):
+        nbytes = _seq_bytes(n, max_bits, True)
+    else:
+        nbytes = 56 + 8 * n + _sum_int_bytes(n, bits_fn)
+    return n, nbytes, n, max_bits
+
+class BudgetExceeded(Exception):
+    pass
+
+class ExecutionBudget:
+    """Limits for one program run; None means unlimited"""
+    def __init__(self, max_elements=None, max_bytes=None, max_time=None):
+        self.max_elements = max_elements
+        self.max_bytes = max_bytes
+        self.max_time = max_time  # seconds of wall time
+    def __repr__(self): return f"ExecutionBudget(max_elements={self.max_elements}, max_bytes={self.max_bytes}, max_time={self.max_time})"
+
+class StatementCost:
+    def __init__(self, index, stmt):
+        self.index = index
+        self.stmt = stmt
+        self.elements = 0
+        self.bytes = 0
+        self.ops = 0
+        self.max_bits = 0
+        self.exact = True  # False when some size depends on values unknown statically
+
+    def add(self, elements, nbytes, ops, bits=0):
+        self.elements += elements
+        self.bytes += nbytes
+        self.ops += ops
+        self.max_bits = max(self.max_bits, int(bits))
+
+    def scaled(self, factor):
+        """This cost repeated `factor` times (loop bodies)"""
+        c = StatementCost(self.index, self.stmt)
+        c.add(self.elements * factor, self.bytes * factor, self.ops * factor, self.max_bits)
+        c.exact = self.exact
+        return c
+
+    def merge(self, other):
+        self.add(other.elements, other.bytes, other.ops, other.max_bits)
+        self.exact = self.exact and other.exact
+
+    def to_dict(self):
+        return {"index": self.index, "stmt": repr(self.stmt), "elements": self.elements,
+                "bytes": self.bytes, "ops": self.ops, "max_bits": self.max_bits, "exact": self.exact}
+
+    def __repr__(self): return f"StatementCost({self.index}, elements={self.elements}, bytes={self.bytes}, ops={self.ops})"
+
+class ProgramCost:
+    def __init__(self, statements):
+        self.statements = statements
+        self.elements = sum(s.elements for s in statements)
+        self.bytes = sum(s.bytes for s in statements)
+        self.ops = sum(s.ops for s in statements)
+        self.max_bits = max([s.max_bits for s in statements], default=0)
+        self.exact = all(s.exact for s in statements)
+
+    def to_dict(self):
+        return {"elements": self.elements, "bytes": self.bytes, "ops": self.ops,
+                "max_bits": self.max_bits, "exact": self.exact,
+                "statements": [s.to_dict() for s in self.statements]}
+
+    def __repr__(self): return f"ProgramCost(elements={self.elements}, bytes={self.bytes}, ops={self.ops}, exact={self.exact})"
+
+class _Value:
+    """What the estimator knows about a value: kind, length, width, constant"""
+    def __init__(self, kind, length=None, bits=64, value=None, compact=False):
+        self.kind = kind      # "int" or "array"
+        self.length = length  # arrays: element count, None if unknown
+        self.bits = bits      # widest element / scalar in bits
+        self.value = value    # scalars: constant value if known
+        self.compact = compact  # arrays: stored as array('q')
+
+class CostEstimator:
+    """Static upper-bound estimate of elements, bytes and ops per statement.
+
+    Walks the checked AST tracking array lengths (as SemanticAnalyzer does)
+    plus constant scalars and element widths, so `n = 1000` followed by
+    `pattern factorial n` is still priced. Loop bodies are multiplied by the
+    trip count and if/else takes the costlier branch. Sizes that depend on
+    runtime values make the estimate inexact rather than failing; `bindings`
+    gives program parameters their values for one run.
+    """
+    def __init__(self, ast, bindings=None):
+        self.ast = ast
+        self.vals = {name: _Value("int", bits=max(1, value.bit_length()), value=value)
+                     for name, value in (bindings or {}).items()}
+
+    def estimate(self):
+        costs = []
+        for i, stmt in enumerate(self.ast.stmts):
+            cost = StatementCost(i, stmt)
+            self.stmt_cost(stmt, cost)
+            costs.append(cost)
+        return ProgramCost(costs)
+
+    def stmt_cost(self, stmt, cost):
+        if isinstance(stmt, Assign):
+            self.vals[stmt.name] = self.expr_cost(stmt.expr, cost)
+        elif isinstance(stmt, Print):
+            if stmt.name == "_expr_":
+                v = self.expr_cost(stmt.index_expr, cost)
+            elif stmt.index_expr:
+                self.expr_cost(stmt.index_expr, cost)
+                v = _Value("int", bits=self.vals.get(stmt.name, _Value("int")).bits)
+            else:
+                v = self.vals.get(stmt.name, _Value("int"))
+            self.print_cost(v, cost)
+        elif isinstance(stmt, IfStmt):
+            self.expr_cost(stmt.condition, cost)
+            before = dict(self.vals)
+            true_cost = StatementCost(cost.index, stmt)
+            for s in stmt.true_block:
+                self.stmt_cost(s, true_cost)
+            after_true = self.vals
+            self.vals = dict(before)
+            false_cost = StatementCost(cost.index, stmt)
+            for s in stmt.false_block or []:
+                self.stmt_cost(s, false_cost)
+            self.vals = self.join(after_true, self.vals)
+            worst = true_cost if true_cost.bytes >= false_cost.bytes else false_cost
+            worst.exact = true_cost.exact and false_cost.exact
+            cost.merge(worst)
+        elif isinstance(stmt, ForStmt):
+            if isinstance(stmt.source, str):
+                src = self.vals.get(stmt.source, _Value("array"))
+            else:
+                src = self.expr_cost(stmt.source, cost)
+            # Values reassigned in the body are not constant across iterations
+            for name in assigned_names(stmt.body):
+                if name in self.vals:
+                    old = self.vals[name]
+                    self.vals[name] = _Value(old.kind, None if old.kind == "array" else old.length, old.bits,
+                                             compact=old.compact)
+            self.vals[stmt.iterator] = _Value("int", bits=src.bits)
+            body_cost = StatementCost(cost.index, stmt)
+            for s in stmt.body:
+                self.stmt_cost(s, body_cost)
+            if src.length is None:
+                body_cost.exact = False
+                cost.merge(body_cost)
+            else:
+                cost.merge(body_cost.scaled(src.length))
+
+    def join(self, a, b):
+        out = {}
+        for name in set(a) | set(b):
+            x, y = a.get(name), b.get(name)
+            if x is None or y is None or x.kind != y.kind:
+                out[name] = x if y is None else y
+                continue
+            length = max(x.length, y.length) if x.length is not None and y.length is not None else None
+            value = x.value if x.value == y.value else None
+            out[name] = _Value(x.kind, length, max(x.bits, y.bits), value, x.compact and y.compact)
+        return out
+
+    def print_cost(self, v, cost):
+        if v.kind == "array":
+            if v.length is None:
+                cost.exact = False
+                return
+            # ' '.join builds one string of roughly bits*log10(2)+1 chars per element
+            chars = int(v.length * (v.bits * 0.30103 + 1))
+            cost.add(0, chars + 49, v.length, v.bits)
+        else:
+            cost.add(0, 0, 1, v.bits)
+
+    def expr_cost(self, expr, cost):
+        if isinstance(expr, NumberExpr):
+            return _Value("int", bits=max(1, expr.value.bit_length()), value=expr.value)
+        if isinstance(expr, IDExpr):
+            return self.vals.get(expr.name, _Value("int"))
+        if isinstance(expr, ArrayAccessExpr):
+            src = self.vals.get(expr.name, _Value("array"))
+            if not expr.select:
+                self.expr_cost(expr.index_expr, cost)
+                cost.add(0, 0, 1)
+                return _Value("int", bits=src.bits)
+            if expr.filter is not None:
+                # x[x op c] filters in one pass: no mask is built
+                self.expr_cost(getattr(expr.index_expr, expr.filter[1]), cost)
+            else:
+                self.expr_cost(expr.index_expr, cost)
+            # Every element may be selected, so the source length is the bound
+            if src.length is None:
+                cost.exact = False
+            else:
+                cost.add(src.length, _seq_bytes(src.length, src.bits, src.compact), src.length, src.bits)
+            return _Value("array", src.length, src.bits, compact=src.compact)
+        if isinstance(expr, SliceExpr):
+            src = self.vals.get(expr.name, _Value("array"))
+            start = self.expr_cost(expr.start, cost).value if expr.start else 0
+            end = self.expr_cost(expr.end, cost).value if expr.end else src.length
+            length = None
+            if start is not None and end is not None:
+                length = max(0, end - start)
+                if src.length is not None:
+                    length = min(length, max(0, src.length - start))
+            if length is None:
+                length = src.length  # a slice is never longer than its source
+            # Slices are views over the parent: constant size, no element copies
+            cost.add(0, 72, 1, src.bits)
+            return _Value("array", length, src.bits, compact=src.compact)
+        if isinstance(expr, BinOp):
+            if expr.op == MODULO and isinstance(expr.left, PatternExpr) and expr.left.modulus is not None:
+                return self.expr_cost(expr.left, cost)  # generated reduced; see PyCodeGenerator
+            left = self.expr_cost(expr.left, cost)
+            right = self.expr_cost(expr.right, cost)
+            if expr.op in ['==', '!=', '<', '>', '<=', '>=']:
+                if not expr.mask:
+                    cost.add(0, 0, 1)
+                    return _Value("int", bits=1)
+                # A mask is a bytearray: one byte per element
+                lengths = [v.length for v in (left, right) if v.kind == "array"]
+                length = None if None in lengths else min(lengths)
+                if length is None:
+                    cost.exact = False
+                else:
+                    cost.add(length, 57 + length, length, 1)
+                return _Value("array", length, 1)
+            if expr.op == '*':
+                bits = left.bits + right.bits
+            elif expr.op == '/':
+                bits = left.bits
+            elif expr.op == MODULO:
+                bits = min(left.bits, right.bits)
+            else:
+                bits = max(left.bits, right.bits) + 1
+            if left.kind == "int" and right.kind == "int":
+                value = None
+                if left.value is not None and right.value is not None:
+                    if expr.op == '+': value = left.value + right.value
+                    elif expr.op == '-': value = left.value - right.value
+                    elif expr.op == '*': value = left.value * right.value
+                    elif right.value == 0: value = None
+                    elif expr.op == '/': value = left.value // right.value
+                    else: value = left.value % right.value
+                if value is not None:
+                    bits = max(1, value.bit_length())
+                cost.add(0, 0, 1, bits)
+                return _Value("int", bits=bits, value=value)
+            lengths = [v.length for v in (left, right) if v.kind == "array"]
+            length = None if None in lengths else min(lengths)
+            compact = False
+            if length is None:
+                cost.exact = False
+            else:
+                compact = (left.compact or right.compact) and _compact_storage(length, bits)
+                cost.add(length, _seq_bytes(length, bits, compact), length, bits)
+            return _Value("array", length, bits, compact=compact)
+        if isinstance(expr, PatternExpr):
+            args = [self.expr_cost(a, cost).value for a in expr.args]
+            if None in args:
+                cost.exact = False
+                return _Value("array")
+            if expr.modulus is not None:
+                # Residues: the pattern's length, each element narrower than the modulus
+                m = self.expr_cost(expr.modulus, cost).value
+                n = max(0, args[-1])
+                bits = max(1, (abs(m) - 1).bit_length()) if m else 64
+                compact = _compact_storage(n, bits)
+                cost.add(n, _seq_bytes(n, bits, compact), n, bits)
+                return _Value("array", n, bits, compact=compact)
+            elements, nbytes, ops, bits = pattern_cost(expr.pattern_name, args)
+            cost.add(elements, nbytes, ops, bits)
+            compact = expr.pattern_name in COMPACT_PATTERNS and _compact_storage(elements, bits)
+            return _Value("array", elements, max(1, bits), compact=compact)
+        if isinstance(expr, ReduceExpr):
+            if expr.value is not None:
+                return _Value("int", bits=max(1, expr.value.bit_length()), value=expr.value)
+            if expr.closed_form is not None or (isinstance(expr.operand, PatternExpr)
+                                                and expr.operand.modulus is None):
+                # Closed form over the pattern's arguments: nothing is generated
+                if isinstance(expr.operand, PatternExpr):
+                    for a in expr.operand.args:
+                        self.expr_cost(a, cost)
+                cost.add(0, 0, 1)
+                return _Value("int")
+            src = self.expr_cost(expr.operand, cost)
+            if src.length is None:
+                cost.exact = False
+                return _Value("int")
+            cost.add(0, 0, max(1, src.length))
+            if expr.op == "len":
+                return _Value("int", bits=max(1, src.length.bit_length()), value=src.length)
+            bits = src.bits + math.log2(src.length + 1) if expr.op == "sum" else src.bits
+            return _Value("int", bits=bits)
+        if isinstance(expr, ScanExpr):
+            src = self.expr_cost(expr.operand, cost)
+            width = self.expr_cost(expr.width, cost).value if expr.width is not None else None
+            if src.length is None or (expr.op == 'window_sum' and width is None):
+                cost.exact = False
+                return _Value("array", src.length, src.bits + 64, compact=src.compact)
+            n = src.length
+            if expr.op == 'cumsum':
+                length, bits = n, src.bits + math.log2(n + 1)
+            elif expr.op == 'diff':
+                length, bits = max(0, n - 1), src.bits + 1
+            else:
+                length, bits = max(0, n - max(1, width) + 1), src.bits + math.log2(max(1, width))
+            compact = src.compact and _compact_storage(length, bits)
+            # One pass over the source, one new element per output
+            cost.add(length, _seq_bytes(length, bits, compact), n, bits)
+            return _Value("array", length, max(1, bits), compact=compact)
+        if isinstance(expr, SearchExpr):
+            if expr.value is not None:
+                return _Value("int", bits=max(1, int(expr.value).bit_length()), value=expr.value)
+            self.expr_cost(expr.item, cost)
+            if expr.closed_form is not None or isinstance(expr.operand, PatternExpr):
+                # Inverted formula: a few element computations, nothing generated
+                if isinstance(expr.operand, PatternExpr):
+                    for a in expr.operand.args:
+                        self.expr_cost(a, cost)
+                cost.add(0, 0, 1)
+                return _Value("int")
+            src = self.expr_cost(expr.operand, cost)
+            if src.length is None:
+                cost.exact = False
+                return _Value("int")
+            cost.add(0, 0, max(1, src.length))
+            bits = 1 if expr.op == 'in' else max(1, src.length.bit_length())
+            return _Value("int", bits=bits)
+        return _Value("int")
+
+def assigned_names(stmts):
+    """Every name assigned (or used as a loop iterator) anywhere in `stmts`"""
+    names = set()
+    for s in stmts:
+        if isinstance(s, Assign):
+            names.add(s.name)
+        elif isinstance(s, IfStmt):
+            names |= assigned_names(s.true_block)
+            names |= assigned_names(s.false_block or [])
+        elif isinstance(s, ForStmt):
+            names.add(s.iterator)
+            names |= assigned_names(s.body)
+    return names
+
+def estimate_cost(src):
+    """Parse, check and statically price a program"""
+    ast = Parser(Lexer(src).tokens()).parse_program()
+    SemanticAnalyzer(ast).check()
+    return CostEstimator(ast).estimate()
+
+def check_budget(cost, budget):
+    """Reject a program whose static estimate already exceeds `budget`"""
+    for s in cost.statements:
+        if budget.max_elements is not None and s.elements > budget.max_elements:
+            raise BudgetExceeded(f"statement {s.index + 1} ({s.stmt}) would create ~{s.elements} elements "
+                                 f"(limit {budget.max_elements})")
+        if budget.max_bytes is not None and s.bytes > budget.max_bytes:
+            raise BudgetExceeded(f"statement {s.index + 1} ({s.stmt}) would need ~{s.bytes} bytes "
+                                 f"(limit {budget.max_bytes})")
+    if budget.max_elements is not None and cost.elements > budget.max_elements:
+        raise BudgetExceeded(f"program would create ~{cost.elements} elements (limit {budget.max_elements})")
+    if budget.max_bytes is not None and cost.bytes > budget.max_bytes:
+        raise BudgetExceeded(f"program would allocate ~{cost.bytes} bytes (limit {budget.max_bytes})")
+
+class BudgetMeter:
+    """Runtime side of an ExecutionBudget, bound as `_budget` in guarded code.
+
+    Counts are cumulative allocations, matching the static estimate, so a
+    program is stopped as soon as it has asked for more than it may use.
+    """
+    def __init__(self, budget):
+        self.budget = budget
+        self.elements = 0
+        self.bytes = 0
+        self.deadline = None
+        if budget.max_time is not None:
+            self.deadline = time.perf_counter() + budget.max_time
+
+    def check_time(self):
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise BudgetExceeded(f"program exceeded {self.budget.max_time}s time limit")
+
+    def charge(self, elements, nbytes, what):
+        self.elements += elements
+        self.bytes += nbytes
+        b = self.budget
+        if b.max_elements is not None and self.elements > b.max_elements:
+            raise BudgetExceeded(f"{what} exceeds element limit ({self.elements} > {b.max_elements})")
+        if b.max_bytes is not None and self.bytes > b.max_bytes:
+            raise BudgetExceeded(f"{what} exceeds memory limit (~{self.bytes} > {b.max_bytes} bytes)")
+        self.check_time()
+
+    def pattern(self, name, args):
+        """Charge a pattern before it is generated; returns None"""
+        elements, nbytes, _, _ = pattern_cost(name, list(args))
+        self.charge(elements, nbytes, f"pattern {name} {', '.join(str(a) for a in args)}")
+
+    def seq(self, value):
+        """Charge a freshly built sequence (element-wise, mask, scan or selection result).
+
+        Slices are zero-copy views of their parent and are never charged.
+        """
+        if isinstance(value, array):
+            self.charge(len(value), 64 + 8 * len(value), "sequence result")
+        elif not isinstance(value, int):
+            self.charge(len(value), 56 + 36 * len(value), "sequence result")
+        return value
+
+    def loop(self, seq):
+        check = self.check_time
+        for i, v in enumerate(seq):
+            if not i & 1023:
+                check()
+            yield v
+
+@contextlib.contextmanager
+def _time_limit(seconds):
+    """Interrupt long-running builtins with SIGALRM where that is possible"""
+    import signal, threading
+    if (seconds is None or not hasattr(signal, "setitimer")
+            or threading.current_thread() is not threading.main_thread()):
+        yield
+        return
+    def on_alarm(signum, frame):
+        raise BudgetExceeded(f"program exceeded {seconds}s time limit")
+    previous = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+def format_cost(cost):
+    output = ["=" * 70]
+    output.append("STATIC COST ESTIMATE")
+    output.append("=" * 70)
+    output.append(f"{'#':>3}  {'Elements':>12} {'Bytes':>14} {'Ops':>12} {'Bits':>8}  Statement")
+    output.append("-" * 70)
+    for s in cost.statements:
+        mark = "" if s.exact else " (+?)"
+        output.append(f"{s.index + 1:>3}. {s.elements:>12} {s.bytes:>14} {s.ops:>12} {s.max_bits:>8}  "
+                      f"{type(s.stmt).__name__}{mark}")
+    output.append("-" * 70)
+    output.append(f"{'total':<5}{cost.elements:>12} {cost.bytes:>14} {cost.ops:>12} {cost.max_bits:>8}")
+    if not cost.exact:
+        output.append("(+?) some sizes depend on runtime values; figures are lower bounds")
+    output.append("")
+    return "\n".join(output)
+
+
+# --------------------------
+# Statement Scheduling
+# --------------------------
+
+PARALLEL_MIN_OPS = 200_000      # element operations that make a statement worth a worker
+PARALLEL_MAX_BYTES_PER_OP = 16  # wider results cost more to pickle than to build
+OUTPUT = "<output>"  # pseudo-name written by every statement that prints
+
+def _prints(stmts):
+    for s in stmts:
+        if isinstance(s, Print):
+            return True
+        if isinstance(s, IfStmt) and _prints(s.true_block + (s.false_block or [])):
+            return True
+        if isinstance(s, ForStmt) and _prints(s.body):
+            return True
+    return False
+
+class StatementNode:
+    def __init__(self, index, stmt, reads, writes):
+        self.index = index
+        self.stmt = stmt
+        self.reads = reads
+        self.writes = writes
+        self.deps = set()   # indexes of earlier statements this one must follow
+        self.launch = 0     # index of the statement before which its inputs are final
+        self.cost = None
+        self.offload = False
+    def __repr__(self): return f"StatementNode({self.index}, deps={sorted(self.deps)}, offload={self.offload})"
+
+class DependencyGraph:
+    """Def-use DAG over a program's top-level statements.
+
+    Statement j depends on an earlier statement i when j reads a name i
+    writes, writes a name i reads, or both write the same name; printing
+    writes the shared OUTPUT, so prints keep their order. A compound
+    statement reads every name it mentions.
+
+    An assignment is offloaded to a worker process when the cost model
+    expects at least min_ops element operations, every name it reads is a
+    scalar, and its result takes at most max_bytes_per_op bytes per
+    operation (big-integer sequences cost more to pickle than to build).
+    It is submitted once the last statement writing one of its inputs has
+    run and is only bound where it stood, so it overlaps with everything in
+    between, including other offloaded statements.
+    """
+    def __init__(self, ast, min_ops=PARALLEL_MIN_OPS, max_bytes_per_op=PARALLEL_MAX_BYTES_PER_OP):
+        self.ast = ast
+        self.min_ops = min_ops
+        self.max_bytes_per_op = max_bytes_per_op
+        self.nodes = []
+        self.build()
+
+    @property
+    def offloaded(self):
+        return [n for n in self.nodes if n.offload]
+
+    def build(self):
+        estimator = CostEstimator(self.ast)
+        last_write = {}  # name -> index of the last statement writing it
+        readers = {}     # name -> indexes reading it since that write
+        candidates = []
+        for i, stmt in enumerate(self.ast.stmts):
+            reads = set(expr_names(stmt.expr)) if isinstance(stmt, Assign) else stmt_names(stmt)
+            writes = assigned_names([stmt])
+            if _prints([stmt]):
+                writes.add(OUTPUT)
+            node = StatementNode(i, stmt, reads, writes)
+            inputs = [last_write[n] for n in reads if n in last_write]
+            node.deps.update(inputs)
+            node.launch = max(inputs, default=-1) + 1
+            for name in writes:
+                if name in last_write:
+                    node.deps.add(last_write[name])
+                node.deps.update(readers.get(name, ()))
+            scalar_inputs = all(n in estimator.vals and estimator.vals[n].kind == "int" for n in reads)
+            node.cost = StatementCost(i, stmt)
+            estimator.stmt_cost(stmt, node.cost)
+            if isinstance(stmt, Assign) and scalar_inputs and self.worth_offloading(node, estimator.vals[stmt.name]):
+                candidates.append(node)
+            for name in reads:
+                readers.setdefault(name, set()).add(i)
+            for name in writes:
+                last_write[name] = i
+                readers[name] = set()
+            self.nodes.append(node)
+        # Offloading only pays if something else can run meanwhile
+        sharing = {}
+        for node in candidates:
+            sharing[node.launch] = sharing.get(node.launch, 0) + 1
+        for node in candidates:
+            node.offload = node.launch < node.index or sharing[node.launch] > 1
+
+    def worth_offloading(self, node, value):
+        cost = node.cost
+        if not cost.exact or cost.ops < self.min_ops:
+            return False
+        shipped = _seq_bytes(value.length, value.bits, value.compact) if value.kind == "array" else 0
+        return shipped <= cost.ops * self.max_bytes_per_op
+
+def _run_statement(stmt, inputs):
+    """Worker side: evaluate one offloaded assignment with its scalar inputs bound"""
+    namespace = runtime_namespace()
+    namespace.update((py_name(name), value) for name, value in inputs.items())
+    exec(compile_python(Program([stmt]), as_function=False, reuse=False), namespace)
+    return namespace[py_name(stmt.name)]
+
+_statement_pools = {}  # worker count -> warm ProcessPoolExecutor, reused across runs
+
+def statement_pool(workers=None):
+    """Shared process pool for offloaded statements"""
+    from concurrent.futures import ProcessPoolExecutor
+    if workers not in _statement_pools:
+        _statement_pools[workers] = ProcessPoolExecutor(max_workers=workers, initializer=_batch_worker_init)
+    return _statement_pools[workers]
+
+class StatementScheduler:
+    """Runs a DependencyGraph's offloaded statements on a process pool.
+
+    The generated program calls `_sched.submit(index, inputs)` at each
+    statement's launch point and `_sched.result(index)` where it stood; an
+    error raised in the worker is re-raised there, after every earlier print.
+    """
+    def __init__(self, graph, pool):
+        self.stmts = {n.index: n.stmt for n in graph.offloaded}
+        self.pool = pool
+        self.futures = {}
+
+    def submit(self, index, inputs):
+        self.futures[index] = self.pool.submit(_run_statement, self.stmts[index], inputs)
+
+    def result(self, index):
+        return self.futures.pop(index).result()
+
+    def cancel(self):
+        """Drop work whose result will never be read (the program failed first)"""
+        for future in self.futures.values():
+            future.cancel()
+        self.futures = {}
+
+
+# --------------------------
+# Reactive Recomputation
+# --------------------------
+
+class ReactiveSession:
+    """Runs successive versions of a program, re-executing only what an edit affects.
+
+    Every top-level statement is compiled on its own, without in-place
+    reuse so no statement overwrites a value another one cached, and
+    stores liveness finds dead are skipped as in a normal run. Its key
+    hashes the generated Python with the keys of the statements that last
+    wrote each name it reads (reads and writes as in DependencyGraph). When
+    the previous run had the same key, the statement is skipped: the names
+    it wrote are restored and the text it printed is replayed. Changing
+    `n = 5000` to `n = 6000` therefore changes the key of that statement
+    and, through their inputs, of the statements transitively downstream
+    of it, while the rest is reused. The cache holds the latest run only.
+    """
+    def __init__(self, opt_level=DEFAULT_OPT_LEVEL):
+        self.opt_level = opt_level
+        self.cache = {}     # key -> (names written -> values, printed text)
+        self.executed = []  # source lines of the statements the last run executed
+        self.reused = []    # source lines of the statements it took from the cache
+
+    def __repr__(self): return f"ReactiveSession({len(self.cache)} cached, last run executed {len(self.executed)})"
+
+    def run(self, src, out=None):
+        """Run `src`; output goes to `out` or is returned as a string"""
+        import hashlib
+        ast = Parser(Lexer(src).tokens()).parse_program()
+        SemanticAnalyzer(ast).check()
+        optimize_ast(ast, self.opt_level)
+        dead = LivenessAnalyzer(ast).analyze().dead_stores
+        stmts = [stmt for stmt in ast.stmts if id(stmt) not in dead]
+        buf = io.StringIO() if out is None else out
+        values = {}    # name -> current value
+        versions = {}  # name -> key of the statement that last wrote it
+        cache = {}
+        self.executed, self.reused = [], []
+        try:
+            for stmt in stmts:
+                reads = set(expr_names(stmt.expr)) if isinstance(stmt, Assign) else stmt_names(stmt)
+                writes = assigned_names([stmt])
+                module = PyCodeGenerator(as_function=False, reuse=False).module(Program([stmt]))
+                inputs = "".join(f"|{name}={versions.get(name, '')}" for name in sorted(reads))
+                key = hashlib.sha256((pyast.dump(module) + inputs).encode()).hexdigest()
+                if key in self.cache:
+                    outputs, printed = self.cache[key]
+                    self.reused.append(stmt.line)
+                else:
+                    namespace = runtime_namespace()
+                    namespace.update((py_name(name), values[name]) for name in reads if name in values)
+                    printed = io.StringIO()
+                    _exec_program(compile(module, "<sequentia>", "exec"), namespace, printed)
+                    printed = printed.getvalue()
+                    # A loop that never ran leaves its names as they were
+                    outputs = {name: namespace[py_name(name)] for name in writes if py_name(name) in namespace}
+                    self.executed.append(stmt.line)
+                cache[key] = (outputs, printed)
+                values.update(outputs)
+                for name in writes:
+                    versions[name] = key
+                buf.write(printed)
+        finally:
+            # After a failure, still keep what the previous run cached
+            self.cache = cache if len(self.executed) + len(self.reused) == len(stmts) else {**self.cache, **cache}
+        return buf.getvalue() if out is None else ""
+
+
+# --------------------------
+# Helper Functions for Output Formatting
+# --------------------------
+
+def format_tokens(tokens):
+    output = ["=" * 70]
+    output.append("LEXER OUTPUT (Tokens)")
+    output.append("=" * 70)
+    for i, (token_type, token_value) in enumerate(tokens):
+        if token_type == "NEWLINE":
+            output.append(f"{i:3d}. {token_type:<15} '\\n'")
+        elif token_type == "EOF":
+            output.append(f"{i:3d}. {token_type:<15} (end of file)")
+        else:
+            output.append(f"{i:3d}. {token_type:<15} '{token_value}'")
+    output.append("")
+    return "\n".join(output)
+
+def format_syntax_tree(ast, indent=0):
+    """Format concrete syntax tree"""
+    lines = []
+    prefix = "│   " * indent
+    last_prefix = "└── "
+    mid_prefix = "├── "
+    
+    if isinstance(ast, Program):
+        lines.append(f"{prefix}Program")
+        for i, stmt in enumerate(ast.stmts):
+            is_last = (i == len(ast.stmts) - 1)
             lines.extend(format_syntax_tree(stmt, indent))
     
     elif isinstance(ast, Assign):
@@ -1282,12 +3126,37 @@ def format_ast(ast, indent=0):
         lines.append(f"{prefix}PatternExpr: {ast.pattern_name}")
         for arg in ast.args:
             lines.extend(format_ast(arg, indent + 1))
+        if ast.modulus is not None:
+            lines.append(f"{prefix}  Reduced mod:")
+            lines.extend(format_ast(ast.modulus, indent + 2))
     elif isinstance(ast, NumberExpr):
         lines.append(f"{prefix}Number: {ast.value}")
+    elif isinstance(ast, ReduceExpr):
+        folded = f" (folded: {ast.value})" if ast.value is not None else ""
+        lines.append(f"{prefix}Reduce: {ast.op}{folded}")
+        lines.extend(format_ast(ast.operand, indent + 1))
+    elif isinstance(ast, ScanExpr):
+        lines.append(f"{prefix}Scan: {ast.op}")
+        lines.extend(format_ast(ast.operand, indent + 1))
+        if ast.width is not None:
+            lines.append(f"{prefix}  Width:")
+            lines.extend(format_ast(ast.width, indent + 2))
+    elif isinstance(ast, SearchExpr):
+        folded = f" (folded: {ast.value})" if ast.value is not None else ""
+        lines.append(f"{prefix}Search: {ast.op}{folded}")
+        lines.append(f"{prefix}  Item:")
+        lines.extend(format_ast(ast.item, indent + 2))
+        lines.append(f"{prefix}  Sequence:")
+        lines.extend(format_ast(ast.operand, indent + 2))
     elif isinstance(ast, IDExpr):
         lines.append(f"{prefix}ID: {ast.name}")
     elif isinstance(ast, ArrayAccessExpr):
-        lines.append(f"{prefix}ArrayAccess: {ast.name}[index]")
+        if ast.filter is not None:
+            lines.append(f"{prefix}ArrayAccess: {ast.name}[mask] (filter: {ast.filter[0]})")
+        elif ast.select:
+            lines.append(f"{prefix}ArrayAccess: {ast.name}[mask]")
+        else:
+            lines.append(f"{prefix}ArrayAccess: {ast.name}[index]")
         lines.extend(format_ast(ast.index_expr, indent + 1))
     elif isinstance(ast, SliceExpr):
         lines.append(f"{prefix}Slice: {ast.name}[{ast.start}:{ast.end}]")
@@ -1298,7 +3167,8 @@ def format_ast(ast, indent=0):
             lines.append(f"{prefix}  End:")
             lines.extend(format_ast(ast.end, indent + 2))
     elif isinstance(ast, BinOp):
-        lines.append(f"{prefix}BinOp: {ast.op}")
+        mask = " (element-wise mask)" if ast.mask else ""
+        lines.append(f"{prefix}BinOp: {ast.op}{mask}")
         lines.append(f"{prefix}  Left:")
         lines.extend(format_ast(ast.left, indent + 2))
         lines.append(f"{prefix}  Right:")
@@ -1354,7 +3224,30 @@ def format_tac(tac_instructions):
     output.append("")
     return "\n".join(output)
 
-def format_optimizations(original_tac, optimized_tac):
+def format_ast_section(ast):
+    output = ["=" * 70]
+    output.append("ABSTRACT SYNTAX TREE (AST)")
+    output.append("=" * 70)
+    output.extend(format_ast(ast))
+    output.append("")
+    return "\n".join(output)
+
+def format_optimized_tac(optimized_tac):
+    output = ["=" * 70]
+    output.append("OPTIMIZED THREE-ADDRESS CODE")
+    output.append("=" * 70)
+    for i, instr in enumerate(optimized_tac):
+        output.append(f"{i:3d}. {str(instr)}")
+    output.append("")
+    return "\n".join(output)
+
+def format_program_output(out):
+    output = ["=" * 70]
+    output.append("PROGRAM OUTPUT")
+    output.append("=" * 70)
+    return "\n".join(output) + "\n" + out
+
+def format_optimizations(original_tac, optimized_tac, optimizer=None):
     output = ["=" * 70]
     output.append("CODE OPTIMIZATION")
     output.append("=" * 70)
@@ -1362,6 +3255,20 @@ def format_optimizations(original_tac, optimized_tac):
     output.append(f"Optimized TAC instructions: {len(optimized_tac)}")
     output.append(f"Reduction: {len(original_tac) - len(optimized_tac)} instructions")
     output.append("")
+    if optimizer is not None and optimizer.pass_stats:
+        rounds = ""
+        if optimizer.rounds:
+            state = "fixed point" if optimizer.converged else "round budget spent"
+            rounds = f", {optimizer.rounds} rounds ({state})"
+        output.append(f"Passes at -O{optimizer.opt_level}{rounds}:")
+        totals = {}
+        for p in optimizer.pass_stats:
+            runs, removed, wall = totals.get(p.name, (0, 0, 0.0))
+            totals[p.name] = (runs + 1, removed + p.before - p.after, wall + p.wall)
+        output.append(f"  {'Pass':<34} {'Runs':>5} {'Removed':>8} {'Wall (ms)':>12}")
+        for name, (runs, removed, wall) in totals.items():
+            output.append(f"  {name:<34} {runs:>5} {removed:>8} {wall * 1000:>12.3f}")
+        output.append("")
     # output.append("Optimizations applied:")
     # output.append("  1. Constant Folding")
     # output.append("  2. Dead Code Elimination")
@@ -1370,46 +3277,898 @@ def format_optimizations(original_tac, optimized_tac):
     return "\n".join(output)
 
 
+# --------------------------
+# Pipeline Profiling
+# --------------------------
+
+class PhaseStats:
+    def __init__(self, name, wall, cpu, peak_bytes=None):
+        self.name = name
+        self.wall = wall              # seconds
+        self.cpu = cpu                # seconds of process CPU time
+        self.peak_bytes = peak_bytes  # tracemalloc peak above phase start, None if not traced
+    def __repr__(self): return f"PhaseStats({self.name}, wall={self.wall:.6f}s, cpu={self.cpu:.6f}s, peak={self.peak_bytes})"
+
+class PassStats:
+    def __init__(self, name, before, after, wall, round=None):
+        self.name = name
+        self.before = before  # instruction count entering the pass
+        self.after = after    # instruction count leaving the pass
+        self.wall = wall
+        self.round = round    # round of its fixed-point group, None if the pass runs once
+    def __repr__(self): return f"PassStats({self.name}, {self.before} -> {self.after})"
+
+class PipelineStats:
+    """Collects per-phase wall/CPU time and memory peaks for one compilation.
+
+    Pass an instance to compile_and_run(src, stats=...) to have it filled in.
+    Memory tracing uses tracemalloc and noticeably slows the traced phases,
+    so it can be switched off with trace_memory=False.
+    """
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.phases = []
+        self.passes = []
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            peak = None
+            if self.trace_memory:
+                peak = max(0, tracemalloc.get_traced_memory()[1] - base)
+                if started_tracing:
+                    tracemalloc.stop()
+            self.phases.append(PhaseStats(name, wall, cpu, peak))
+
+    def get(self, name):
+        for p in self.phases:
+            if p.name == name:
+                return p
+        return None
+
+    @property
+    def total_wall(self):
+        return sum(p.wall for p in self.phases)
+
+    @property
+    def total_cpu(self):
+        return sum(p.cpu for p in self.phases)
+
+    def to_dict(self):
+        return {
+            "phases": [{"name": p.name, "wall": p.wall, "cpu": p.cpu, "peak_bytes": p.peak_bytes}
+                       for p in self.phases],
+            "passes": [{"name": p.name, "before": p.before, "after": p.after, "wall": p.wall,
+                        "round": p.round} for p in self.passes],
+            "total_wall": self.total_wall,
+            "total_cpu": self.total_cpu,
+        }
+
+    def __repr__(self): return f"PipelineStats({len(self.phases)} phases, {self.total_wall:.6f}s)"
+
+def _phase(stats, name):
+    """Time a pipeline phase when profiling, otherwise do nothing"""
+    if stats is None:
+        return contextlib.nullcontext()
+    return stats.phase(name)
+
+def format_profile(stats):
+    output = ["=" * 70]
+    output.append("PIPELINE PROFILE")
+    output.append("=" * 70)
+    output.append(f"{'Phase':<18} {'Wall (ms)':>12} {'CPU (ms)':>12} {'Peak mem (KiB)':>16}")
+    output.append("-" * 70)
+    for p in stats.phases:
+        peak_str = f"{p.peak_bytes / 1024:.1f}" if p.peak_bytes is not None else "-"
+        output.append(f"{p.name:<18} {p.wall * 1000:>12.3f} {p.cpu * 1000:>12.3f} {peak_str:>16}")
+    output.append("-" * 70)
+    output.append(f"{'total':<18} {stats.total_wall * 1000:>12.3f} {stats.total_cpu * 1000:>12.3f}")
+    if stats.passes:
+        output.append("")
+        output.append(f"{'Optimizer pass':<34} {'Before':>8} {'After':>8} {'Wall (ms)':>12}")
+        output.append("-" * 70)
+        for p in stats.passes:
+            name = p.name if p.round is None else f"{p.name} (round {p.round})"
+            output.append(f"{name:<34} {p.before:>8} {p.after:>8} {p.wall * 1000:>12.3f}")
+    output.append("")
+    return "\n".join(output)
+
+
+# --------------------------
+# Statement Profiling
+# --------------------------
+
+class LineStats:
+    def __init__(self, line):
+        self.line = line
+        self.count = 0         # times the statement ran
+        self.total = 0.0       # seconds, including statements nested in it
+        self.self_time = 0.0   # seconds, excluding nested statements
+        self.trips = None      # loop iterations over all runs (for statements only)
+        self.peak_bytes = None  # largest tracemalloc peak above the statement's start
+    def __repr__(self): return f"LineStats(line {self.line}, count={self.count}, total={self.total:.6f}s)"
+
+class StatementProfiler:
+    """Per-statement counts, time and allocation peaks, bound as `_prof`.
+
+    Code generated with profile=True calls enter(line) and exit() around
+    every statement, keeping a stack of the statements running, so time is
+    attributed both to each source line and to each nesting path (for
+    collapsed-stack flamegraphs). Time spent in the hooks themselves is
+    left out of every statement's figures. Like PipelineStats, memory
+    tracing uses tracemalloc, which slows the program; trace_memory=False
+    turns it off.
+    """
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.lines = {}   # line -> LineStats
+        self.stacks = {}  # tuple of lines, outermost first -> self seconds
+        # [line, start, seconds in children with their hooks, hook seconds below it,
+        #  traced bytes at start, peak so far, time enter() was called]
+        self.stack = []
+        self.source = []  # program text, for labels
+
+    @contextlib.contextmanager
+    def tracing(self):
+        """Run a program under this profiler (starts tracemalloc if needed)"""
+        started_tracing = False
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        try:
+            yield self
+        finally:
+            self.stack.clear()
+            if started_tracing:
+                tracemalloc.stop()
+
+    def enter(self, line):
+        called = time.perf_counter()
+        current = 0
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self.stack:
+                # The enclosing statement keeps the peak this one is about to reset
+                parent = self.stack[-1]
+                parent[5] = max(parent[5], peak)
+            tracemalloc.reset_peak()
+        self.stack.append([line, time.perf_counter(), 0.0, 0.0, current, current, called])
+
+    def exit(self):
+        end = time.perf_counter()
+        line, start, children, hooks, base, peak, called = self.stack.pop()
+        total = end - start - hooks
+        self_time = end - start - children
+        stats = self.lines.get(line)
+        if stats is None:
+            stats = self.lines[line] = LineStats(line)
+        stats.count += 1
+        stats.total += total
+        stats.self_time += self_time
+        path = tuple(f[0] for f in self.stack) + (line,)
+        self.stacks[path] = self.stacks.get(path, 0.0) + self_time
+        if self.trace_memory:
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            stats.peak_bytes = max(stats.peak_bytes or 0, peak - base)
+        if self.stack:
+            parent = self.stack[-1]
+            span = time.perf_counter() - called
+            parent[2] += span
+            parent[3] += span - total
+            parent[5] = max(parent[5], peak)
+
+    def loop(self, line, seq):
+        """Count the iterations of the loop on `line`; returns seq"""
+        stats = self.lines.get(line)
+        if stats is None:
+            stats = self.lines[line] = LineStats(line)
+        stats.trips = (stats.trips or 0) + len(seq)
+        return seq
+
+    def label(self, line):
+        if 0 < line <= len(self.source):
+            return f"{line}: {self.source[line - 1].strip()}"
+        return f"line {line}"
+
+    def hotspots(self, key="self_time"):
+        """LineStats sorted by `key` (self_time, total or count), largest first"""
+        return sorted(self.lines.values(), key=lambda s: (-getattr(s, key), s.line))
+
+    def collapsed(self):
+        """Collapsed stacks (`frame;frame;frame microseconds` per line) for flamegraph tools"""
+        out = []
+        for path, seconds in sorted(self.stacks.items()):
+            # ';' separates frames, so it must not appear inside one
+            frames = ";".join(self.label(line).replace(";", ",") for line in path)
+            out.append(f"{frames} {round(seconds * 1e6)}")
+        return "\n".join(out) + "\n" if out else ""
+
+    def to_dict(self):
+        return {"statements": [{"line": s.line, "source": self.label(s.line), "count": s.count,
+                                "total_seconds": s.total, "self_seconds": s.self_time,
+                                "trips": s.trips, "peak_bytes": s.peak_bytes}
+                               for s in self.hotspots()]}
+
+    def __repr__(self): return f"StatementProfiler({len(self.lines)} lines)"
+
+def format_hotspots(profiler, limit=20):
+    output = ["=" * 70]
+    output.append("STATEMENT HOTSPOTS")
+    output.append("=" * 70)
+    output.append(f"{'Line':>5} {'Count':>9} {'Trips':>9} {'Self (ms)':>11} {'Total (ms)':>11} {'Peak (KiB)':>11}")
+    output.append("-" * 70)
+    for s in profiler.hotspots()[:limit]:
+        trips = str(s.trips) if s.trips is not None else "-"
+        peak_str = f"{s.peak_bytes / 1024:.1f}" if s.peak_bytes is not None else "-"
+        output.append(f"{s.line:>5} {s.count:>9} {trips:>9} {s.self_time * 1000:>11.3f} "
+                      f"{s.total * 1000:>11.3f} {peak_str:>11}")
+        output.append(f"      {profiler.label(s.line)}"[:70])
+    output.append("")
+    return "\n".join(output)
+
+
 # --------------------------
 # Compiler Driver
 # --------------------------
 
-def compile_and_run(src):
+def compile_and_run(src, stats=None, budget=None, opt_level=DEFAULT_OPT_LEVEL):
+    """Run the full pipeline; fill in `stats` (a PipelineStats) if given.
+
+    With an ExecutionBudget the program is rejected before execution if its
+    static cost estimate exceeds the budget, and aborted with BudgetExceeded
+    if it overruns while running. `opt_level` selects the optimizations
+    (OPT_PIPELINES).
+    """
     # Lexical Analysis
-    lexer = Lexer(src)
-    tokens = lexer.tokens()
+    with _phase(stats, "lexer"):
+        lexer = Lexer(src)
+        tokens = lexer.tokens()
     
     # Parsing
-    parser = Parser(tokens)
-    ast = parser.parse_program()
+    with _phase(stats, "parser"):
+        parser = Parser(tokens)
+        ast = parser.parse_program()
     
     # Semantic Analysis
-    analyzer = SemanticAnalyzer(ast)
-    analyzer.check()
+    with _phase(stats, "semantic"):
+        analyzer = SemanticAnalyzer(ast)
+        analyzer.check()
+    
+    # Loop unrolling and constant folding on the AST
+    if opt_level >= 2:
+        with _phase(stats, "unroll"):
+            LoopUnroller(ast).run()
     
     # Three-Address Code Generation
-    tac_gen = TACGenerator(ast)
-    original_tac = tac_gen.generate()
+    with _phase(stats, "tac"):
+        tac_gen = TACGenerator(ast)
+        original_tac = tac_gen.generate()
     
     # Code Optimization
-    optimizer = Optimizer(list(original_tac))
-    optimized_tac = optimizer.optimize()
+    with _phase(stats, "optimizer"):
+        optimizer = Optimizer(list(original_tac), opt_level)
+        optimized_tac = optimizer.optimize()
+    if stats is not None:
+        stats.passes.extend(optimizer.pass_stats)
+    # Branches SCCP proved dead are not executed (or priced) either
+    prune_branches(ast, tac_gen.branches, optimizer.branch_outcomes)
     
-    # Final Code Generation
-    py = generate_python(ast)
+    # Admission control
+    if budget is not None:
+        with _phase(stats, "cost"):
+            check_budget(CostEstimator(ast).estimate(), budget)
+
+    # Final Code Generation (Python AST, plus readable source for the caller)
+    with _phase(stats, "codegen"):
+        module = PyCodeGenerator(guard=budget is not None).module(ast)
+        py = python_source(module)
+
+    # Python bytecode compilation, straight from the AST
+    with _phase(stats, "py_compile"):
+        code = compile(module, "<sequentia>", "exec")
 
     # Execute
     buf = io.StringIO()
-    with contextlib.redirect_stdout(buf):
-        exec(py, {})
+    with _phase(stats, "exec"):
+        _exec_program(code, runtime_namespace(), buf, budget)
     
     return tokens, ast, analyzer.sym, original_tac, optimized_tac, py, buf.getvalue()
 
+def _exec_program(code, namespace, out, budget=None):
+    """exec generated code with stdout redirected, metered when budgeted"""
+    if budget is not None:
+        namespace["_budget"] = BudgetMeter(budget)
+    with contextlib.redirect_stdout(out), _time_limit(budget.max_time if budget else None):
+        exec(code, namespace)
+
+def run_source(src, stats=None, out=None, budget=None, workers=None, profiler=None,
+               opt_level=DEFAULT_OPT_LEVEL):
+    """Lean execution path: only the stages needed to run the program.
+
+    Skips TAC generation, optimization and all diagnostic formatting.
+    Program output goes to `out` when given (e.g. sys.stdout, streamed as it
+    is printed); otherwise it is captured and returned as a string.
+    With `workers`, heavy independent statements run concurrently on a pool
+    of that many processes (see DependencyGraph); budgeted runs stay serial.
+    Given a StatementProfiler, the program is compiled with profiling hooks
+    and run serially under it.
+    """
+    with _phase(stats, "lexer"):
+        tokens = Lexer(src).tokens()
+    with _phase(stats, "parser"):
+        ast = Parser(tokens).parse_program()
+    with _phase(stats, "semantic"):
+        SemanticAnalyzer(ast).check()
+    optimize_ast(ast, opt_level, stats)
+    if budget is not None:
+        with _phase(stats, "cost"):
+            check_budget(CostEstimator(ast).estimate(), budget)
+    schedule = None
+    if workers is not None and budget is None and profiler is None:
+        with _phase(stats, "schedule"):
+            schedule = DependencyGraph(ast)
+    with _phase(stats, "codegen"):
+        module = PyCodeGenerator(guard=budget is not None, schedule=schedule,
+                                 profile=profiler is not None).module(ast)
+    with _phase(stats, "py_compile"):
+        code = compile(module, "<sequentia>", "exec")
+
+    buf = io.StringIO() if out is None else out
+    namespace = runtime_namespace()
+    scheduler = None
+    if schedule is not None and schedule.offloaded:
+        scheduler = namespace["_sched"] = StatementScheduler(schedule, statement_pool(workers))
+    profiling = contextlib.nullcontext()
+    if profiler is not None:
+        profiler.source = src.splitlines()
+        namespace["_prof"] = profiler
+        profiling = profiler.tracing()
+    try:
+        with _phase(stats, "exec"), profiling:
+            _exec_program(code, namespace, buf, budget)
+    finally:
+        if scheduler is not None:
+            scheduler.cancel()
+    return buf.getvalue() if out is None else ""
+
+class CompiledProgram:
+    """A program compiled once and run many times with different parameter values.
+
+    `params` names scalars the source reads without assigning them first;
+    they are checked as ints whose values are unknown, so no optimization
+    folds them, and each run binds them afresh. With a budget every run is
+    metered, and admitted only if the cost estimate for its own bindings fits.
+    """
+    def __init__(self, src, params=(), budget=None, filename="<sequentia>", opt_level=DEFAULT_OPT_LEVEL):
+        self.src = src
+        self.params = tuple(params)
+        self.budget = budget
+        self.opt_level = opt_level
+        for name in self.params:
+            if Lexer(name).tokens()[:-1] != [('ID', name)]:
+                raise Exception("Invalid parameter name " + repr(name))
+        if len(set(self.params)) != len(self.params):
+            raise Exception("Duplicate parameter name")
+        start = time.perf_counter()
+        ast = Parser(Lexer(src).tokens()).parse_program()
+        ast.params = list(self.params)
+        SemanticAnalyzer(ast).check()
+        optimize_ast(ast, opt_level)
+        self.ast = ast
+        self.code = compile_python(ast, guard=budget is not None, filename=filename)
+        self.compile_seconds = time.perf_counter() - start
+
+    def __repr__(self): return f"CompiledProgram(params={list(self.params)})"
+
+    def bind(self, bindings):
+        """Validated {param: int} for one run"""
+        return _bind_params(self.params, bindings)
+
+    def run(self, bindings=None, out=None):
+        """Execute with `bindings`; output goes to `out` or is returned as a string"""
+        bindings = self.bind(bindings)
+        if self.budget is not None:
+            check_budget(CostEstimator(self.ast, bindings).estimate(), self.budget)
+        namespace = runtime_namespace()
+        namespace.update((py_name(name), value) for name, value in bindings.items())
+        buf = io.StringIO() if out is None else out
+        _exec_program(self.code, namespace, buf, self.budget)
+        return buf.getvalue() if out is None else ""
+
+    def run_many(self, runs, workers=None):
+        """Run once per bindings dict in `runs`, on a process pool unless workers == 1.
+
+        Each worker compiles the program once. Returns a summary with one
+        record per run, in order, like run_batch.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        runs = list(runs)
+        start = time.perf_counter()
+        if workers == 1 or len(runs) <= 1:
+            results = [_sweep_record(self, bindings) for bindings in runs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_sweep_worker_init,
+                                     initargs=(self.src, self.params, self.budget, self.opt_level)) as pool:
+                results = list(pool.map(run_sweep_bindings, runs))
+        passed = sum(1 for r in results if r["ok"])
+        return {
+            "runs": results,
+            "count": len(results),
+            "passed": passed,
+            "failed": len(results) - passed,
+            "compile_seconds": self.compile_seconds,
+            "wall_seconds": time.perf_counter() - start,
+        }
+
+def _bind_params(params, bindings):
+    bindings = dict(bindings or {})
+    missing = [name for name in params if name not in bindings]
+    if missing:
+        raise Exception("Missing value for parameter(s): " + ", ".join(missing))
+    unknown = [name for name in bindings if name not in params]
+    if unknown:
+        raise Exception("Unknown parameter(s): " + ", ".join(unknown))
+    for name, value in bindings.items():
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise Exception(f"Parameter {name} must be an integer, got {value!r}")
+    return bindings
+
+def compile_program(src, params=(), budget=None, opt_level=DEFAULT_OPT_LEVEL):
+    """Compile `src` once for repeated runs with different `params` values"""
+    return CompiledProgram(src, params, budget, opt_level=opt_level)
+
+DIAGNOSTIC_SECTIONS = ("tokens", "ast", "symbols", "tac", "optimizations", "optimized_tac", "output")
+
+def iter_diagnostics(src, sections=DIAGNOSTIC_SECTIONS, stats=None, budget=None, opt_level=DEFAULT_OPT_LEVEL):
+    """Lazily compile `src`, yielding each requested report section as text.
+
+    A stage only runs once a requested section needs it, so asking for
+    ("tokens",) never parses and leaving out the TAC sections never builds
+    TAC. The program itself is executed only when "output" is requested.
+    """
+    wanted = set(sections)
+    unknown = wanted - set(DIAGNOSTIC_SECTIONS)
+    if unknown:
+        raise Exception("Unknown diagnostic section(s): " + ", ".join(sorted(unknown)))
+    last = max(DIAGNOSTIC_SECTIONS.index(name) for name in wanted) if wanted else -1
+    def needed(name):
+        return DIAGNOSTIC_SECTIONS.index(name) <= last
+
+    with _phase(stats, "lexer"):
+        tokens = Lexer(src).tokens()
+    if "tokens" in wanted:
+        yield format_tokens(tokens) + "\n"
+    if not needed("ast"):
+        return
+
+    with _phase(stats, "parser"):
+        ast = Parser(tokens).parse_program()
+    if "ast" in wanted:
+        yield format_ast_section(ast) + "\n"
+    if not needed("symbols"):
+        return
+
+    with _phase(stats, "semantic"):
+        analyzer = SemanticAnalyzer(ast)
+        analyzer.check()
+    if "symbols" in wanted:
+        yield format_symbol_table(analyzer.sym) + "\n"
+    if opt_level >= 2:
+        with _phase(stats, "unroll"):
+            LoopUnroller(ast).run()
+
+    optimizer = None
+    if wanted & {"tac", "optimizations", "optimized_tac"}:
+        with _phase(stats, "tac"):
+            tac_gen = TACGenerator(ast)
+            original_tac = tac_gen.generate()
+        if "tac" in wanted:
+            yield format_tac(original_tac) + "\n"
+        if wanted & {"optimizations", "optimized_tac"}:
+            with _phase(stats, "optimizer"):
+                optimizer = Optimizer(list(original_tac), opt_level)
+                optimized_tac = optimizer.optimize()
+            if stats is not None:
+                stats.passes.extend(optimizer.pass_stats)
+            if "optimizations" in wanted:
+                yield format_optimizations(original_tac, optimized_tac, optimizer) + "\n"
+            if "optimized_tac" in wanted:
+                yield format_optimized_tac(optimized_tac) + "\n"
+
+    if "output" in wanted:
+        if optimizer is not None:
+            prune_branches(ast, tac_gen.branches, optimizer.branch_outcomes)
+        elif opt_level >= 1:
+            with _phase(stats, "sccp"):
+                fold_branches(ast)
+        if budget is not None:
+            with _phase(stats, "cost"):
+                check_budget(CostEstimator(ast).estimate(), budget)
+        with _phase(stats, "codegen"):
+            module = PyCodeGenerator(guard=budget is not None).module(ast)
+        with _phase(stats, "py_compile"):
+            code = compile(module, "<sequentia>", "exec")
+        buf = io.StringIO()
+        with _phase(stats, "exec"):
+            _exec_program(code, runtime_namespace(), buf, budget)
+        yield format_program_output(buf.getvalue()) + "\n"
+
+# --------------------------
+# Compiled Artifacts
+# --------------------------
+
+# A program compiled once can be saved and loaded elsewhere (another worker,
+# a cache) without recompiling it from source. The binary format is:
+#
+#   magic "SQA" | version | string table | constant pool | sections
+#
+# Every number is an unsigned LEB128 varint; signed ints are zigzag-encoded
+# first. The string table holds each distinct string once (names, TAC ops,
+# operands); the constant pool holds each distinct integer literal. A value
+# is one varint `index << 3 | tag`, plus its items for a tuple, so most TAC
+# operands take a single byte. The sections are the optimized TAC, the
+# symbol table, the parameters, the source, and the generated code object
+# (marshal, tagged with the interpreter's bytecode magic so another Python
+# version recompiles from the source instead).
+#
+# Loading an artifact runs its code object as is, so unlike a .seq program an
+# artifact can execute arbitrary Python bytecode: only load artifacts from a
+# trusted source. Truncated or corrupt data is rejected with an error rather
+# than partly decoded.
+
+ARTIFACT_MAGIC = b"SQA"
+ARTIFACT_VERSION = 1
+
+_NONE, _STR, _NUMSTR, _INT, _SEQ, _TRUE, _FALSE = range(7)
+
+def _write_varint(out, n):
+    while n > 0x7f:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+def _artifact_error(detail):
+    return Exception(f"Not a Sequentia artifact ({detail})")
+
+def _read_varint(data, pos):
+    n = shift = 0
+    while True:
+        if pos >= len(data):
+            raise _artifact_error("truncated data")
+        b = data[pos]
+        pos += 1
+        n |= (b & 0x7f) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+def _zigzag(n):
+    return n << 1 if n >= 0 else ((-n) << 1) - 1
+
+def _unzigzag(n):
+    return n >> 1 if not n & 1 else -((n + 1) >> 1)
+
+class _ArtifactWriter:
+    def __init__(self):
+        self.body = bytearray()
+        self.strings = {}
+        self.constants = {}
+
+    def intern(self, table, key):
+        index = table.get(key)
+        if index is None:
+            index = table[key] = len(table)
+        return index
+
+    def value(self, v):
+        out = self.body
+        if v is None:
+            out.append(_NONE)
+        elif v is True or v is False:
+            out.append(_TRUE if v else _FALSE)
+        elif isinstance(v, int):
+            _write_varint(out, self.intern(self.constants, v) << 3 | _INT)
+        elif isinstance(v, str):
+            # TAC literals are strings; canonical ones share the constant pool
+            n = tac_constant(v)
+            if isinstance(n, int) and not isinstance(n, bool) and str(n) == v:
+                _write_varint(out, self.intern(self.constants, n) << 3 | _NUMSTR)
+            else:
+                _write_varint(out, self.intern(self.strings, v) << 3 | _STR)
+        elif isinstance(v, (tuple, list)):
+            _write_varint(out, len(v) << 3 | _SEQ)
+            for item in v:
+                self.value(item)
+        else:
+            raise Exception(f"Cannot serialize {type(v).__name__} in an artifact")
+
+    def blob(self, data):
+        _write_varint(self.body, len(data))
+        self.body += data
+
+    def finish(self):
+        out = bytearray(ARTIFACT_MAGIC)
+        _write_varint(out, ARTIFACT_VERSION)
+        _write_varint(out, len(self.strings))
+        for text in self.strings:
+            encoded = text.encode("utf-8")
+            _write_varint(out, len(encoded))
+            out += encoded
+        _write_varint(out, len(self.constants))
+        for n in self.constants:
+            _write_varint(out, _zigzag(n))
+        return bytes(out + self.body)
+
+class _ArtifactReader:
+    def __init__(self, data):
+        data = memoryview(data)
+        if bytes(data[:len(ARTIFACT_MAGIC)]) != ARTIFACT_MAGIC:
+            raise _artifact_error("bad magic")
+        version, pos = _read_varint(data, len(ARTIFACT_MAGIC))
+        if version != ARTIFACT_VERSION:
+            raise Exception(f"Unsupported artifact version {version} (expected {ARTIFACT_VERSION})")
+        count, pos = _read_varint(data, pos)
+        self.strings = []
+        for _ in range(count):
+            size, pos = _read_varint(data, pos)
+            if pos + size > len(data):
+                raise _artifact_error("truncated data")
+            self.strings.append(str(data[pos:pos + size], "utf-8"))
+            pos += size
+        count, pos = _read_varint(data, pos)
+        self.constants = []
+        for _ in range(count):
+            n, pos = _read_varint(data, pos)
+            self.constants.append(_unzigzag(n))
+        self.numstrs = [str(n) for n in self.constants]
+        self.data = data
+        self.pos = pos
+
+    def value(self):
+        pos = self.pos
+        if pos < len(self.data) and self.data[pos] < 0x80:
+            n = self.data[pos]
+            self.pos = pos + 1  # most values fit in one byte
+        else:
+            n, self.pos = _read_varint(self.data, pos)
+        tag, index = n & 7, n >> 3
+        if tag == _STR:
+            return self.strings[index]
+        if tag == _NUMSTR:
+            return self.numstrs[index]
+        if tag == _NONE:
+            return None
+        if tag == _INT:
+            return self.constants[index]
+        if tag == _SEQ:
+            return tuple(self.value() for _ in range(index))
+        if tag > _FALSE:
+            raise _artifact_error(f"unknown value tag {tag}")
+        return tag == _TRUE
+
+    def blob(self):
+        size, pos = _read_varint(self.data, self.pos)
+        if pos + size > len(self.data):
+            raise _artifact_error("truncated data")
+        self.pos = pos + size
+        return bytes(self.data[pos:pos + size])
+
+class ProgramArtifact:
+    """A compiled program as saved by dumps_artifact: optimized TAC, symbol
+    table, parameters, source and the generated code object.
+
+    Symbols keep everything but their AST `args`. `code` is None when the
+    artifact came from another Python version; run() then recompiles the
+    source once.
+    """
+    def __init__(self, tac, symbols, code, src, params=(), opt_level=DEFAULT_OPT_LEVEL):
+        self.tac = tac
+        self.symbols = symbols
+        self.code = code
+        self.src = src
+        self.params = tuple(params)
+        self.opt_level = opt_level
+    def __repr__(self): return f"ProgramArtifact({len(self.tac)} TAC instructions, params={list(self.params)})"
+
+    def run(self, bindings=None, out=None):
+        """Execute with `bindings`; output goes to `out` or is returned as a string"""
+        bindings = _bind_params(self.params, bindings)
+        if self.code is None:
+            self.code = CompiledProgram(self.src, self.params, opt_level=self.opt_level).code
+        namespace = runtime_namespace()
+        namespace.update((py_name(name), value) for name, value in bindings.items())
+        buf = io.StringIO() if out is None else out
+        _exec_program(self.code, namespace, buf)
+        return buf.getvalue() if out is None else ""
+
+def build_artifact(src, params=(), opt_level=DEFAULT_OPT_LEVEL):
+    """Compile `src` into a ProgramArtifact (the compile_and_run pipeline, without running it)"""
+    ast = Parser(Lexer(src).tokens()).parse_program()
+    ast.params = list(params)
+    analyzer = SemanticAnalyzer(ast)
+    analyzer.check()
+    if opt_level >= 2:
+        LoopUnroller(ast).run()
+    tac_gen = TACGenerator(ast)
+    optimizer = Optimizer(tac_gen.generate(), opt_level)
+    tac = optimizer.optimize()
+    prune_branches(ast, tac_gen.branches, optimizer.branch_outcomes)
+    return ProgramArtifact(tac, analyzer.sym, compile_python(ast), src, params, opt_level)
+
+def dumps_artifact(artifact):
+    """The binary form of a ProgramArtifact"""
+    import marshal, importlib.util
+    w = _ArtifactWriter()
+    w.value(len(artifact.tac))
+    for ins in artifact.tac:
+        w.value(ins.op)
+        w.value(ins.arg1)
+        w.value(ins.arg2)
+        w.value(ins.result)
+    w.value(len(artifact.symbols))
+    for sym in artifact.symbols.values():
+        for v in (sym.name, sym.type, sym.length, sym.pattern, sym.value, sym.const_args, sym.window):
+            w.value(v)
+    w.value(artifact.params)
+    w.value(artifact.opt_level)
+    w.value(artifact.src)
+    w.blob(importlib.util.MAGIC_NUMBER)
+    w.blob(marshal.dumps(artifact.code) if artifact.code is not None else b"")
+    return w.finish()
+
+def loads_artifact(data):
+    """ProgramArtifact from dumps_artifact output.
+
+    The artifact's code object is run as is, so `data` must come from a
+    trusted source: an artifact can execute arbitrary Python bytecode.
+    """
+    import marshal, importlib.util
+    try:
+        r = _ArtifactReader(data)
+        value = r.value
+        tac = [TACInstruction(value(), value(), value(), value()) for _ in range(value())]
+        symbols = {}
+        for _ in range(value()):
+            name, sym_type, length, pattern, v, const_args, window = (value() for _ in range(7))
+            if window is not None:
+                window = (window[0], list(window[1]), window[2], window[3])
+            symbols[name] = Symbol(name, sym_type, length, pattern, value=v, window=window,
+                                   const_args=list(const_args) if const_args is not None else None)
+        params, opt_level, src = value(), value(), value()
+        magic, code = r.blob(), r.blob()
+        code = marshal.loads(code) if code and magic == importlib.util.MAGIC_NUMBER else None
+    except (IndexError, TypeError, ValueError, EOFError, SystemError) as e:
+        # An index past a table, a malformed section or undecodable code
+        raise _artifact_error(f"corrupt data: {type(e).__name__}: {e}") from None
+    if r.pos != len(r.data):
+        raise _artifact_error("trailing data")
+    if not isinstance(src, str) or not isinstance(opt_level, int) or not isinstance(params, tuple):
+        raise _artifact_error("corrupt data")
+    return ProgramArtifact(tac, symbols, code, src, params, opt_level)
+
+def save_artifact(artifact, path):
+    with open(path, "wb") as f:
+        f.write(dumps_artifact(artifact))
+
+def load_artifact(path):
+    with open(path, "rb") as f:
+        return loads_artifact(f.read())
+
+
+# --------------------------
+# Batch Runner
+# --------------------------
+
+def expand_programs(patterns):
+    """Expand file names and glob patterns into a sorted, de-duplicated list"""
+    import glob
+    paths = []
+    seen = set()
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            if path not in seen:
+                seen.add(path)
+                paths.append(path)
+    return paths
+
+def _batch_worker_init():
+    # Warm the worker: the first compile pulls in and caches everything it needs
+    compile_python(Program([]))
+
+def run_batch_program(path, opt_level=DEFAULT_OPT_LEVEL, budget=None):
+    """Compile and run one program in isolation, returning a JSON-ready record.
+
+    With an ExecutionBudget the program is admitted on its static cost
+    estimate and metered while it runs; a rejection or overrun is recorded
+    as that program's error.
+    """
+    record = {"path": path, "ok": False, "output": "", "error": None,
+              "compile_seconds": None, "exec_seconds": None}
+    start = time.perf_counter()
+    buf = io.StringIO()
+    try:
+        with open(path, 'r') as f:
+            src = f.read()
+        ast = Parser(Lexer(src).tokens()).parse_program()
+        SemanticAnalyzer(ast).check()
+        optimize_ast(ast, opt_level)
+        if budget is not None:
+            check_budget(CostEstimator(ast).estimate(), budget)
+        code = compile_python(ast, guard=budget is not None, filename=path)
+        compiled = time.perf_counter()
+        record["compile_seconds"] = compiled - start
+        _exec_program(code, runtime_namespace(), buf, budget)
+        record["exec_seconds"] = time.perf_counter() - compiled
+        record["ok"] = True
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["output"] = buf.getvalue()
+    record["total_seconds"] = time.perf_counter() - start
+    return record
+
+def run_batch(patterns, workers=None, opt_level=DEFAULT_OPT_LEVEL, budget=None):
+    """Run many programs across a warm process pool and summarise the results"""
+    from concurrent.futures import ProcessPoolExecutor
+    paths = expand_programs(patterns)
+    start = time.perf_counter()
+    if workers == 1 or len(paths) <= 1:
+        _batch_worker_init()
+        results = [run_batch_program(path, opt_level, budget) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_batch_worker_init) as pool:
+            results = list(pool.map(run_batch_program, paths, [opt_level] * len(paths), [budget] * len(paths)))
+    passed = sum(1 for r in results if r["ok"])
+    return {
+        "programs": results,
+        "count": len(results),
+        "passed": passed,
+        "failed": len(results) - passed,
+        "wall_seconds": time.perf_counter() - start,
+    }
+
+_sweep_program = None  # the CompiledProgram of a run_many worker
+
+def _sweep_worker_init(src, params, budget, opt_level=DEFAULT_OPT_LEVEL):
+    global _sweep_program
+    _sweep_program = CompiledProgram(src, params, budget, opt_level=opt_level)
+
+def _sweep_record(program, bindings):
+    record = {"bindings": bindings, "ok": False, "output": "", "error": None, "exec_seconds": None}
+    start = time.perf_counter()
+    buf = io.StringIO()
+    try:
+        program.run(bindings, out=buf)
+        record["ok"] = True
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["exec_seconds"] = time.perf_counter() - start
+    record["output"] = buf.getvalue()
+    return record
+
+def run_sweep_bindings(bindings):
+    """Worker side of CompiledProgram.run_many: one run of the compiled program"""
+    return _sweep_record(_sweep_program, bindings)
+
 # --------------------------
 # CLI / REPL
 # --------------------------
 
-def repl():
+def repl(opt_level=DEFAULT_OPT_LEVEL):
+    empty_output = format_program_output("") + "\n"
     print("=" * 70)
     print("SEQUENTIA COMPILER - REPL Mode")
     print("=" * 70)
@@ -1430,45 +4189,12 @@ def repl():
                     continue
                 source = '\n'.join(lines) + '\n'
                 try:
-                    tokens, ast, sym_table, original_tac, optimized_tac, py, out = compile_and_run(source)
-                    
-                    # Print Lexer Output
-                    print(format_tokens(tokens))
-                    
-                    # Print AST
-                    print("=" * 70)
-                    print("ABSTRACT SYNTAX TREE (AST)")
-                    print("=" * 70)
-                    print("\n".join(format_ast(ast)))
-                    print()
-                    
-                    # Print Symbol Table
-                    print(format_symbol_table(sym_table))
-                    
-                    # Print TAC
-                    print(format_tac(original_tac))
-                    
-                    # Print Optimizations
-                    print(format_optimizations(original_tac, optimized_tac))
-                    
-                    # Print Optimized TAC
-                    print("=" * 70)
-                    print("OPTIMIZED THREE-ADDRESS CODE")
-                    print("=" * 70)
-                    for i, instr in enumerate(optimized_tac):
-                        print(f"{i:3d}. {str(instr)}")
-                    print()
-                    
-                    # Print Program Output
-                    print("=" * 70)
-                    print("PROGRAM OUTPUT")
-                    print("=" * 70)
-                    if out:
-                        print(out, end='')
-                    else:
-                        print("(no output - use 'print' statement to display values)")
-                    print()
-                    
+                    # The same sections as a file run, with the optimizer's per-pass table
+                    for section in iter_diagnostics(source, opt_level=opt_level):
+                        if section == empty_output:
+                            section = format_program_output(
+                                "(no output - use 'print' statement to display values)\n") + "\n"
+                        sys.stdout.write(section)
                 except Exception as e:
                     print('Error:', e)
                     import traceback
@@ -1479,54 +4205,191 @@ def repl():
     except KeyboardInterrupt:
         print('\nExiting REPL.')
 
-def run_file(path: str):
+def run_file(path: str, profile: bool = False, lean: bool = False, sections=DIAGNOSTIC_SECTIONS,
+             budget=None, cost: bool = False, workers=None, hotspots: bool = False, collapsed=None,
+             opt_level: int = DEFAULT_OPT_LEVEL):
     with open(path, 'r') as f:
         src = f.read()
+    stats = PipelineStats() if profile else None
+    profiler = StatementProfiler() if hotspots or collapsed else None
     try:
-        tokens, ast, sym_table, original_tac, optimized_tac, py, out = compile_and_run(src)
+        if cost:
+            print(format_cost(estimate_cost(src)))
+        if profiler is not None:
+            # Statement profiling instruments the lean path's generated code
+            run_source(src, stats, out=sys.stdout, budget=budget, profiler=profiler, opt_level=opt_level)
+        elif lean:
+            # Production mode: stream program output only
+            run_source(src, stats, out=sys.stdout, budget=budget, workers=workers, opt_level=opt_level)
+        else:
+            # Each section is printed as soon as its stage has run
+            for section in iter_diagnostics(src, sections, stats, budget, opt_level):
+                sys.stdout.write(section)
+                sys.stdout.flush()
     except Exception as e:
         print('Compilation / execution error:')
         print(str(e))
         import traceback
         traceback.print_exc()
         return
-    
-    # Print Lexer Output
-    print(format_tokens(tokens))
-    
-    # Print AST
-    print("=" * 70)
-    print("ABSTRACT SYNTAX TREE (AST)")
-    print("=" * 70)
-    print("\n".join(format_ast(ast)))
-    print()
-    
-    # Print Symbol Table
-    print(format_symbol_table(sym_table))
-    
-    # Print TAC
-    print(format_tac(original_tac))
-    
-    # Print Optimizations
-    print(format_optimizations(original_tac, optimized_tac))
-    
-    # Print Optimized TAC
-    print("=" * 70)
-    print("OPTIMIZED THREE-ADDRESS CODE")
-    print("=" * 70)
-    for i, instr in enumerate(optimized_tac):
-        print(f"{i:3d}. {str(instr)}")
-    print()
-    
-    # Print Program Output
-    print("=" * 70)
-    print("PROGRAM OUTPUT")
-    print("=" * 70)
-    print(out, end='')
-    print()
 
-if __name__ == '__main__':
-    if len(sys.argv) == 1:
-        repl()
+    if stats is not None:
+        print(format_profile(stats))
+    if hotspots:
+        print(format_hotspots(profiler))
+    if collapsed:
+        with open(collapsed, 'w') as f:
+            f.write(profiler.collapsed())
+
+def parse_binding(text):
+    """NAME=VALUE from the command line"""
+    name, sep, value = text.partition("=")
+    try:
+        return name.strip(), int(value)
+    except ValueError:
+        raise Exception(f"Expected NAME=INTEGER, got {text!r}")
+
+def run_parameterized(path, bindings, sweep=None, budget=None, workers=None, opt_level=DEFAULT_OPT_LEVEL):
+    """--param / --sweep: compile once, then run with the given bindings"""
+    import json
+    with open(path, 'r') as f:
+        src = f.read()
+    if sweep is None:
+        compile_program(src, list(bindings), budget, opt_level).run(bindings, out=sys.stdout)
+        return True
+    with open(sweep, 'r') as f:
+        entries = json.load(f)
+    if not isinstance(entries, list) or not all(isinstance(r, dict) for r in entries):
+        raise Exception("A sweep file must hold a JSON list of objects")
+    for i, r in enumerate(entries):
+        if set(r) != set(entries[0]):
+            raise Exception(f"Sweep entry {i} binds {sorted(r)} but entry 0 binds {sorted(entries[0])}; "
+                            "every entry must bind the same parameters")
+    runs = [dict(bindings, **r) for r in entries]
+    params = list(dict.fromkeys(name for r in runs for name in r))
+    summary = compile_program(src, params, budget, opt_level).run_many(runs, workers)
+    print(json.dumps(summary, indent=2))
+    return not summary["failed"]
+
+def watch_file(path, interval=0.5, opt_level=DEFAULT_OPT_LEVEL):
+    """--watch: run the program, then rerun what each saved edit affects (ReactiveSession)"""
+    import os
+    session = ReactiveSession(opt_level)
+    seen = None
+    try:
+        while True:
+            stamp = os.stat(path).st_mtime_ns
+            if stamp != seen:
+                seen = stamp
+                with open(path, 'r') as f:
+                    src = f.read()
+                print("=" * 70)
+                try:
+                    session.run(src, out=sys.stdout)
+                    print(f"[executed {len(session.executed)}, reused {len(session.reused)} statements]",
+                          file=sys.stderr)
+                except Exception as e:
+                    print('Compilation / execution error:')
+                    print(str(e))
+                sys.stdout.flush()
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print('\nStopped watching.')
+
+def is_artifact_file(path):
+    with open(path, 'rb') as f:
+        return f.read(len(ARTIFACT_MAGIC)) == ARTIFACT_MAGIC
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description="Sequentia compiler")
+    ap.add_argument("files", nargs="*", metavar="file",
+                    help="Sequentia program to compile and run (REPL if omitted); several files or globs with --batch")
+    ap.add_argument("--profile", action="store_true",
+                    help="report per-phase time, CPU and memory plus optimizer pass statistics")
+    ap.add_argument("-O", dest="opt_level", type=int, choices=sorted(OPT_PIPELINES), default=DEFAULT_OPT_LEVEL,
+                    help="optimization level: -O0 none, -O1 one pass pipeline plus branch pruning, "
+                         f"-O2 passes to a fixed point plus loop unrolling (default -O{DEFAULT_OPT_LEVEL})")
+    ap.add_argument("--save-artifact", default=None, metavar="FILE",
+                    help="compile the program (with --param names as parameters) and save it as a binary artifact "
+                         "instead of running it; an artifact file given as the program is loaded and run")
+    ap.add_argument("--watch", action="store_true",
+                    help="run the program, then on every save rerun only the statements the edit affects")
+    ap.add_argument("--hotspots", action="store_true",
+                    help="run with per-statement profiling hooks and print the slowest source lines")
+    ap.add_argument("--collapsed", default=None, metavar="FILE",
+                    help="run with per-statement profiling hooks and write collapsed stacks for flamegraph tools")
+    ap.add_argument("--run", action="store_true",
+                    help="production mode: execute and print program output only, no diagnostic dumps")
+    ap.add_argument("--dump", default=None, metavar="SECTIONS",
+                    help="comma-separated diagnostics to print (" + ",".join(DIAGNOSTIC_SECTIONS) + "); default all")
+    ap.add_argument("--cost", action="store_true", help="print the static cost estimate before running")
+    ap.add_argument("--max-elements", type=int, default=None, help="reject/abort programs creating more sequence elements")
+    ap.add_argument("--max-bytes", type=int, default=None, help="reject/abort programs allocating more bytes")
+    ap.add_argument("--max-time", type=float, default=None, help="abort programs running longer (seconds)")
+    ap.add_argument("--batch", action="store_true",
+                    help="run every given program (globs allowed) on a process pool and print a JSON summary")
+    ap.add_argument("--param", action="append", default=[], metavar="NAME=VALUE",
+                    help="bind a program parameter (repeatable); compiles once and runs with the bindings")
+    ap.add_argument("--sweep", default=None, metavar="RUNS.json",
+                    help="run the program once per object in a JSON list of bindings, on a process pool")
+    ap.add_argument("--parallel", action="store_true",
+                    help="with --run: execute heavy independent statements concurrently on worker processes")
+    ap.add_argument("--workers", type=int, default=None,
+                    help="worker processes for --batch, --sweep and --parallel (default: CPU count)")
+    args = ap.parse_args(argv)
+    budget = None
+    if args.max_elements is not None or args.max_bytes is not None or args.max_time is not None:
+        budget = ExecutionBudget(args.max_elements, args.max_bytes, args.max_time)
+    if args.batch:
+        import json
+        summary = run_batch(args.files, workers=args.workers, opt_level=args.opt_level, budget=budget)
+        print(json.dumps(summary, indent=2))
+        if summary["failed"]:
+            sys.exit(1)
+    elif not args.files:
+        repl(args.opt_level)
+    elif len(args.files) > 1:
+        ap.error("multiple programs require --batch")
     else:
-        run_file(sys.argv[1])
\ No newline at end of file
+        sections = DIAGNOSTIC_SECTIONS
+        if args.dump is not None:
+            sections = tuple(name.strip() for name in args.dump.split(",") if name.strip())
+        if args.watch:
+            watch_file(args.files[0], opt_level=args.opt_level)
+            return
+        if args.save_artifact or is_artifact_file(args.files[0]):
+            try:
+                bindings = dict(parse_binding(b) for b in args.param)
+                if args.save_artifact:
+                    with open(args.files[0], 'r') as f:
+                        src = f.read()
+                    save_artifact(build_artifact(src, list(bindings), args.opt_level), args.save_artifact)
+                else:
+                    load_artifact(args.files[0]).run(bindings, out=sys.stdout)
+            except Exception as e:
+                print('Compilation / execution error:')
+                print(str(e))
+                sys.exit(1)
+            return
+        if args.param or args.sweep:
+            try:
+                ok = run_parameterized(args.files[0], dict(parse_binding(b) for b in args.param),
+                                       args.sweep, budget, args.workers, args.opt_level)
+            except Exception as e:
+                print('Compilation / execution error:')
+                print(str(e))
+                sys.exit(1)
+            if not ok:
+                sys.exit(1)
+            return
+        workers = None
+        if args.parallel:
+            import os
+            workers = args.workers or os.cpu_count() or 1
+        run_file(args.files[0], profile=args.profile, lean=args.run, sections=sections,
+                 budget=budget, cost=args.cost, workers=workers,
+                 hotspots=args.hotspots, collapsed=args.collapsed, opt_level=args.opt_level)
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
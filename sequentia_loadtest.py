@@ -0,0 +1,140 @@
+"""Load test for a local Sequentia server.
+
+Usage:
+    python sequentia_loadtest.py [--spawn] [--host H] [--port P | --unix PATH]
+                                 [--requests N] [--concurrency C] [--program FILE]
+
+Opens C connections, each sending requests back to back until N requests
+have completed, and prints a JSON report with p50/p90/p99 latency and
+throughput. With --spawn a server is started on the given address first
+and shut down afterwards.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import sequentia_server
+
+
+DEFAULT_PROGRAM = """fib = pattern fibonacci 30
+sq = pattern square 30
+mix = fib + sq * 2
+for v in mix[0:10] {
+    if v > 20 {
+        print v
+    }
+}
+print mix
+"""
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+async def connect(args):
+    limit = 1 << 24
+    if args.unix:
+        return await asyncio.open_unix_connection(args.unix, limit=limit)
+    return await asyncio.open_connection(args.host, args.port, limit=limit)
+
+async def wait_for_server(args, deadline=10.0):
+    start = time.perf_counter()
+    while True:
+        try:
+            reader, writer = await connect(args)
+            writer.close()
+            return
+        except OSError:
+            if time.perf_counter() - start > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+async def run_load(args, source):
+    latencies = []
+    errors = []
+    remaining = [args.requests]
+
+    async def client(slot):
+        reader, writer = await connect(args)
+        try:
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                start = time.perf_counter()
+                reply = await sequentia_server.request(reader, writer, source, req_id=slot, timeout=args.timeout)
+                latencies.append(time.perf_counter() - start)
+                if not reply["ok"]:
+                    errors.append(reply.get("error"))
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(args.concurrency)))
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    ms = lambda v: None if v is None else v * 1000
+    return {
+        "requests": len(latencies),
+        "concurrency": args.concurrency,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "wall_seconds": wall,
+        "throughput_rps": len(latencies) / wall if wall else None,
+        "latency_ms": {
+            "p50": ms(percentile(latencies, 50)),
+            "p90": ms(percentile(latencies, 90)),
+            "p99": ms(percentile(latencies, 99)),
+            "mean": ms(sum(latencies) / len(latencies)) if latencies else None,
+            "max": ms(latencies[-1]) if latencies else None,
+        },
+    }
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Sequentia server load test")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--unix", default=None, metavar="PATH")
+    ap.add_argument("--requests", type=int, default=1000)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--timeout", type=float, default=10.0, help="per-request timeout sent to the server")
+    ap.add_argument("--program", default=None, help="Sequentia file to send (default: a small built-in program)")
+    ap.add_argument("--spawn", action="store_true", help="start a server on the given address for the test")
+    ap.add_argument("--workers", type=int, default=None, help="worker processes for --spawn")
+    args = ap.parse_args(argv)
+
+    source = DEFAULT_PROGRAM
+    if args.program:
+        with open(args.program) as f:
+            source = f.read()
+
+    server = None
+    if args.spawn:
+        here = os.path.dirname(os.path.abspath(__file__))
+        cmd = [sys.executable, os.path.join(here, "sequentia_server.py"),
+               "--max-pending", str(max(64, args.concurrency * 2))]
+        cmd += ["--unix", args.unix] if args.unix else ["--host", args.host, "--port", str(args.port)]
+        if args.workers:
+            cmd += ["--workers", str(args.workers)]
+        server = subprocess.Popen(cmd)
+    try:
+        if server is not None:
+            asyncio.run(wait_for_server(args))
+        report = asyncio.run(run_load(args, source))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,626 @@
+"""Runtime support library for generated Sequentia programs.
+
+The compiler imports this module once per process and binds its helpers
+into the globals of every program it runs (sequentia_compiler.runtime_namespace),
+so the helpers are never re-parsed or re-compiled per program.
+"""
+import math
+import operator
+from array import array
+from itertools import accumulate, compress, islice, repeat
+
+__all__ = [
+    "_pat_add", "_pat_sub", "_pat_mul", "_pat_div", "_pat_mod",
+    "_pat_add_into", "_pat_sub_into", "_pat_mul_into", "_pat_div_into", "_pat_mod_into",
+    "_seq_view",
+    "_fib_inline", "_fact_inline",
+    "_pat_square", "_pat_cube", "_pat_triangular", "_pat_arithmetic", "_pat_geometric", "_pattern_mod",
+    "_seq_compare", "_seq_select", "_seq_filter",
+    "_seq_cumsum", "_seq_diff", "_seq_window_sum",
+    "_seq_sum", "_seq_max", "_seq_min", "_seq_len", "_pattern_reduce",
+    "_seq_contains", "_seq_indexof", "_pattern_index", "_pattern_contains",
+    "_print",
+]
+
+
+# --------------------------
+# Compact Storage
+# --------------------------
+
+# Sequences whose values provably fit in int64 are stored as array('q'),
+# 8 bytes per element instead of a list of int objects (~36 bytes). Pattern
+# generators decide from their formula and length; arithmetic keeps a
+# compact operand's result compact unless some element overflows, in which
+# case the result stays a list of Python ints. Short sequences stay lists.
+
+INT64_MIN = -2**63
+INT64_MAX = 2**63 - 1
+COMPACT_MIN_LENGTH = 1024
+
+def _fits_int64(lo, hi):
+    return INT64_MIN <= lo and hi <= INT64_MAX
+
+def _is_compact(value):
+    return isinstance(value, array) or (isinstance(value, SeqView) and isinstance(value.base, array))
+
+def _compact(values):
+    """array('q') of `values`, or the list itself if it is short or overflows int64"""
+    if len(values) < COMPACT_MIN_LENGTH:
+        return values
+    try:
+        return array('q', values)
+    except OverflowError:
+        return values
+
+
+# --------------------------
+# Vector/Scalar Operations
+# --------------------------
+
+# Scalars are ints; anything else (list, array, SeqView) is a sequence.
+# The kernels return plain lists; _pat_* re-packs them when an operand was
+# compact, and _pat_*_into writes them over the left operand's buffer.
+
+def _add(a, b):
+    if isinstance(a, int):
+        if isinstance(b, int):
+            return a + b
+        return [a + x for x in b]
+    elif isinstance(b, int):
+        return [x + b for x in a]
+    else:
+        return [x + y for x, y in zip(a, b)]
+
+def _sub(a, b):
+    if isinstance(a, int):
+        if isinstance(b, int):
+            return a - b
+        return [a - x for x in b]
+    elif isinstance(b, int):
+        return [x - b for x in a]
+    else:
+        return [x - y for x, y in zip(a, b)]
+
+def _mul(a, b):
+    if isinstance(a, int):
+        if isinstance(b, int):
+            return a * b
+        return [a * x for x in b]
+    elif isinstance(b, int):
+        return [x * b for x in a]
+    else:
+        return [x * y for x, y in zip(a, b)]
+
+def _div(a, b):
+    if isinstance(a, int):
+        if isinstance(b, int):
+            return a // b
+        return [a // x for x in b]
+    elif isinstance(b, int):
+        return [x // b for x in a]
+    else:
+        return [x // y for x, y in zip(a, b)]
+
+def _mod(a, b):
+    if isinstance(a, int):
+        if isinstance(b, int):
+            return a % b
+        return [a % x for x in b]
+    elif isinstance(b, int):
+        return [x % b for x in a]
+    else:
+        return [x % y for x, y in zip(a, b)]
+
+def _result(out, a, b):
+    if isinstance(out, list) and (_is_compact(a) or _is_compact(b)):
+        return _compact(out)
+    return out
+
+def _pat_add(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        return a + b
+    return _result(_add(a, b), a, b)
+
+def _pat_sub(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        return a - b
+    return _result(_sub(a, b), a, b)
+
+def _pat_mul(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        return a * b
+    return _result(_mul(a, b), a, b)
+
+def _pat_div(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        return a // b
+    return _result(_div(a, b), a, b)
+
+def _pat_mod(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        return a % b
+    if isinstance(b, int):
+        _check_modulus(b)
+        # Residues of an int64-sized modulus always fit: store them compact
+        return _compact(_mod(a, b))
+    return _result(_mod(a, b), a, b)
+
+def _check_modulus(m):
+    # A zero modulus fails even on an empty sequence, as it does on a scalar,
+    # so reducing early (see SemanticAnalyzer.check_modulo) fails the same way
+    if m == 0:
+        raise ZeroDivisionError("integer modulo by zero")
+
+
+# --------------------------
+# In-place Operations
+# --------------------------
+
+# The code generator calls these when the left operand is a sequence nothing
+# else will read (a dead variable or a fresh temporary). The result is
+# written over it a chunk at a time, so a second full-size sequence never
+# exists; scalars and views fall back to the copying helpers.
+
+CHUNK = 4096
+
+def _into(kernel, a, b):
+    scalar = isinstance(b, int)
+    if isinstance(a, list):
+        if not scalar:
+            del a[len(b):]
+        for i in range(0, len(a), CHUNK):
+            a[i:i + CHUNK] = kernel(a[i:i + CHUNK], b if scalar else b[i:i + CHUNK])
+        return a
+    if isinstance(a, array):
+        if not scalar:
+            del a[len(b):]
+        for i in range(0, len(a), CHUNK):
+            out = kernel(a[i:i + CHUNK], b if scalar else b[i:i + CHUNK])
+            try:
+                a[i:i + CHUNK] = array('q', out)
+            except OverflowError:
+                # Promote to Python ints: results so far, this chunk, then the rest
+                rest = kernel(a[i + CHUNK:].tolist(), b if scalar else b[i + CHUNK:])
+                return a[:i].tolist() + out + rest
+        return a
+    return _result(kernel(a, b), a, b)
+
+def _pat_add_into(a, b):
+    return _into(_add, a, b)
+
+def _pat_sub_into(a, b):
+    return _into(_sub, a, b)
+
+def _pat_mul_into(a, b):
+    return _into(_mul, a, b)
+
+def _pat_div_into(a, b):
+    return _into(_div, a, b)
+
+def _pat_mod_into(a, b):
+    if isinstance(b, int):
+        _check_modulus(b)
+    return _into(_mod, a, b)
+
+
+# --------------------------
+# Slice Views
+# --------------------------
+
+class SeqView:
+    """Read-only window [offset, offset + length) over a parent sequence.
+
+    Slicing a sequence returns one of these instead of copying: indexing,
+    iteration, further slicing (which re-targets the same parent), the
+    element-wise helpers and printing all work on it directly. It becomes
+    a real list only via materialize(), e.g. when pickled to another process.
+    """
+    __slots__ = ("base", "offset", "length")
+
+    def __init__(self, base, offset, length):
+        self.base = base
+        self.offset = offset
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        if self.offset == 0 and self.length == len(self.base):
+            return iter(self.base)
+        return map(self.base.__getitem__, range(self.offset, self.offset + self.length))
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(self.length)
+            if step != 1:
+                return self.materialize()[i]
+            return SeqView(self.base, self.offset + start, max(0, stop - start))
+        if i < 0:
+            i += self.length
+        if not 0 <= i < self.length:
+            raise IndexError("sequence index out of range")
+        return self.base[self.offset + i]
+
+    def materialize(self):
+        return list(self.base[self.offset:self.offset + self.length])
+
+    def __eq__(self, other):
+        if isinstance(other, (list, SeqView)):
+            return len(other) == self.length and all(x == y for x, y in zip(self, other))
+        return NotImplemented
+
+    def __reduce__(self):
+        return (list, (self.materialize(),))
+
+    def __repr__(self):
+        return f"SeqView({self.materialize()!r})"
+
+def _seq_view(seq, start=None, end=None):
+    """seq[start:end] without copying"""
+    start, end, _ = slice(start, end).indices(len(seq))
+    length = max(0, end - start)
+    if isinstance(seq, SeqView):
+        return SeqView(seq.base, seq.offset + start, length)
+    return SeqView(seq, start, length)
+
+
+# --------------------------
+# Pattern Generators
+# --------------------------
+
+def _fib_inline(n):
+    a, b = 0, 1
+    arr = []
+    for _ in range(n):
+        arr.append(a)
+        a, b = b, a + b
+    return arr
+
+def _fact_inline(n):
+    return list(accumulate(range(1, n + 1), operator.mul))
+
+# The generators below are strength-reduced: each element is the previous
+# one plus a difference (square, cube, triangular, arithmetic) or times the
+# ratio (geometric), built by accumulate() in C. Neither power nor division
+# is computed per element, so geometric costs one multiply per element
+# instead of a fresh ratio**i.
+
+def _pattern_values(values, n, compact):
+    if n >= COMPACT_MIN_LENGTH and compact:
+        return array('q', values)
+    return list(values)
+
+def _pat_square(n):
+    # (k+1)**2 - k**2 = 2k + 1: running sum of the odd numbers
+    return _pattern_values(accumulate(range(1, 2 * n, 2)), n, _fits_int64(0, n * n))
+
+def _pat_cube(n):
+    # (k+1)**3 - k**3 = 3k**2 + 3k + 1, whose own differences are 6, 12, 18, ...
+    if n <= 0:
+        return []
+    steps = accumulate(range(6, 6 * n, 6), initial=1)
+    return _pattern_values(accumulate(steps), n, _fits_int64(0, n ** 3))
+
+def _pat_triangular(n):
+    return _pattern_values(accumulate(range(1, n + 1)), n, _fits_int64(0, n * (n + 1) // 2))
+
+def _pat_arithmetic(start, step, n):
+    if n <= 0:
+        return []
+    last = start + step * (n - 1)
+    values = range(start, last + step, step) if step else repeat(start, n)
+    return _pattern_values(values, n, _fits_int64(min(start, last), max(start, last)))
+
+def _pat_geometric(start, ratio, n):
+    if n <= 0:
+        return []
+    # |start * ratio**i| < 2**(bits(start) + i * bits(ratio)), or |start| when |ratio| <= 1
+    bits = abs(start).bit_length() + (n - 1) * (abs(ratio).bit_length() if abs(ratio) > 1 else 0)
+    values = accumulate(repeat(ratio, n - 1), operator.mul, initial=start)
+    return _pattern_values(values, n, bits <= 63)
+
+
+def _pattern_mod(pattern, args, m):
+    """Elements of `pattern args` reduced mod m, without ever building the full values.
+
+    Each element comes from the previous residue (fibonacci, factorial,
+    arithmetic, geometric) or from its index (square, cube, triangular),
+    so every intermediate stays below m however long the sequence is.
+    """
+    _check_modulus(m)
+    n = max(0, args[-1])
+    if n == 0:
+        return []
+    if pattern == "fibonacci":
+        out = []
+        a, b = 0, 1 % m
+        for _ in range(n):
+            out.append(a)
+            a, b = b, (a + b) % m
+    elif pattern == "factorial":
+        out = []
+        f = 1
+        for i in range(1, n + 1):
+            f = f * i % m
+            out.append(f)
+    elif pattern == "square":
+        r = range(1, n + 1)
+        out = list(map(operator.mod, map(operator.mul, r, r), repeat(m, n)))
+    elif pattern == "cube":
+        out = [pow(i, 3, m) for i in range(1, n + 1)]
+    elif pattern == "triangular":
+        pairs = map(operator.mul, range(1, n + 1), range(2, n + 2))
+        out = [p // 2 % m for p in pairs]
+    elif pattern == "arithmetic":
+        step = args[1] % m
+        out = list(accumulate(repeat(step, n - 1), lambda v, d: (v + d) % m, initial=args[0] % m))
+    elif pattern == "geometric":
+        ratio = args[1] % m
+        out = list(accumulate(repeat(ratio, n - 1), lambda v, r: v * r % m, initial=args[0] % m))
+    else:
+        raise ValueError("Unknown pattern " + pattern)
+    return _compact(out)
+
+
+# --------------------------
+# Masks
+# --------------------------
+
+# Comparing a sequence element-wise gives a mask: a bytearray holding 0 or 1
+# for each element, built in one pass by map() over the operator. Selecting
+# with a mask keeps the elements where it is nonzero; x[x > c] skips the
+# mask and filters x in a single comprehension instead.
+
+COMPARE_FUNCS = {'==': operator.eq, '!=': operator.ne, '<': operator.lt,
+                 '>': operator.gt, '<=': operator.le, '>=': operator.ge}
+
+FILTERS = {
+    '==': lambda seq, c: [v for v in seq if v == c],
+    '!=': lambda seq, c: [v for v in seq if v != c],
+    '<': lambda seq, c: [v for v in seq if v < c],
+    '>': lambda seq, c: [v for v in seq if v > c],
+    '<=': lambda seq, c: [v for v in seq if v <= c],
+    '>=': lambda seq, c: [v for v in seq if v >= c],
+}
+
+def _seq_compare(op, a, b):
+    """Mask of `a op b` with at least one sequence operand"""
+    f = COMPARE_FUNCS[op]
+    if isinstance(a, int):
+        return bytearray(map(f, repeat(a), b))
+    if isinstance(b, int):
+        return bytearray(map(f, a, repeat(b)))
+    return bytearray(map(f, a, b))
+
+def _seq_select(seq, mask):
+    """Elements of seq where mask is nonzero (up to the shorter length)"""
+    out = list(compress(seq, mask))
+    return _compact(out) if _is_compact(seq) else out
+
+def _seq_filter(op, seq, value):
+    """seq[seq op value] without building the mask"""
+    out = FILTERS[op](seq, value)
+    return _compact(out) if _is_compact(seq) else out
+
+
+# --------------------------
+# Prefix Sums
+# --------------------------
+
+# cumsum, diff and window_sum each make one pass in C (accumulate, and map
+# over operator.sub), so a moving sum costs O(n) whatever its width: each
+# window is the previous one plus the element entering it minus the one
+# leaving. They take any sequence; a compact source gives a compact result
+# unless some element overflows int64.
+
+def _scan_result(out, seq):
+    return _compact(out) if _is_compact(seq) else out
+
+def _seq_cumsum(seq):
+    """Running totals: element i is seq[0] + ... + seq[i]"""
+    return _scan_result(list(accumulate(seq)), seq)
+
+def _seq_diff(seq):
+    """First differences: element i is seq[i + 1] - seq[i]"""
+    return _scan_result(list(map(operator.sub, islice(seq, 1, None), seq)), seq)
+
+def _seq_window_sum(seq, width):
+    """Sum of every run of `width` consecutive elements: len(seq) - width + 1 of them"""
+    if width < 1:
+        raise ValueError(f"window_sum width must be at least 1, got {width}")
+    if width > len(seq):
+        return []
+    steps = map(operator.sub, islice(seq, width, None), seq)
+    return _scan_result(list(accumulate(steps, initial=sum(islice(seq, width)))), seq)
+
+
+# --------------------------
+# Reductions
+# --------------------------
+
+# One streaming pass over any sequence (list, array or SeqView)
+def _seq_sum(seq):
+    # A mask holds only 0 and 1, so its sum is a count done in C
+    return seq.count(1) if isinstance(seq, bytearray) else sum(seq)
+
+_seq_max = max
+_seq_min = min
+_seq_len = len
+
+def _fib_pair(n):
+    """(F(n), F(n+1)) by fast doubling"""
+    if n == 0:
+        return 0, 1
+    a, b = _fib_pair(n >> 1)
+    c = a * (2 * b - a)
+    d = a * a + b * b
+    return (d, c + d) if n & 1 else (c, d)
+
+def _pattern_element(pattern, args, i):
+    """Element i of a pattern, computed without generating the others"""
+    if pattern == "fibonacci":
+        return _fib_pair(i)[0]
+    if pattern == "factorial":
+        return math.factorial(i + 1)
+    if pattern == "square":
+        return (i + 1) ** 2
+    if pattern == "cube":
+        return (i + 1) ** 3
+    if pattern == "triangular":
+        return (i + 1) * (i + 2) // 2
+    if pattern == "arithmetic":
+        return args[0] + args[1] * i
+    if pattern == "geometric":
+        return args[0] * args[1] ** i
+    raise ValueError("Unknown pattern " + pattern)
+
+def _pattern_sum(pattern, args):
+    n = max(0, args[-1])
+    if pattern == "fibonacci":
+        return _fib_pair(n + 1)[0] - 1  # F(0) + ... + F(n-1) = F(n+1) - 1
+    if pattern == "square":
+        return n * (n + 1) * (2 * n + 1) // 6
+    if pattern == "cube":
+        return (n * (n + 1) // 2) ** 2
+    if pattern == "triangular":
+        return n * (n + 1) * (n + 2) // 6
+    if pattern == "arithmetic":
+        start, step = args[0], args[1]
+        return n * start + step * (n * (n - 1) // 2)
+    if pattern == "geometric":
+        start, ratio = args[0], args[1]
+        if ratio == 1:
+            return start * n
+        return start * (ratio ** n - 1) // (ratio - 1)
+    # factorial has no closed form, but the sequence still need not be built
+    total, f = 0, 1
+    for i in range(1, n + 1):
+        f *= i
+        total += f
+    return total
+
+def _pattern_reduce(op, pattern, args):
+    """Reduction `op` over pattern(*args) without generating the sequence"""
+    n = max(0, args[-1])
+    if op == "len":
+        return n
+    if op == "sum":
+        return _pattern_sum(pattern, args)
+    if n == 0:
+        raise ValueError(f"{op}() arg is an empty sequence")
+    # Every pattern is monotone, alternates in sign (negative geometric ratio)
+    # or is constant after its first element (ratio 0 or -1), so its extremes
+    # are among the first two and last two elements
+    ends = {0, min(1, n - 1), max(0, n - 2), n - 1}
+    values = [_pattern_element(pattern, args, i) for i in ends]
+    return max(values) if op == "max" else min(values)
+
+
+# --------------------------
+# Search
+# --------------------------
+
+# `v in x` and `indexof v in x` over a pattern invert its formula: an integer
+# root, a division or a logarithm gives the only candidate index, which is
+# then checked with one exact element computation. Other sequences are
+# scanned once by Python's own `in` and operator.indexOf.
+
+def _seq_contains(seq, value):
+    # `in` on a mask (bytearray) rejects values outside 0..255 instead of answering False
+    if isinstance(seq, bytearray) and not 0 <= value < 256:
+        return False
+    return value in seq
+
+def _seq_indexof(seq, value):
+    try:
+        return operator.indexOf(seq, value)
+    except ValueError:
+        return -1
+
+def _iroot(v, k):
+    """floor(v ** (1/k)) for an int v >= 0, exact at any size"""
+    if v < 2:
+        return v
+    x = 1 << -(-v.bit_length() // k)  # a power of two above the root
+    while True:
+        y = ((k - 1) * x + v // x ** (k - 1)) // k
+        if y >= x:
+            return x
+        x = y
+
+def _near(estimate, element, value):
+    """Index among estimate-1..estimate+1 whose element is `value`, else -1"""
+    for i in (estimate - 1, estimate, estimate + 1):
+        if i >= 0 and element(i) == value:
+            return i
+    return -1
+
+def _pattern_find(pattern, args, value):
+    """Smallest i with element i == value, ignoring the length; -1 if none"""
+    if pattern == "square":
+        r = math.isqrt(value) if value > 0 else 0
+        return r - 1 if r and r * r == value else -1
+    if pattern == "cube":
+        r = _iroot(value, 3) if value > 0 else 0
+        return r - 1 if r and r ** 3 == value else -1
+    if pattern == "triangular":
+        m = (math.isqrt(8 * value + 1) - 1) // 2 if value > 0 else 0
+        return m - 1 if m and m * (m + 1) // 2 == value else -1
+    if pattern == "arithmetic":
+        start, step = args[0], args[1]
+        if step == 0:
+            return 0 if value == start else -1
+        i, r = divmod(value - start, step)
+        return i if r == 0 and i >= 0 else -1
+    if pattern == "geometric":
+        start, ratio = args[0], args[1]
+        if value == start:
+            return 0
+        if start == 0 or value % start:
+            return -1
+        q = value // start
+        if ratio == 0 or ratio == -1:
+            return 1 if q == ratio else -1  # start, ratio*start, then repeats
+        if abs(ratio) < 2 or q == 0:
+            return -1
+        estimate = round(math.log(abs(q)) / math.log(abs(ratio)))
+        return _near(estimate, lambda i: ratio ** i, q)
+    if pattern == "fibonacci":
+        if value < 2:
+            return value if value >= 0 else -1  # 1 first occurs as F(1)
+        # F(i) is the integer nearest phi**i / sqrt(5)
+        estimate = round((math.log(value) + math.log(5) / 2) / math.log((1 + math.sqrt(5)) / 2))
+        return _near(estimate, lambda i: _fib_pair(i)[0], value)
+    if pattern == "factorial":
+        if value < 1:
+            return -1
+        # Binary search on log((i+1)!) = lgamma(i+2), then one exact check
+        target = math.log(value)
+        lo, hi = 0, 1
+        while math.lgamma(hi + 2) < target:
+            lo, hi = hi, hi * 2
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if math.lgamma(mid + 2) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return _near(lo, lambda i: math.factorial(i + 1), value)
+    raise ValueError("Unknown pattern " + pattern)
+
+def _pattern_index(pattern, args, value):
+    """Index of the first `value` in pattern(*args), or -1, without generating it"""
+    i = _pattern_find(pattern, args, value)
+    return i if 0 <= i < args[-1] else -1
+
+def _pattern_contains(pattern, args, value):
+    return _pattern_index(pattern, args, value) >= 0
+
+
+# --------------------------
+# Output
+# --------------------------
+
+def _print(value):
+    print(value if isinstance(value, int) else ' '.join(str(x) for x in value))
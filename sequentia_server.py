@@ -0,0 +1,349 @@
+"""Local compile-and-run service for Sequentia.
+
+Usage:
+    python sequentia_server.py [--host 127.0.0.1] [--port 8765] [--unix PATH]
+                               [--workers N] [--timeout S] [--max-pending N]
+                               [--max-elements N] [--max-bytes N] [--max-time S]
+
+Protocol: JSON lines in both directions. A request is
+
+    {"id": 1, "source": "x = pattern fibonacci 5\nprint x\n", "timeout": 5}
+
+("timeout" is optional). The server answers with any number of
+
+    {"id": 1, "event": "output", "data": "0 1 1 2 3\n"}
+
+chunks while the program runs, followed by exactly one of
+
+    {"id": 1, "event": "done", "ok": true, "elapsed": 0.0012}
+    {"id": 1, "event": "done", "ok": false, "error": "...", "elapsed": ...}
+
+Requests on one connection may be pipelined; responses carry the request id.
+Jobs run on a pool of pre-forked worker processes that import the compiler
+and build the runtime helpers before the first request. A job that exceeds
+its timeout has its worker killed and replaced. With --max-* limits, each
+job is priced by the static cost model first, so oversized programs are
+rejected before they start and overruns are aborted inside the worker.
+"""
+import argparse
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+import sequentia_compiler as sc
+
+
+# --------------------------
+# Worker Processes
+# --------------------------
+
+class _PipeWriter(io.TextIOBase):
+    """stdout replacement that ships program output to the server in chunks"""
+    def __init__(self, conn, max_buffer=8192, max_delay=0.05):
+        self.conn = conn
+        self.max_buffer = max_buffer
+        self.max_delay = max_delay
+        self.parts = []
+        self.size = 0
+        self.last_flush = time.perf_counter()
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= self.max_buffer or (
+                "\n" in text and time.perf_counter() - self.last_flush >= self.max_delay):
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if self.parts:
+            self.conn.send(("output", "".join(self.parts)))
+            self.parts = []
+            self.size = 0
+        self.last_flush = time.perf_counter()
+
+def _worker_main(conn, budget=None):
+    sc.compile_python(sc.Program([]))  # warm up imports and the code generator
+    parent = os.getppid()
+    while True:
+        try:
+            # Forked siblings inherit each other's pipe ends, so EOF alone is
+            # not a reliable shutdown signal; also watch for the server dying.
+            if not conn.poll(1.0):
+                if os.getppid() != parent:
+                    return
+                continue
+            source = conn.recv()
+        except EOFError:
+            return
+        if source is None:
+            return
+        writer = _PipeWriter(conn)
+        start = time.perf_counter()
+        error = None
+        try:
+            sc.run_source(source, out=writer, budget=budget)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        writer.flush()
+        conn.send(("done", error, time.perf_counter() - start))
+
+class WorkerProcess:
+    def __init__(self, ctx, budget=None):
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=_worker_main, args=(child, budget), daemon=True)
+        self.proc.start()
+        child.close()
+
+    def kill(self):
+        self.proc.kill()
+        self.proc.join()
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.proc.join(1)
+        if self.proc.is_alive():
+            self.proc.kill()
+        self.conn.close()
+
+class JobTimeout(Exception):
+    pass
+
+class WorkerPool:
+    """Fixed-size pool of pre-forked workers; one job per worker at a time"""
+    def __init__(self, size, budget=None):
+        self.size = size
+        self.budget = budget  # sc.ExecutionBudget applied to every job
+        methods = multiprocessing.get_all_start_methods()
+        self.ctx = multiprocessing.get_context("fork" if "fork" in methods else None)
+        self.idle = None
+        self.workers = []
+
+    async def start(self):
+        self.idle = asyncio.Queue()
+        for _ in range(self.size):
+            self._add_worker()
+
+    def _add_worker(self):
+        worker = WorkerProcess(self.ctx, self.budget)
+        self.workers.append(worker)
+        self.idle.put_nowait(worker)
+
+    async def _recv(self, conn):
+        loop = asyncio.get_running_loop()
+        while not conn.poll():
+            ready = loop.create_future()
+            loop.add_reader(conn.fileno(), lambda: ready.done() or ready.set_result(None))
+            try:
+                await ready
+            finally:
+                loop.remove_reader(conn.fileno())
+        return conn.recv()
+
+    async def run(self, source, timeout, on_output):
+        """Run one program, awaiting on_output(text) for each output chunk.
+
+        Returns (error, elapsed); error is None on success. Raises JobTimeout
+        if the program is still running after `timeout` seconds.
+        """
+        worker = await self.idle.get()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        try:
+            worker.conn.send(source)
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                msg = await asyncio.wait_for(self._recv(worker.conn), remaining)
+                if msg[0] == "output":
+                    await on_output(msg[1])
+                else:
+                    return msg[1], msg[2]
+        except (asyncio.TimeoutError, asyncio.CancelledError, EOFError, OSError) as e:
+            # The worker is mid-job or dead: replace it rather than reuse it
+            self.workers.remove(worker)
+            worker.kill()
+            self._add_worker()
+            worker = None
+            if isinstance(e, asyncio.TimeoutError):
+                raise JobTimeout(f"program exceeded {timeout:g}s timeout")
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise Exception("worker process died")
+        finally:
+            if worker is not None:
+                self.idle.put_nowait(worker)
+
+    def close(self):
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+
+
+# --------------------------
+# Server
+# --------------------------
+
+class SequentiaServer:
+    def __init__(self, workers=None, timeout=10.0, max_pending=64, budget=None):
+        self.pool = WorkerPool(workers or os.cpu_count() or 1, budget)
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.pending = 0
+
+    async def handle_request(self, request, send):
+        if not isinstance(request, dict):
+            await send({"id": None, "event": "done", "ok": False, "error": "request must be a JSON object",
+                        "elapsed": 0.0})
+            return
+        req_id = request.get("id")
+        source = request.get("source")
+        if not isinstance(source, str):
+            await send({"id": req_id, "event": "done", "ok": False, "error": "missing 'source'", "elapsed": 0.0})
+            return
+        timeout = request.get("timeout", self.timeout)
+        if timeout is None:
+            timeout = self.timeout
+        if (isinstance(timeout, bool) or not isinstance(timeout, (int, float))
+                or not 0 < timeout < float("inf")):
+            await send({"id": req_id, "event": "done", "ok": False,
+                        "error": "'timeout' must be a positive number of seconds", "elapsed": 0.0})
+            return
+        if self.pending >= self.max_pending:
+            await send({"id": req_id, "event": "done", "ok": False, "error": "server busy", "elapsed": 0.0})
+            return
+        timeout = float(timeout)
+
+        async def on_output(text):
+            await send({"id": req_id, "event": "output", "data": text})
+
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            error, _ = await self.pool.run(source, timeout, on_output)
+        except Exception as e:
+            error = str(e)
+        finally:
+            self.pending -= 1
+        reply = {"id": req_id, "event": "done", "ok": error is None, "elapsed": time.perf_counter() - start}
+        if error is not None:
+            reply["error"] = error
+        await send(reply)
+
+    async def handle_client(self, reader, writer):
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def send(message):
+            async with lock:
+                writer.write((json.dumps(message) + "\n").encode())
+                await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    await send({"id": None, "event": "done", "ok": False, "error": "invalid JSON", "elapsed": 0.0})
+                    continue
+                task = asyncio.create_task(self.handle_request(request, send))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except (ConnectionError, asyncio.CancelledError):
+            # Client went away, or the server is shutting down
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765, unix_path=None, ready=None):
+        await self.pool.start()
+        limit = 1 << 24
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_client, unix_path, limit=limit)
+        else:
+            server = await asyncio.start_server(self.handle_client, host, port, limit=limit)
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, server.close)
+        if ready is not None:
+            ready(server)
+        try:
+            async with server:
+                await server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.pool.close()
+            if unix_path and os.path.exists(unix_path):
+                os.unlink(unix_path)
+
+
+async def request(reader, writer, source, req_id=0, timeout=None, on_output=None):
+    """Client helper: send one request and collect its output and final reply"""
+    message = {"id": req_id, "source": source}
+    if timeout is not None:
+        message["timeout"] = timeout
+    writer.write((json.dumps(message) + "\n").encode())
+    await writer.drain()
+    chunks = []
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("server closed the connection")
+        reply = json.loads(line)
+        if reply["event"] == "output":
+            chunks.append(reply["data"])
+            if on_output:
+                on_output(reply["data"])
+        else:
+            reply["output"] = "".join(chunks)
+            return reply
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Sequentia compile-and-run server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--unix", default=None, metavar="PATH", help="listen on a Unix socket instead of TCP")
+    ap.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    ap.add_argument("--timeout", type=float, default=10.0, help="default per-request timeout in seconds")
+    ap.add_argument("--max-pending", type=int, default=64,
+                    help="requests admitted at once (running or queued); further requests get 'server busy'")
+    ap.add_argument("--max-elements", type=int, default=None, help="per-job sequence element budget")
+    ap.add_argument("--max-bytes", type=int, default=None, help="per-job memory budget in bytes")
+    ap.add_argument("--max-time", type=float, default=None,
+                    help="per-job time budget in seconds, enforced inside the worker so it is not replaced")
+    args = ap.parse_args(argv)
+
+    budget = None
+    if args.max_elements is not None or args.max_bytes is not None or args.max_time is not None:
+        budget = sc.ExecutionBudget(args.max_elements, args.max_bytes, args.max_time)
+    server = SequentiaServer(args.workers, args.timeout, args.max_pending, budget)
+    where = args.unix or f"{args.host}:{args.port}"
+    ready = lambda _: print(f"Sequentia server listening on {where} with {server.pool.size} workers",
+                            file=sys.stderr, flush=True)
+    asyncio.run(server.serve(args.host, args.port, args.unix, ready))
+
+
+if __name__ == '__main__':
+    main()